@@ -1,28 +1,478 @@
 import psycopg2
 from psycopg2 import OperationalError
+from contextlib import contextmanager
+from flask import g
 import yaml
 import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
 
 config_path = os.path.join(os.path.dirname(__file__), "paramsBD.yml")
 with open(config_path, "r") as config_file:
     config = yaml.safe_load(config_file)
 
 
+class PoolTimeout(OperationalError):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout.
+    """
+
+
+class PooledConnection:
+    """
+    Thin proxy around a psycopg2 connection checked out from a ConnectionPool.
+
+    Every attribute is delegated to the underlying connection, except close(),
+    which hands the connection back to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.putconn(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections.
+
+    :param connect: Callable that opens a new raw connection.
+    :param min_size: Connections opened eagerly and kept idle.
+    :param max_size: Upper bound of simultaneously open connections.
+    :param timeout: Seconds getconn() waits for a free connection.
+    :param max_uses: Checkouts after which a connection is recycled (0 disables).
+    :param max_lifetime: Seconds after which a connection is recycled (0 disables).
+    :param validate_after: Idle seconds after which a connection is checked with
+        a cheap query before being handed out (negative disables validation).
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=1,
+        max_size=10,
+        timeout=5.0,
+        max_uses=0,
+        max_lifetime=0,
+        validate_after=30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size configuration")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self._cond = threading.Condition()
+        self._idle = []
+        self._meta = {}
+        self._in_use = 0
+        self._opening = 0
+        self._closed = False
+        try:
+            for _ in range(min_size):
+                self._idle.append(self._open())
+        except Exception:
+            self.closeall()
+            raise
+
+    def _open(self):
+        raw = self._connect()
+        now = time.monotonic()
+        self._meta[id(raw)] = {"created": now, "released": now, "uses": 0}
+        return raw
+
+    def _open_unlocked(self):
+        # The TCP + auth handshake is slow; do it without holding the lock so
+        # other threads can keep checking connections in and out meanwhile.
+        self._opening += 1
+        self._cond.release()
+        try:
+            raw = self._connect()
+        finally:
+            self._cond.acquire()
+            self._opening -= 1
+            # On failure the slot is free again; wake a waiter to retry it.
+            self._cond.notify()
+        now = time.monotonic()
+        self._meta[id(raw)] = {"created": now, "released": now, "uses": 0}
+        return raw
+
+    def _discard(self, raw):
+        self._meta.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _expired(self, raw):
+        meta = self._meta.get(id(raw))
+        if meta is None:
+            return True
+        if self.max_uses and meta["uses"] >= self.max_uses:
+            return True
+        if (
+            self.max_lifetime
+            and time.monotonic() - meta["created"] >= self.max_lifetime
+        ):
+            return True
+        return False
+
+    def _needs_validation(self, raw):
+        if self.validate_after < 0:
+            return False
+        idle = time.monotonic() - self._meta[id(raw)]["released"]
+        return idle >= self.validate_after
+
+    def _validate_unlocked(self, raw):
+        # A network round trip: like _open_unlocked(), run it without holding
+        # the lock. The connection is off the idle list meanwhile and still
+        # counts towards max_size, so nobody else can take or replace it.
+        self._cond.release()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            raw.rollback()
+            return True
+        except Exception:
+            return False
+        finally:
+            self._cond.acquire()
+
+    @property
+    def size(self):
+        return len(self._meta)
+
+    def stats(self):
+        """
+        Snapshot of the pool occupancy.
+        :return: dict with open, idle, in_use and max_size counters
+        """
+        with self._cond:
+            return {
+                "open": len(self._meta),
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_size": self.max_size,
+            }
+
+    def getconn(self, timeout=None):
+        """
+        Check out a connection, waiting up to `timeout` seconds for one to be released.
+        :return: raw psycopg2 connection
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise OperationalError("Connection pool is closed")
+                while self._idle:
+                    raw = self._idle.pop()
+                    if self._expired(raw) or raw.closed:
+                        self._discard(raw)
+                        continue
+                    if self._needs_validation(raw):
+                        healthy = self._validate_unlocked(raw)
+                        if self._closed or not healthy:
+                            self._discard(raw)
+                            self._cond.notify()
+                            continue
+                    return self._checkout(raw)
+                if len(self._meta) + self._opening < self.max_size:
+                    return self._checkout(self._open_unlocked())
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No database connection available after {timeout}s"
+                    )
+                self._cond.wait(remaining)
+
+    def _checkout(self, raw):
+        self._meta[id(raw)]["uses"] += 1
+        self._in_use += 1
+        return raw
+
+    def putconn(self, raw):
+        """
+        Return a connection to the pool, rolling back any open transaction.
+        """
+        # The rollback is a network round trip; the connection is still
+        # checked out to this thread, so it can run before taking the lock.
+        try:
+            broken = bool(raw.closed)
+            if (
+                not broken
+                and raw.get_transaction_status()
+                != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            ):
+                raw.rollback()
+        except Exception:
+            broken = True
+        with self._cond:
+            self._in_use -= 1
+            discard = broken or self._closed or self._expired(raw)
+            if discard:
+                self._meta.pop(id(raw), None)
+            else:
+                self._meta[id(raw)]["released"] = time.monotonic()
+                self._idle.append(raw)
+            self._cond.notify()
+        if discard:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for raw in self._idle:
+                self._discard(raw)
+            self._idle = []
+            self._cond.notify_all()
+
+
+_query_listeners = []
+
+
+def add_query_listener(listener):
+    """
+    Register a callable notified after every statement and fetch executed
+    through a pooled connection.
+    :param listener: Callable(seconds, rows) where rows is the number of rows
+        fetched by the call (0 for execute)
+    """
+    if listener not in _query_listeners:
+        _query_listeners.append(listener)
+
+
+def _notify_query(seconds, rows):
+    for listener in _query_listeners:
+        try:
+            listener(seconds, rows)
+        except Exception:
+            logger.exception("Query listener failed")
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that reports the time spent in each database round trip, and the
+    rows it fetched, to the listeners registered with add_query_listener().
+    """
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _notify_query(time.perf_counter() - start, 0)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _notify_query(time.perf_counter() - start, 0)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _notify_query(time.perf_counter() - start, 0)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        _notify_query(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _notify_query(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        _notify_query(time.perf_counter() - start, len(rows))
+        return rows
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_inherited_pools = []
+
+
+def _connect():
+    return psycopg2.connect(
+        database=config["db_name"],
+        user=config["db_user"],
+        password=config["db_password"],
+        host=config["db_host"],
+        port=config["db_port"],
+        cursor_factory=TimedCursor,
+    )
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    :return: ConnectionPool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    min_size=int(config.get("pool_min_size", 1)),
+                    max_size=int(config.get("pool_max_size", 10)),
+                    timeout=float(config.get("pool_timeout", 5)),
+                    max_uses=int(config.get("pool_max_uses", 0)),
+                    max_lifetime=float(config.get("pool_max_lifetime", 0)),
+                    validate_after=float(config.get("pool_validate_after", 30)),
+                )
+                logger.info("PostgreSQL connection pool created")
+    return _pool
+
+
+def pool_stats():
+    """
+    Occupancy of the process-wide pool, without creating it.
+    :return: dict as returned by ConnectionPool.stats(), or None
+    """
+    pool = _pool
+    return None if pool is None else pool.stats()
+
+
+def close_pool():
+    """
+    Close every idle connection and drop the process-wide pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def after_fork():
+    """
+    Forget the pool inherited from the parent process. To be called in a
+    freshly forked worker: the parent's sockets must not be shared, so the
+    pool is dropped without closing its connections (that would terminate
+    the parent's sessions) and the next get_pool() builds a new one.
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        logger.warning("Connection pool inherited across fork; discarding it")
+        # Keep a reference: garbage-collecting the connections would send the
+        # termination message over the sockets the parent still uses.
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
 def create_connection():
     """
-    Create a connection to the PostgreSQL database.
+    Check out a connection from the PostgreSQL connection pool.
+    Calling close() on the returned object gives it back to the pool.
     :return: Connection object or None
     """
     connection = None
     try:
-        connection = psycopg2.connect(
-            database=config["db_name"],
-            user=config["db_user"],
-            password=config["db_password"],
-            host=config["db_host"],
-            port=config["db_port"],
-        )
-        print("Connection to PostgreSQL DB successful")
+        pool = get_pool()
+        connection = PooledConnection(pool, pool.getconn())
     except OperationalError as e:
-        print(f"The error '{e}' occurred")
+        logger.error(f"The error '{e}' occurred")
     return connection
+
+
+def get_connection():
+    """
+    Return the connection bound to the current request, checking one out from
+    the pool on first use. It goes back to the pool in the teardown hook
+    registered by init_app(), so helpers called by a view share it.
+    :return: Connection object or None
+    """
+    conn = g.get("db_conn")
+    if conn is None:
+        conn = create_connection()
+        if conn is not None:
+            g.db_conn = conn
+    return conn
+
+
+def release_connection(exception=None):
+    """
+    Teardown hook: give the request connection back to the pool.
+    """
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def init_app(app):
+    """
+    Register the request-scoped connection teardown on a Flask app.
+    """
+    app.teardown_appcontext(release_connection)
+
+
+_tx_state = threading.local()
+
+
+@contextmanager
+def transaction(conn=None):
+    """
+    Run a block of statements in a single transaction and yield a cursor.
+    Commits when the block succeeds and rolls back when it raises. Nested
+    blocks on the same connection join the outermost transaction, so only it
+    commits or rolls back.
+    :param conn: Connection to use; defaults to the request connection
+    """
+    if conn is None:
+        conn = get_connection()
+        if conn is None:
+            raise OperationalError("Failed to connect to the database")
+    depths = _tx_state.__dict__.setdefault("depths", {})
+    key = id(conn)
+    outermost = key not in depths
+    depths[key] = depths.get(key, 0) + 1
+    cursor = conn.cursor()
+    try:
+        yield cursor
+        if outermost:
+            conn.commit()
+    except Exception:
+        if outermost:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        depths[key] -= 1
+        if not depths[key]:
+            del depths[key]
@@ -0,0 +1,173 @@
+"""
+In-process cache of reference data (Professores, Disciplinas, Turmas, Atividades).
+
+These tables change a few times per semester but are read on every screen, so
+their list pages are kept in memory for `cache_ttl` seconds (paramsBD.yml).
+Every handler that writes to a cached table calls invalidate() after its
+transaction commits, which drops all the pages of that table in the current
+process; the other workers evict theirs when the change notification of the
+table arrives (see Util.notifications).
+"""
+
+from collections import OrderedDict
+from Util import bd, metrics, notifications, query
+import threading
+import time
+
+DEFAULT_TTL = float(bd.config.get("cache_ttl", 300))
+DEFAULT_MAX_ENTRIES = int(bd.config.get("cache_max_entries", 256))
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries expire `ttl` seconds after being set.
+
+    Each invalidation bumps a generation number; set() drops values loaded
+    under an older generation, so a read that raced with a write never puts
+    the pre-write data back in the cache.
+    :param name: Cache name used in the metrics
+    :param ttl: Seconds an entry stays valid
+    :param max_entries: Entries kept before the least recently used is evicted
+    """
+
+    def __init__(self, name, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        """
+        :return: cached value, or None when missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = "hit"
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                entry = None
+                self.misses += 1
+                result = "miss"
+        metrics.CACHE_LOOKUPS.labels(self.name, result).inc()
+        return None if entry is None else entry[1]
+
+    def set(self, key, value, generation=None):
+        """
+        Store `value` under `key`.
+        :param generation: Value of `generation` read before loading `value`;
+            the value is discarded if the cache was invalidated meanwhile
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def discard(self, key):
+        """
+        Drop the entry of `key` only. Loads in progress for any key are still
+        discarded by set(), since they may have read the pre-write data.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(table):
+    """
+    Return the cache of `table`, creating it on first use.
+    Table names are case-insensitive, as in PostgreSQL.
+    """
+    cache = _caches.get(table.lower())
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(table.lower(), TTLCache(table))
+    return cache
+
+
+def cached_page(table, key, serialize, limit, after, columns, ids=None):
+    """
+    One list page of `table` (a keyset page, or the rows of ?ids=), served from
+    the table's cache when possible and loaded and cached otherwise. The page
+    is stored already serialized; a load that raced with an invalidation is
+    returned but not cached.
+    :param key: Primary-key column name
+    :param serialize: Callable (row, columns) returning the item of a row
+    :param ids: IDs of ?ids=, or None for a keyset page
+    :return: (items, next_after, missing), or None when no database
+        connection is available
+    """
+    cache = get_cache(table)
+    cache_key = (limit, after, columns, ids)
+    page = cache.get(cache_key)
+    if page is None:
+        generation = cache.generation
+        conn = bd.get_connection()
+        if conn is None:
+            return None
+        with bd.transaction(conn) as cursor:
+            if ids is None:
+                rows, next_after = query.keyset_page(
+                    cursor, table, key, limit, after, columns=columns
+                )
+                missing = ()
+            else:
+                next_after = None
+                rows, missing = query.fetch_by_keys(cursor, table, key, ids, columns)
+        page = ([serialize(row, columns) for row in rows], next_after, missing)
+        cache.set(cache_key, page, generation)
+    return page
+
+
+def invalidate(table):
+    """
+    Drop every cached entry of `table`, or of every table when it is None.
+    """
+    if table is None:
+        clear()
+        return
+    cache = _caches.get(table.lower())
+    if cache is not None:
+        cache.invalidate()
+
+
+def clear():
+    """
+    Drop the entries of every cache.
+    """
+    for cache in list(_caches.values()):
+        cache.invalidate()
+
+
+notifications.subscribe(invalidate)
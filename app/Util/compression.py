@@ -0,0 +1,167 @@
+"""
+gzip/brotli compression of responses, negotiated from Accept-Encoding.
+
+Buffered responses smaller than COMPRESS_MIN_SIZE bytes are sent as they are;
+streamed responses (exports, ?stream=) are compressed chunk by chunk and
+flushed after every chunk, so the client keeps receiving data progressively.
+Responses carrying an ETag are cacheable: their compressed bytes are kept
+in memory, keyed by ETag and encoding, so polling the same unchanged payload
+does not compress it again.
+
+The ETag of a compressed response is made weak (as nginx does): the bytes
+differ from the identity representation, but If-None-Match uses the weak
+comparison, so conditional requests keep working.
+
+brotli is optional; without it only gzip is offered.
+
+Settings (app.config): COMPRESS_MIN_SIZE, COMPRESS_LEVEL (gzip, 1-9),
+COMPRESS_BROTLI_QUALITY (0-11), COMPRESS_CACHE_ENTRIES,
+COMPRESS_CACHE_MAX_BYTES (largest body kept in the cache).
+"""
+
+from flask import current_app, request
+from Util import cache
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without brotli
+    brotli = None
+
+DEFAULTS = {
+    "COMPRESS_MIN_SIZE": 500,
+    "COMPRESS_LEVEL": 6,
+    "COMPRESS_BROTLI_QUALITY": 4,
+    "COMPRESS_CACHE_ENTRIES": 256,
+    "COMPRESS_CACHE_MAX_BYTES": 1024 * 1024,
+}
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/vnd.msgpack",
+    "application/vnd.apache.arrow.stream",
+    "image/svg+xml",
+)
+
+EXTENSION = "escola_compression"
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate():
+    """
+    :return: "br", "gzip" or None, following the client's Accept-Encoding
+    """
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compressible(response):
+    mimetype = response.mimetype or ""
+    return (
+        mimetype.startswith("text/")
+        or mimetype.endswith("+json")
+        or mimetype in COMPRESSIBLE_TYPES
+    )
+
+
+def _compressor(encoding, config):
+    if encoding == "br":
+        return brotli.Compressor(quality=config["COMPRESS_BROTLI_QUALITY"])
+    # wbits=31 selects the gzip container.
+    return zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 31)
+
+
+def compress(data, encoding, config):
+    """
+    Compress a whole body.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=config["COMPRESS_BROTLI_QUALITY"])
+    compressor = _compressor(encoding, config)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, config):
+    """
+    Compress an iterable of chunks lazily, flushing after each one.
+    """
+    compressor = _compressor(encoding, config)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if encoding == "br":
+                data = compressor.process(chunk) + compressor.flush()
+            else:
+                data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.finish() if encoding == "br" else compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _weaken_etag(response):
+    tag, weak = response.get_etag()
+    if tag and not weak:
+        response.set_etag(tag, weak=True)
+
+
+def _after_request(response):
+    config = current_app.extensions[EXTENSION]
+    if request.method == "HEAD" or "Content-Encoding" in response.headers:
+        return response
+    if response.status_code == 304:
+        # Same validator the 200 would have carried.
+        if negotiate() is not None:
+            _weaken_etag(response)
+        return response
+    if response.status_code < 200 or response.status_code == 204:
+        return response
+    if not compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, config)
+        response.headers.pop("Content-Length", None)
+    else:
+        # Files served by send_file (e.g. the Swagger UI assets) are in
+        # passthrough mode; they are small enough to be read in memory.
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        tag, weak = response.get_etag()
+        key = (tag, encoding) if tag and not weak else None
+        compressed = None if key is None else config["cache"].get(key)
+        if compressed is None:
+            compressed = compress(data, encoding, config)
+            if key is not None and len(data) <= config["COMPRESS_CACHE_MAX_BYTES"]:
+                config["cache"].set(key, compressed)
+        response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_app(app):
+    """
+    Compress the responses of a Flask app. Settings missing from app.config
+    take the values of DEFAULTS.
+    """
+    config = {name: app.config.get(name, value) for name, value in DEFAULTS.items()}
+    config["cache"] = cache.TTLCache(
+        "compressed_responses", max_entries=config["COMPRESS_CACHE_ENTRIES"]
+    )
+    app.extensions[EXTENSION] = config
+    app.after_request(_after_request)
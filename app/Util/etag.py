@@ -0,0 +1,128 @@
+"""
+Conditional GETs (ETag / If-None-Match) driven by per-table version counters.
+
+Each escola table has a version counter in Versoes_Tabelas (migration 0005).
+A GET decorated with conditional(<tables>) gets a strong ETag hashed from the
+versions of those tables and the request URL, so an unchanged table answers a
+matching If-None-Match with 304 before the view runs: no rows are read and no
+JSON is serialized.
+
+The trigger of every escola table increments the counter in the same
+transaction as the change, whoever makes it (this app with or without the
+change listener running, another service, psql), so the new version becomes
+visible at COMMIT together with the rows and a ROLLBACK undoes it. A table's
+version is the sum of 16 counter rows, each session incrementing the row of
+its backend pid, so concurrent writers to the same table rarely wait on one
+another's row lock.
+
+The versions themselves are cached in process and reloaded with a single
+query after any change notification (Util.notifications), after any
+successful write handled by this process, or after `etag_version_ttl`
+seconds as a safety net.
+"""
+
+from flask import current_app, make_response, request
+from Util import bd, cache, notifications
+import functools
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = "escola_etag"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+VERSIONS = cache.TTLCache(
+    "Versoes_Tabelas", ttl=float(bd.config.get("etag_version_ttl", 60))
+)
+
+
+def table_versions():
+    """
+    Current version of every table, from the in-process cache when possible.
+    :return: dict of lower-case table name to version
+    """
+    versions = VERSIONS.get("versoes")
+    if versions is None:
+        generation = VERSIONS.generation
+        conn = bd.get_connection()
+        if conn is None:
+            raise bd.OperationalError("Failed to connect to the database")
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "SELECT tabela, sum(versao)::bigint FROM Versoes_Tabelas GROUP BY tabela"
+            )
+            versions = dict(cursor.fetchall())
+        VERSIONS.set("versoes", versions, generation)
+    return versions
+
+
+def make_etag(tables, extra=""):
+    """
+    Strong ETag of the current request over the versions of `tables`.
+    The URL and the Accept header are part of the hash, since each
+    combination is a different representation.
+    :param extra: Any other input the response depends on
+    """
+    versions = table_versions()
+    digest = hashlib.sha1()
+    for table in tables:
+        digest.update(f"{table}={versions[table.lower()]};".encode())
+    digest.update(request.full_path.encode())
+    digest.update(request.headers.get("Accept", "").encode())
+    digest.update(extra.encode())
+    return digest.hexdigest()
+
+
+def conditional(*tables, key=None):
+    """
+    Decorate a GET view whose response depends only on `tables`.
+    Conditional handling is active on apps set up with init_app(); elsewhere
+    the view runs unchanged.
+    :param key: Optional callable returning a string with anything else the
+        response depends on (e.g. today's date), hashed into the ETag
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or EXTENSION not in current_app.extensions:
+                return view(*args, **kwargs)
+            try:
+                tag = make_etag(tables, key() if key else "")
+            except Exception as e:
+                logger.warning(f"ETag unavailable for {request.path}: {e}")
+                return view(*args, **kwargs)
+            # Weak comparison, as RFC 9110 prescribes for If-None-Match: the
+            # compression middleware hands out W/ versions of the same tag.
+            if request.if_none_match.contains_weak(tag):
+                response = current_app.response_class(status=304)
+                response.set_etag(tag)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(tag)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _after_request(response):
+    # The NOTIFY of a write made by this process arrives asynchronously; drop
+    # the versions now so the next GET here cannot reuse the old ones.
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        VERSIONS.invalidate()
+    return response
+
+
+def init_app(app):
+    """
+    Enable conditional GETs on a Flask app.
+    """
+    app.extensions[EXTENSION] = True
+    app.after_request(_after_request)
+
+
+notifications.subscribe(lambda table: VERSIONS.invalidate())
@@ -0,0 +1,243 @@
+"""
+Full-table exports in CSV, MessagePack and Arrow IPC for analytics clients.
+
+The format is negotiated from the Accept header (or forced with ?format=).
+Every format is produced in batches read and written one at a time, so
+memory stays bounded by the batch size whatever the table size, and all the
+batches are read in one REPEATABLE READ transaction, so the export is a
+consistent snapshot.
+
+- CSV is produced by PostgreSQL itself (COPY ... TO STDOUT), one primary-key
+  range of ITERSIZE rows per COPY.
+- MessagePack is a sequence of objects: the list of column names, then one
+  array per row (read it with msgpack.Unpacker).
+- Arrow IPC is a stream with one record batch per ITERSIZE rows.
+
+msgpack and pyarrow are optional; formats whose library is missing are
+simply not offered.
+"""
+
+from flask import Response, jsonify, request
+from Util import bd, query, streaming
+import datetime
+import decimal
+import io
+import itertools
+import logging
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - exercised only without msgpack
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - exercised only without pyarrow
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+ITERSIZE = streaming.ITERSIZE
+
+CSV = "text/csv"
+MSGPACK = "application/vnd.msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# ?format= value and file extension of each media type.
+NAMES = {CSV: "csv", MSGPACK: "msgpack", ARROW: "arrow"}
+ALIASES = {"application/msgpack": MSGPACK, "application/x-msgpack": MSGPACK}
+
+_cursor_ids = itertools.count()
+
+
+def available_formats():
+    formats = [CSV]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if pyarrow is not None:
+        formats.append(ARROW)
+    return formats
+
+
+def negotiate():
+    """
+    Media type of the export requested by the current request.
+    :return: one of available_formats(), or None when none is acceptable
+    """
+    formats = available_formats()
+    fmt = request.args.get("format")
+    if fmt:
+        by_name = {NAMES[media_type]: media_type for media_type in formats}
+        if fmt not in by_name:
+            raise query.QueryError(
+                f"Parâmetro 'format' deve ser {', '.join(sorted(by_name))}"
+            )
+        return by_name[fmt]
+    aliases = [alias for alias, media_type in ALIASES.items() if media_type in formats]
+    best = request.accept_mimetypes.best_match(formats + aliases)
+    return ALIASES.get(best, best)
+
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _arrow_type(name):
+    return {
+        "int32": pyarrow.int32(),
+        "int64": pyarrow.int64(),
+        "float64": pyarrow.float64(),
+        "date": pyarrow.date32(),
+        "bool": pyarrow.bool_(),
+        "string": pyarrow.string(),
+    }[name]
+
+
+def _begin_snapshot(cursor):
+    # psycopg2 has just opened the transaction implicitly; this must be its
+    # first statement.
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+
+
+def _csv_batches(conn, table, key, columns):
+    cursor = conn.cursor()
+    try:
+        _begin_snapshot(cursor)
+        lower = None
+        header = True
+        while True:
+            # Upper bound of the next ITERSIZE keys; None on the last batch.
+            cursor.execute(
+                f"SELECT {key} FROM {table}"
+                + ("" if lower is None else f" WHERE {key} > %s")
+                + f" ORDER BY {key} OFFSET %s LIMIT 1",
+                ([] if lower is None else [lower]) + [ITERSIZE - 1],
+            )
+            row = cursor.fetchone()
+            upper = None if row is None else row[0]
+            clauses = []
+            if lower is not None:
+                clauses.append(f"{key} > {int(lower)}")
+            if upper is not None:
+                clauses.append(f"{key} <= {int(upper)}")
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            buffer = io.BytesIO()
+            cursor.copy_expert(
+                f"COPY (SELECT {', '.join(columns)} FROM {table}{where}"
+                f" ORDER BY {key}) TO STDOUT WITH (FORMAT csv"
+                + (", HEADER true)" if header else ")"),
+                buffer,
+            )
+            header = False
+            yield buffer.getvalue()
+            if upper is None:
+                break
+            lower = upper
+    finally:
+        cursor.close()
+
+
+def _row_batches(conn, table, key, columns):
+    sql, values = query.ordered_select(table, key, columns=columns)
+    setup = conn.cursor()
+    try:
+        _begin_snapshot(setup)
+    finally:
+        setup.close()
+    cursor = conn.cursor(name=f"export_{table.lower()}_{next(_cursor_ids)}")
+    cursor.itersize = ITERSIZE
+    try:
+        cursor.execute(sql, values)
+        while True:
+            rows = cursor.fetchmany(ITERSIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _msgpack_chunks(conn, table, key, columns):
+    packer = msgpack.Packer(default=_msgpack_default)
+    yield packer.pack(list(columns))
+    for rows in _row_batches(conn, table, key, columns):
+        yield b"".join(packer.pack(row) for row in rows)
+
+
+def _arrow_chunks(conn, table, key, columns, types):
+    schema = pyarrow.schema([(name, _arrow_type(types[name])) for name in columns])
+    sink = io.BytesIO()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for rows in _row_batches(conn, table, key, columns):
+        arrays = []
+        for values, field in zip(zip(*rows), schema):
+            if field.type == pyarrow.float64():
+                # NUMERIC columns arrive as Decimal, which Arrow won't cast.
+                values = [None if value is None else float(value) for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+def export_table(table, key, columns, types):
+    """
+    Answer the current request with a full export of `table`.
+    :param key: Integer primary-key column, used to order and split batches
+    :param columns: Columns to export, key first
+    :param types: Arrow type name of each column (int32, int64, float64, date,
+        bool or string)
+    :return: streamed Response, or an error tuple (400, 406 or 500)
+    """
+    try:
+        media_type = negotiate()
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    if media_type is None:
+        return (
+            jsonify(
+                {"error": f"Formatos disponíveis: {', '.join(available_formats())}"}
+            ),
+            406,
+        )
+    conn = bd.create_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    if media_type == CSV:
+        chunks = _csv_batches(conn, table, key, columns)
+    elif media_type == MSGPACK:
+        chunks = _msgpack_chunks(conn, table, key, columns)
+    else:
+        chunks = _arrow_chunks(conn, table, key, columns, types)
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception:
+            logger.exception(f"Export of {table} aborted")
+            raise
+        finally:
+            chunks.close()
+            conn.close()
+
+    response = Response(generate(), mimetype=media_type)
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename={table.lower()}.{NAMES[media_type]}"
+    )
+    response.vary.add("Accept")
+    # Same safety net as streaming.stream_table().
+    response.call_on_close(conn.close)
+    return response
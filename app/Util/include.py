@@ -0,0 +1,89 @@
+"""
+Embedding of related rows in list responses (?include=).
+
+Each list route declares its relations as {name: (foreign-key column, table)}.
+For a page of items, every requested relation is loaded with a single
+fetch_by_keys() query over the distinct foreign-key values of the page, so a
+page costs one query plus one per included relation, whatever its size.
+"""
+
+from flask import request
+from Util import query
+
+# Key, columns and converters of each table that can be embedded.
+TABLES = {
+    "Alunos": (
+        "id_aluno",
+        ("id_aluno", "nome_completo", "data_nascimento", "id_turma"),
+        {"data_nascimento": query.isoformat},
+    ),
+    "Turmas": ("id_turma", ("id_turma", "nome_turma", "id_professor", "horario"), None),
+    "Professores": (
+        "id_professor",
+        ("id_professor", "nome_completo", "email", "telefone"),
+        None,
+    ),
+    "Disciplinas": (
+        "id_disciplina",
+        ("id_disciplina", "nome_disciplina", "id_professor"),
+        None,
+    ),
+}
+
+
+def include_args(relations):
+    """
+    Read the ?include= parameter of the current request.
+    :param relations: Relations the route supports
+    :return: tuple of requested relation names, in `relations` order
+    """
+    raw = request.args.get("include")
+    if not raw:
+        return ()
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(requested.difference(relations))
+    if unknown:
+        raise query.QueryError(
+            f"Relações inválidas em 'include': {', '.join(unknown)}"
+            f" (disponíveis: {', '.join(relations)})"
+        )
+    return tuple(name for name in relations if name in requested)
+
+
+def with_foreign_keys(columns, relations, names):
+    """
+    Add to `columns` the foreign keys the included relations are joined on.
+    """
+    extra = [relations[name][0] for name in names]
+    return tuple(columns) + tuple(
+        name for name in dict.fromkeys(extra) if name not in columns
+    )
+
+
+def embed(cursor, items, relations, names):
+    """
+    Embed the included relations into a page of serialized items.
+    :param items: dicts of one page; they are copied, not modified, so cached
+        pages can be passed in
+    :param names: Relation names returned by include_args()
+    :return: list of dicts with each relation under its name (None when the
+        foreign key is null or points to no row)
+    """
+    if not names:
+        return items
+    items = [dict(item) for item in items]
+    for name in names:
+        foreign_key, table = relations[name]
+        key, columns, converters = TABLES[table]
+        ids = tuple(
+            dict.fromkeys(
+                item[foreign_key] for item in items if item[foreign_key] is not None
+            )
+        )
+        related = {}
+        if ids:
+            rows, _ = query.fetch_by_keys(cursor, table, key, ids, columns)
+            related = {row[0]: query.to_dict(row, columns, converters) for row in rows}
+        for item in items:
+            item[name] = related.get(item[foreign_key])
+    return items
@@ -0,0 +1,83 @@
+"""
+JSON provider of the Flask app.
+
+OrjsonProvider encodes responses with orjson, which serializes lists of
+thousands of dicts several times faster than the standard library (see
+benchmarks/bench_json.py). orjson is optional: without it the app falls back
+to EscolaJSONProvider, built on Flask's default provider. Both write date and
+datetime values as ISO 8601 strings (Flask's default would use the HTTP date
+format) and Decimal values as numbers, so every blueprint gets the same
+representation whatever its columns hold.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+import datetime
+import decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return DefaultJSONProvider.default(value)
+
+
+class EscolaJSONProvider(DefaultJSONProvider):
+    """
+    Flask's default provider with ISO dates and numeric Decimals. Non-ASCII
+    text is written as UTF-8, as orjson does, instead of \\u escapes.
+    """
+
+    ensure_ascii = False
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(EscolaJSONProvider):
+    """
+    Provider backed by orjson. Calls passing standard-library options (indent,
+    separators...) are delegated to the parent provider.
+    """
+
+    def _options(self, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def provider_class():
+    """
+    :return: OrjsonProvider when orjson is installed, EscolaJSONProvider otherwise
+    """
+    return EscolaJSONProvider if orjson is None else OrjsonProvider
+
+
+def init_app(app):
+    """
+    Install the fastest available JSON provider on a Flask app.
+    """
+    app.json = provider_class()(app)
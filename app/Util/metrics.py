@@ -0,0 +1,204 @@
+"""
+Prometheus metrics for the Flask app, exposed at /metrics.
+
+Every request is measured per blueprint and route (the URL rule, not the raw
+path, so /api/alunos/1 and /api/alunos/2 share a series): latency, requests in
+flight, responses by status code, time spent in the database and rows fetched.
+The connection pool occupancy is published as well.
+
+With several worker processes each one keeps its own counters, so a scrape
+would only see the worker that answered it. Set PROMETHEUS_MULTIPROC_DIR to an
+empty writable directory before the workers start: prometheus_client then
+writes the samples to files in it and /metrics aggregates all of them. Call
+mark_process_dead() when a worker exits so its live gauges are dropped.
+"""
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from Util import bd
+import os
+import time
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROWS_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+# A private registry keeps the metrics out of prometheus_client's global one,
+# so the module can be imported more than once (tests) without clashes.
+REGISTRY = CollectorRegistry()
+
+REQUEST_LABELS = ("method", "blueprint", "route")
+
+REQUEST_LATENCY = Histogram(
+    "escola_http_request_duration_seconds",
+    "Time spent handling a request.",
+    REQUEST_LABELS,
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "escola_http_requests_in_progress",
+    "Requests currently being handled.",
+    REQUEST_LABELS,
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+RESPONSES = Counter(
+    "escola_http_responses_total",
+    "Responses sent, by status code.",
+    REQUEST_LABELS + ("status",),
+    registry=REGISTRY,
+)
+REQUEST_DB_TIME = Histogram(
+    "escola_http_request_db_seconds",
+    "Time a request spent waiting on the database.",
+    REQUEST_LABELS,
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUEST_DB_ROWS = Histogram(
+    "escola_http_request_db_rows",
+    "Rows fetched from the database by a request.",
+    REQUEST_LABELS,
+    buckets=ROWS_BUCKETS,
+    registry=REGISTRY,
+)
+POOL_CONNECTIONS = Gauge(
+    "escola_db_pool_connections",
+    "Connections of the database pool, by state.",
+    ("state",),
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+POOL_MAX_SIZE = Gauge(
+    "escola_db_pool_max_size",
+    "Maximum size of the database pool.",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "escola_cache_lookups_total",
+    "Lookups in the in-process reference-data cache.",
+    ("cache", "result"),
+    registry=REGISTRY,
+)
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get(MULTIPROC_ENV))
+
+
+def _labels():
+    rule = request.url_rule
+    return (
+        request.method,
+        request.blueprint or "",
+        rule.rule if rule is not None else "<unmatched>",
+    )
+
+
+def _record_query(seconds, rows):
+    if not has_request_context():
+        return
+    stats = g.get("_metrics")
+    if stats is not None:
+        stats["db_seconds"] += seconds
+        stats["db_rows"] += rows
+
+
+def update_pool_gauges():
+    """
+    Publish the occupancy of this process' connection pool.
+    """
+    stats = bd.pool_stats()
+    if stats is None:
+        return
+    for state in ("open", "idle", "in_use"):
+        POOL_CONNECTIONS.labels(state).set(stats[state])
+    POOL_MAX_SIZE.set(stats["max_size"])
+
+
+def _before_request():
+    labels = _labels()
+    g._metrics = {
+        "labels": labels,
+        "start": time.perf_counter(),
+        "db_seconds": 0.0,
+        "db_rows": 0,
+    }
+    REQUESTS_IN_PROGRESS.labels(*labels).inc()
+
+
+def _after_request(response):
+    stats = g.get("_metrics")
+    if stats is not None:
+        labels = stats["labels"]
+        REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - stats["start"])
+        RESPONSES.labels(*labels, str(response.status_code)).inc()
+        REQUEST_DB_TIME.labels(*labels).observe(stats["db_seconds"])
+        REQUEST_DB_ROWS.labels(*labels).observe(stats["db_rows"])
+    return response
+
+
+def _teardown_request(exception=None):
+    stats = g.pop("_metrics", None)
+    if stats is not None:
+        REQUESTS_IN_PROGRESS.labels(*stats["labels"]).dec()
+        update_pool_gauges()
+
+
+def metrics_view():
+    update_pool_gauges()
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid):
+    """
+    Drop the live gauges of a worker that exited (multi-process mode only).
+    """
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def init_app(app, path="/metrics"):
+    """
+    Instrument every request of a Flask app and expose the metrics at `path`.
+    Responses streamed by a generator are timed until the response object is
+    built; rows fetched while the body is being sent are not counted.
+    """
+    bd.add_query_listener(_record_query)
+
+    def before_request():
+        if request.path != path:
+            _before_request()
+
+    app.before_request(before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule(path, "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,214 @@
+"""
+Versioned schema migrations for the escola database.
+
+Each file in app/migrations is named NNNN_description.sql and is applied once,
+in version order; applied versions are recorded in the Migracoes table so an
+existing database can be upgraded in place. Files whose first line is
+"-- migracao: sem-transacao" run statement by statement in autocommit mode,
+which CREATE INDEX CONCURRENTLY requires; all other files run in a single
+transaction. If such a file fails halfway (e.g. a unique index build hits rows
+written since the migration's own cleanup), the statements before the failure
+stay applied and the migration is not recorded: running the migrations again
+repeats it from the start, dropping the invalid index left behind first.
+
+Usage (from the app directory): python -m Util.migrations
+"""
+
+import os
+import re
+import logging
+import psycopg2
+from Util import bd
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+NO_TRANSACTION_MARKER = "-- migracao: sem-transacao"
+# Arbitrary key for pg_advisory_lock so concurrent runners never overlap.
+LOCK_KEY = 7_204_113
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE,
+)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS Migracoes (
+    versao VARCHAR(4) PRIMARY KEY,
+    nome VARCHAR(255) NOT NULL,
+    aplicada_em TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """
+    List the migration files of `directory`.
+    :return: list of (version, name, path) sorted by version
+    """
+    found = []
+    for filename in os.listdir(directory):
+        match = _FILE_RE.match(filename)
+        if match:
+            found.append(
+                (match.group(1), match.group(2), os.path.join(directory, filename))
+            )
+    found.sort()
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in " + directory)
+    return found
+
+
+def split_statements(sql):
+    """
+    Split a SQL script into statements on top-level semicolons, ignoring those
+    inside quotes and dollar-quoted bodies. Top-level -- comments are dropped.
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end
+        elif char == "'":
+            end = i + 1
+            while end < length:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                elif sql[end] == "'":
+                    break
+                else:
+                    end += 1
+            current.append(sql[i : end + 1])
+            i = end + 1
+        elif char == "$":
+            match = re.match(r"\$\w*\$", sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = length if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+            else:
+                current.append(char)
+                i += 1
+        elif char == ";":
+            statements.append("".join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append("".join(current))
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def _drop_invalid_index(cursor, statement):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # IF NOT EXISTS would then silently keep. Drop it so the retry rebuilds it.
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    if not match:
+        return
+    cursor.execute(
+        """
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+        """,
+        (match.group(1).lower(),),
+    )
+    if cursor.fetchone():
+        logger.warning(f"Dropping invalid index {match.group(1)} before retrying")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+
+def apply(conn, version, name, sql):
+    """
+    Apply a single migration and record it in Migracoes.
+    :param conn: Raw connection in autocommit mode
+    """
+    cursor = conn.cursor()
+    try:
+        if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+            for statement in split_statements(sql):
+                _drop_invalid_index(cursor, statement)
+                try:
+                    cursor.execute(statement)
+                except Exception:
+                    logger.error(
+                        f"Migration {version}_{name} failed outside a transaction;"
+                        " the statements before the failure stay applied. Fix the"
+                        " cause and run the migrations again to repeat it"
+                    )
+                    raise
+            cursor.execute(
+                "INSERT INTO Migracoes (versao, nome) VALUES (%s, %s)",
+                (version, name),
+            )
+        else:
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO Migracoes (versao, nome) VALUES (%s, %s)",
+                    (version, name),
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        cursor.close()
+
+
+def migrate(conn=None, directory=MIGRATIONS_DIR):
+    """
+    Apply every pending migration, holding an advisory lock meanwhile.
+    :param conn: Raw psycopg2 connection; a dedicated one is opened by default
+    :return: list of versions applied
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = bd._connect()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    applied_now = []
+    try:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            cursor.execute(CREATE_TABLE)
+            cursor.execute("SELECT versao FROM Migracoes")
+            applied = {row[0] for row in cursor.fetchall()}
+            for version, name, path in discover(directory):
+                if version in applied:
+                    continue
+                with open(path, "r", encoding="utf-8") as migration_file:
+                    sql = migration_file.read()
+                logger.info(f"Applying migration {version}_{name}")
+                apply(conn, version, name, sql)
+                applied_now.append(version)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return applied_now
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    try:
+        versions = migrate()
+    except psycopg2.Error as e:
+        logger.error(f"Migration failed: {e}")
+        raise SystemExit(1)
+    logger.info(
+        f"Applied migrations: {', '.join(versions)}"
+        if versions
+        else "Database schema is up to date"
+    )
@@ -0,0 +1,119 @@
+"""
+Table-change notifications from PostgreSQL (LISTEN/NOTIFY).
+
+The trigger installed by migration 0004 runs pg_notify('escola_alteracoes',
+<table>) after every statement that writes to an escola table. Each worker
+process starts one listener thread that keeps a dedicated connection
+LISTENing on that channel and calls the subscribed callbacks with the name of
+the changed table, so in-process caches are evicted no matter which worker
+(or node) made the change. Some tables also notify a finer-grained
+'<table>:<key>' payload (migration 0006: 'notas:<id_aluno>'); subscribers
+that do not know it simply find no cache by that name.
+"""
+
+from Util import bd
+import logging
+import select
+import threading
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "escola_alteracoes"
+POLL_TIMEOUT = 5.0
+RECONNECT_DELAY = float(bd.config.get("notify_reconnect_delay", 5))
+
+_subscribers = []
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """
+    Register a callable(table) run for every change notification.
+    `table` is the lower-case table name, or None when notifications may have
+    been missed (listener reconnected) and everything must be considered stale.
+    """
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+
+
+def publish(table):
+    for callback in _subscribers:
+        try:
+            callback(table)
+        except Exception:
+            logger.exception(f"Change notification handler failed for {table}")
+
+
+def dispatch(conn):
+    """
+    Read the pending notifications of `conn` and publish each changed table
+    once, however many notifications arrived for it.
+    :return: set of tables published
+    """
+    conn.poll()
+    tables = set()
+    while conn.notifies:
+        tables.add(conn.notifies.pop(0).payload.lower())
+    for table in sorted(tables):
+        publish(table)
+    return tables
+
+
+class Listener(threading.Thread):
+    """
+    Daemon thread that LISTENs on CHANNEL and publishes the changed tables.
+    The connection is reopened after any failure; since notifications sent
+    while disconnected are lost, publish(None) is called on every (re)connect.
+    """
+
+    def __init__(self, connect=bd._connect):
+        super().__init__(name="escola-notify-listener", daemon=True)
+        self._connect = connect
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def listen(self):
+        conn = self._connect()
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f"LISTEN {CHANNEL}")
+        cursor.close()
+        return conn
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self.listen()
+                publish(None)
+                logger.info(f"Listening for table changes on {CHANNEL}")
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([conn], [], [], POLL_TIMEOUT)
+                    if readable:
+                        dispatch(conn)
+            except Exception as e:
+                logger.error(f"Change listener disconnected: {e}")
+                self._stop_event.wait(RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+def start():
+    """
+    Start this process' listener thread, once. Call it in each worker after
+    fork: threads are not inherited by forked children.
+    :return: Listener
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = Listener()
+            _listener.start()
+        return _listener
@@ -0,0 +1,279 @@
+from flask import request, jsonify
+from urllib.parse import urlencode
+import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+COLUMNAR_MIMETYPE = "application/vnd.escola.columns+json"
+
+
+class QueryError(ValueError):
+    """
+    Raised when a list endpoint receives invalid query-string parameters.
+    """
+
+
+def limit_arg():
+    """
+    Read the ?limit= page size of the current request, capped at MAX_PAGE_SIZE.
+    :return: int
+    """
+    raw_limit = request.args.get("limit")
+    try:
+        limit = DEFAULT_PAGE_SIZE if raw_limit is None else int(raw_limit)
+    except ValueError:
+        raise QueryError("Parâmetro 'limit' deve ser um número inteiro")
+    if limit < 1:
+        raise QueryError("Parâmetro 'limit' deve ser maior que zero")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def page_args(key_size=1):
+    """
+    Read the keyset pagination parameters (?limit=&after=) of the current request.
+    The page size is always capped at MAX_PAGE_SIZE, even if no limit is sent.
+    :param key_size: Number of columns of the ordering key (2 for composite keys)
+    :return: (limit, after) where after is None or a tuple of ints
+    """
+    limit = limit_arg()
+
+    raw_after = request.args.get("after")
+    after = None
+    if raw_after:
+        try:
+            after = tuple(int(part) for part in raw_after.split(","))
+        except ValueError:
+            raise QueryError("Parâmetro 'after' inválido")
+        if len(after) != key_size:
+            raise QueryError("Parâmetro 'after' inválido")
+    return limit, after
+
+
+def field_args(columns, key):
+    """
+    Read the ?fields= projection of the current request.
+    Every requested field must belong to the table whitelist `columns`; the
+    primary key is always selected so rows can be identified and paginated.
+    :param columns: Whitelist of selectable columns, in table order
+    :param key: Primary-key column name, or a tuple of names
+    :return: tuple of columns to select, key first
+    """
+    key = (key,) if isinstance(key, str) else tuple(key)
+    raw = request.args.get("fields")
+    if not raw:
+        return tuple(columns)
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(requested.difference(columns))
+    if unknown:
+        raise QueryError(f"Campos inválidos em 'fields': {', '.join(unknown)}")
+    return key + tuple(
+        name for name in columns if name in requested and name not in key
+    )
+
+
+def ids_args():
+    """
+    Read the ?ids= multi-get parameter of the current request.
+    Repeated IDs are kept once, in the position of their first occurrence.
+    :return: tuple of ints in request order, or None when absent
+    """
+    raw = request.args.get("ids")
+    if raw is None:
+        return None
+    try:
+        ids = tuple(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise QueryError("Parâmetro 'ids' deve ser uma lista de números inteiros")
+    if not ids:
+        raise QueryError("Parâmetro 'ids' deve ser uma lista de números inteiros")
+    if len(ids) > MAX_PAGE_SIZE:
+        raise QueryError(f"Parâmetro 'ids' aceita no máximo {MAX_PAGE_SIZE} IDs")
+    return ids
+
+
+def parse_date(value):
+    """
+    Parse an ISO date (YYYY-MM-DD) received in the query string.
+    """
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"Data inválida: '{value}' (use AAAA-MM-DD)")
+
+
+def parse_month(value):
+    """
+    Parse a month (YYYY-MM) received in the query string.
+    :return: date of the first day of the month
+    """
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise QueryError(f"Mês inválido: '{value}' (use AAAA-MM)")
+
+
+def filter_args(filters):
+    """
+    Compile the filters present in the query string into parameterized SQL.
+    :param filters: dict mapping a query parameter to (SQL condition with one
+        %s placeholder, parser of the raw value)
+    :return: (where, params) ready for ordered_select()/keyset_page()
+    """
+    where = []
+    params = []
+    for name, (condition, parse) in filters.items():
+        raw = request.args.get(name)
+        if raw is None or raw == "":
+            continue
+        try:
+            value = parse(raw)
+        except QueryError:
+            raise
+        except ValueError:
+            raise QueryError(f"Valor inválido para o filtro '{name}'")
+        where.append(condition)
+        params.append(value)
+    return where, params
+
+
+def to_dict(row, columns, converters=None):
+    """
+    Turn a row tuple into a dict keyed by `columns`, applying the optional
+    per-column converters to non-null values.
+    """
+    if not converters:
+        return dict(zip(columns, row))
+    item = {}
+    for name, value in zip(columns, row):
+        converter = converters.get(name)
+        item[name] = converter(value) if converter and value is not None else value
+    return item
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def fetch_by_key(cursor, table, key, value, columns):
+    """
+    Fetch the `columns` of the single row of `table` whose `key` equals `value`.
+    :return: row tuple or None
+    """
+    cursor.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE {key} = %s", (value,)
+    )
+    return cursor.fetchone()
+
+
+def fetch_by_keys(cursor, table, key, ids, columns, where=(), params=()):
+    """
+    Fetch the rows of `table` whose `key` is in `ids` with a single
+    `key = ANY(%s)` query.
+    :param columns: Columns to select, key first (as returned by field_args())
+    :param where: Extra SQL conditions joined with AND
+    :param params: Values for the placeholders in `where`
+    :return: (rows in the order of `ids`, ids without a matching row)
+    """
+    clauses = list(where) + [f"{key} = ANY(%s)"]
+    cursor.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(clauses)}",
+        list(params) + [list(ids)],
+    )
+    by_key = {row[0]: row for row in cursor.fetchall()}
+    rows = [by_key[value] for value in ids if value in by_key]
+    missing = [value for value in ids if value not in by_key]
+    return rows, missing
+
+
+def ordered_select(table, key, after=None, where=(), params=(), columns=None):
+    """
+    Build a SELECT over `table` ordered by `key`, starting after the `after` cursor.
+    :param key: Primary-key column name, or a tuple of names for composite keys
+    :param where: Extra SQL conditions joined with AND
+    :param params: Values for the placeholders in `where`
+    :param columns: Columns to select; defaults to all, with the key first
+    :return: (sql, values)
+    """
+    key = (key,) if isinstance(key, str) else tuple(key)
+    clauses = list(where)
+    values = list(params)
+    if after is not None:
+        placeholders = ", ".join(["%s"] * len(key))
+        clauses.append(f"({', '.join(key)}) > ({placeholders})")
+        values.extend(after)
+    sql = f"SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {', '.join(key)}"
+    return sql, values
+
+
+def keyset_page(
+    cursor, table, key, limit, after=None, where=(), params=(), columns=None
+):
+    """
+    Fetch one page of `table` ordered by its primary key, starting after `after`.
+    One extra row is requested to know whether a next page exists.
+    Arguments are the same as ordered_select().
+    :return: (rows, next_after) where next_after is None on the last page
+    """
+    key = (key,) if isinstance(key, str) else tuple(key)
+    sql, values = ordered_select(table, key, after, where, params, columns)
+    cursor.execute(sql + " LIMIT %s", values + [limit + 1])
+    rows = cursor.fetchall()
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        positions = (
+            [columns.index(name) for name in key] if columns else range(len(key))
+        )
+        next_after = tuple(rows[-1][i] for i in positions)
+    return rows, next_after
+
+
+def _add_next_page(response, next_after, limit, missing=(), cursor_param="after"):
+    response.vary.add("Accept")
+    if missing:
+        response.headers["X-Missing-Ids"] = ",".join(str(value) for value in missing)
+    if next_after is not None:
+        cursor = ",".join(str(value) for value in next_after)
+        args = request.args.to_dict()
+        args.update({cursor_param: cursor, "limit": str(limit)})
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response, 200
+
+
+def page_response(items, next_after, limit, missing=(), cursor_param="after"):
+    """
+    Build the JSON response for a page. The body stays a plain array; the
+    cursor of the next page goes in the X-Next-Cursor and Link headers, and
+    the requested ?ids= that were not found in X-Missing-Ids.
+    :param cursor_param: Query parameter that receives the cursor in the Link
+    """
+    return _add_next_page(jsonify(items), next_after, limit, missing, cursor_param)
+
+
+def columnar_requested():
+    """
+    Whether the current request asks for the columnar format, through
+    ?format=columnar or an Accept header preferring COLUMNAR_MIMETYPE.
+    """
+    fmt = request.args.get("format")
+    if fmt:
+        if fmt not in ("json", "columnar"):
+            raise QueryError("Parâmetro 'format' deve ser 'json' ou 'columnar'")
+        return fmt == "columnar"
+    best = request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE])
+    return best == COLUMNAR_MIMETYPE
+
+
+def columnar_response(columns, rows, next_after, limit, missing=()):
+    """
+    Build a page as {"columns": [...], "rows": [[...], ...]} straight from the
+    cursor tuples, without building a dict per row. Values are encoded by the
+    app's JSON provider (ISO dates, numeric Decimals).
+    """
+    response = jsonify({"columns": list(columns), "rows": rows})
+    response.mimetype = COLUMNAR_MIMETYPE
+    return _add_next_page(response, next_after, limit, missing)
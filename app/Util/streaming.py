@@ -0,0 +1,107 @@
+from flask import Response, current_app, jsonify, request
+from Util import bd, query
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+ITERSIZE = int(bd.config.get("stream_itersize", 2000))
+
+FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+_cursor_ids = itertools.count()
+
+
+def stream_format():
+    """
+    Streaming format requested by the current request (?stream=json|ndjson).
+    :return: "json", "ndjson" or None when the client wants a regular page
+    """
+    mode = request.args.get("stream")
+    if not mode:
+        return None
+    if mode not in FORMATS:
+        raise query.QueryError("Parâmetro 'stream' deve ser 'json' ou 'ndjson'")
+    return mode
+
+
+def stream_table(fmt, table, key, columns, serialize, after=None, where=(), params=()):
+    """
+    Stream every row of `table` through a server-side (named) cursor.
+
+    Rows are fetched from PostgreSQL in batches of ITERSIZE and written out as
+    soon as each batch arrives, either as the chunks of one JSON array or as
+    NDJSON lines, so memory stays flat regardless of the table size.
+
+    The generator outlives the view, so it checks out its own pooled
+    connection instead of the request-scoped one.
+    :param fmt: "json" or "ndjson"
+    :param columns: Columns to select, key first
+    :param serialize: Function turning a row tuple and its columns into a dict
+    :return: Flask Response
+    """
+    conn = bd.create_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    sql, values = query.ordered_select(table, key, after, where, params, columns)
+    dumps = current_app.json.dumps
+
+    def generate():
+        cursor = conn.cursor(name=f"stream_{table.lower()}_{next(_cursor_ids)}")
+        cursor.itersize = ITERSIZE
+        first = True
+        try:
+            cursor.execute(sql, values)
+            if fmt == "json":
+                yield "["
+            while True:
+                rows = cursor.fetchmany(ITERSIZE)
+                if not rows:
+                    break
+                items = [dumps(serialize(row, columns)) for row in rows]
+                if fmt == "ndjson":
+                    yield "\n".join(items) + "\n"
+                else:
+                    yield ("" if first else ",") + ",".join(items)
+                first = False
+            if fmt == "json":
+                yield "]"
+        except Exception:
+            logger.exception(f"Streaming of {table} aborted")
+            raise
+        finally:
+            try:
+                cursor.close()
+            finally:
+                conn.close()
+
+    response = Response(generate(), mimetype=FORMATS[fmt])
+    # If the client goes away before the first chunk the generator never
+    # runs its finally block; make sure the connection still goes back.
+    response.call_on_close(conn.close)
+    return response
+
+
+def maybe_stream(table, key, columns, serialize, where=(), params=(), filters=None):
+    """
+    Answer the current request with stream_table() when it asks for ?stream=.
+    :param columns: Column whitelist of the table, narrowed by ?fields=
+    :param filters: Optional query-string filters, see query.filter_args()
+    :return: Response (or error tuple) when streaming, None otherwise
+    """
+    try:
+        fmt = stream_format()
+        if fmt is None:
+            return None
+        _, after = query.page_args(1 if isinstance(key, str) else len(key))
+        columns = query.field_args(columns, key)
+        if filters:
+            extra_where, extra_params = query.filter_args(filters)
+            where = list(where) + extra_where
+            params = list(params) + extra_params
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return stream_table(fmt, table, key, columns, serialize, after, where, params)
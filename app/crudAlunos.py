@@ -1,21 +1,233 @@
 from flask import request, jsonify, Blueprint
-from Util import bd
+from Util import bd, etag, include, query, streaming
 import logging
 
 logger = logging.getLogger(__name__)
 alunos_bp = Blueprint("alunos", __name__)
 
 
+COLUNAS = (
+    "id_aluno",
+    "nome_completo",
+    "data_nascimento",
+    "id_turma",
+    "nome_responsavel",
+    "telefone_responsavel",
+    "email_responsavel",
+    "informacoes_adicionais",
+)
+# Relações que ?include= embute: nome -> (chave estrangeira, tabela).
+RELACOES = {"turma": ("id_turma", "Turmas")}
+
+# Linha do tempo do aluno: tipo do evento, tabela, chave, coluna de data e
+# detalhes de cada fonte. Cada fonte é lida pelo índice (id_aluno, data, chave)
+# já na ordem da linha do tempo, então uma página custa o mesmo em qualquer
+# profundidade.
+FONTES_TIMELINE = (
+    (
+        "frequencia",
+        "Frequencias",
+        "id_frequencia",
+        "data_aula",
+        "json_build_object('id_disciplina', id_disciplina, 'presente', presente)",
+    ),
+    (
+        "nota",
+        "Notas",
+        "id_nota",
+        "data_avaliacao",
+        "json_build_object('id_disciplina', id_disciplina, 'valor_nota', valor_nota)",
+    ),
+    (
+        "pagamento",
+        "Pagamentos",
+        "id_pagamento",
+        "data_pagamento",
+        "json_build_object('valor_pago', valor_pago, 'status', status,"
+        " 'referencia', referencia)",
+    ),
+    (
+        "presenca",
+        "Presencas",
+        "id_presenca",
+        "data_presenca",
+        "json_build_object('presente', presente)",
+    ),
+)
+TIPOS_TIMELINE = tuple(fonte[0] for fonte in FONTES_TIMELINE)
+COLUNAS_TIMELINE = ("tipo", "id", "data", "detalhes")
+
+# Busca de alunos (migrações 0009 e 0010): o texto pesquisado é a mesma
+# expressão dos índices idx_alunos_busca_trgm e idx_alunos_busca_fts, para que
+# o PostgreSQL os use. Os candidatos vêm de duas fontes limitadas: o índice
+# GiST entrega os `candidatos` mais parecidos por trigramas (que tolera erros
+# de digitação e trechos de palavra), em ordem de semelhança, e o índice GIN
+# acrescenta até `candidatos` alunos que casam com o texto completo em
+# português (radicais: "alunas" acha "aluno") sem serem próximos por
+# trigramas. Só esses são ranqueados, somando a semelhança e o rank do texto
+# completo. O ramo do texto completo não tem ORDER BY: ordenar por ts_rank
+# recalcularia o tsvector de todas as linhas que casam.
+DOCUMENTO_BUSCA = (
+    "texto_busca_aluno(nome_completo, nome_responsavel, email_responsavel)"
+)
+SQL_BUSCA = f"""
+    WITH candidatos AS (
+        (SELECT id_aluno FROM Alunos
+         WHERE normalizar_busca(%(q)s) <%% {DOCUMENTO_BUSCA}
+         ORDER BY normalizar_busca(%(q)s) <<-> {DOCUMENTO_BUSCA}
+         LIMIT %(candidatos)s)
+        UNION
+        (SELECT id_aluno FROM Alunos
+         WHERE to_tsvector('portuguese', {DOCUMENTO_BUSCA})
+               @@ plainto_tsquery('portuguese', normalizar_busca(%(q)s))
+         LIMIT %(candidatos)s)
+    )
+    SELECT id_aluno, nome_completo, data_nascimento, id_turma,
+           nome_responsavel, email_responsavel,
+           word_similarity(normalizar_busca(%(q)s), {DOCUMENTO_BUSCA})
+           + ts_rank(
+               to_tsvector('portuguese', {DOCUMENTO_BUSCA}),
+               plainto_tsquery('portuguese', normalizar_busca(%(q)s))
+           ) AS relevancia
+    FROM Alunos
+    JOIN candidatos USING (id_aluno)
+    ORDER BY relevancia DESC, nome_completo, id_aluno
+    LIMIT %(limit)s
+"""
+COLUNAS_BUSCA = (
+    "id_aluno",
+    "nome_completo",
+    "data_nascimento",
+    "id_turma",
+    "nome_responsavel",
+    "email_responsavel",
+    "relevancia",
+)
+SIMILARIDADE_MINIMA = float(bd.config.get("busca_similaridade_minima", 0.4))
+TAMANHO_MINIMO_BUSCA = 3
+CANDIDATOS_BUSCA = 50
+
+
+def serializar_aluno(aluno, colunas=COLUNAS):
+    return query.to_dict(aluno, colunas)
+
+
+def parametros_busca(termo, limit):
+    """
+    Parâmetros de SQL_BUSCA: cada índice fornece pelo menos uma página de
+    candidatos, e nunca menos que CANDIDATOS_BUSCA.
+    """
+    return {"q": termo, "limit": limit, "candidatos": max(limit, CANDIDATOS_BUSCA)}
+
+
+def cursor_timeline():
+    """
+    Lê ?before=: uma data (eventos anteriores a ela) ou o cursor
+    AAAA-MM-DD,tipo,id devolvido em X-Next-Cursor.
+    :return: (data, tipo, id), com tipo e id None para uma data simples, ou None
+    """
+    raw = request.args.get("before")
+    if not raw:
+        return None
+    partes = raw.split(",")
+    data = query.parse_date(partes[0])
+    if len(partes) == 1:
+        return data, None, None
+    if len(partes) != 3 or partes[1] not in TIPOS_TIMELINE:
+        raise query.QueryError("Parâmetro 'before' inválido")
+    try:
+        return data, partes[1], int(partes[2])
+    except ValueError:
+        raise query.QueryError("Parâmetro 'before' inválido")
+
+
+def sql_timeline(id_aluno, antes, limit):
+    """
+    Monta o UNION ALL das fontes da linha do tempo, ordenado do mais recente
+    para o mais antigo por (data, tipo, id) e começando depois do cursor.
+    Cada ramo já vem limitado, para que o banco leia no máximo limit + 1
+    linhas de cada índice.
+    :return: (sql, valores)
+    """
+    ramos = []
+    valores = []
+    for tipo, tabela, chave, data, detalhes in FONTES_TIMELINE:
+        where = ["id_aluno = %s"]
+        valores.append(id_aluno)
+        if antes is not None:
+            data_cursor, tipo_cursor, id_cursor = antes
+            # (data, tipo, id) < cursor, escrito por ramo para usar o índice.
+            if tipo_cursor is None or tipo > tipo_cursor:
+                where.append(f"{data} < %s")
+                valores.append(data_cursor)
+            elif tipo < tipo_cursor:
+                where.append(f"{data} <= %s")
+                valores.append(data_cursor)
+            else:
+                where.append(f"({data}, {chave}) < (%s, %s)")
+                valores.extend([data_cursor, id_cursor])
+        ramos.append(
+            f"(SELECT '{tipo}' AS tipo, {chave} AS id, {data} AS data,"
+            f" {detalhes} AS detalhes FROM {tabela}"
+            f" WHERE {' AND '.join(where)}"
+            f" ORDER BY {data} DESC, {chave} DESC LIMIT %s)"
+        )
+        valores.append(limit + 1)
+    sql = " UNION ALL ".join(ramos) + " ORDER BY data DESC, tipo DESC, id DESC LIMIT %s"
+    valores.append(limit + 1)
+    return sql, valores
+
+
 @alunos_bp.route("/alunos", methods=["GET"])
+@etag.conditional("Alunos", "Turmas")
 def listar_alunos():
     """
     Lista todos os alunos.
     ---
     tags:
       - Alunos
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_aluno maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: "Relações a embutir em cada registro, separadas por vírgula (turma). Cada relação é carregada com uma única consulta por página."
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Exporta a tabela inteira em streaming (array JSON ou NDJSON), ignorando 'limit'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de alunos retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -46,39 +258,148 @@ def listar_alunos():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    stream = streaming.maybe_stream("Alunos", "id_aluno", COLUNAS, serializar_aluno)
+    if stream is not None:
+        return stream
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Alunos")
-        alunos = cursor.fetchall()
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            incluir = include.include_args(RELACOES)
+            colunas = include.with_foreign_keys(
+                query.field_args(COLUNAS, "id_aluno"), RELACOES, incluir
+            )
+            ids = query.ids_args()
+            if ids is not None:
+                alunos, faltando = query.fetch_by_keys(
+                    cursor, "Alunos", "id_aluno", ids, colunas
+                )
+                return query.page_response(
+                    include.embed(
+                        cursor,
+                        [serializar_aluno(aluno, colunas) for aluno in alunos],
+                        RELACOES,
+                        incluir,
+                    ),
+                    None,
+                    limit,
+                    faltando,
+                )
+            alunos, next_after = query.keyset_page(
+                cursor, "Alunos", "id_aluno", limit, after, columns=colunas
+            )
+            return query.page_response(
+                include.embed(
+                    cursor,
+                    [serializar_aluno(aluno, colunas) for aluno in alunos],
+                    RELACOES,
+                    incluir,
+                ),
+                next_after,
+                limit,
+            )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@alunos_bp.route("/alunos/busca", methods=["GET"])
+@etag.conditional("Alunos")
+def buscar_alunos_por_texto():
+    """
+    Busca alunos pelo nome do aluno, nome do responsável ou e-mail do responsável (parte antes do '@').
+    Ignora acentos e maiúsculas, tolera erros de digitação e trechos de nome, e ordena pela relevância.
+    ---
+    tags:
+      - Alunos
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Texto buscado (pelo menos 3 caracteres).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de resultados (padrão 100, máximo 1000).
+    responses:
+      200:
+        description: Alunos encontrados, do mais relevante para o menos relevante.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id_aluno:
+                type: integer
+              nome_completo:
+                type: string
+              data_nascimento:
+                type: string
+                format: date
+              id_turma:
+                type: integer
+              nome_responsavel:
+                type: string
+              email_responsavel:
+                type: string
+              relevancia:
+                type: number
+                format: float
+      400:
+        description: Texto de busca ausente ou curto demais.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      500:
+        description: Erro de conexão com o banco de dados.
+    """
+    termo = (request.args.get("q") or "").strip()
+    if len(termo) < TAMANHO_MINIMO_BUSCA:
         return (
             jsonify(
-                [
-                    {
-                        "id_aluno": aluno[0],
-                        "nome_completo": aluno[1],
-                        "data_nascimento": aluno[2],
-                        "id_turma": aluno[3],
-                        "nome_responsavel": aluno[4],
-                        "telefone_responsavel": aluno[5],
-                        "email_responsavel": aluno[6],
-                        "informacoes_adicionais": aluno[7],
-                    }
-                    for aluno in alunos
-                ]
+                {
+                    "error": f"Parâmetro 'q' deve ter pelo menos {TAMANHO_MINIMO_BUSCA} caracteres"
+                }
             ),
-            200,
+            400,
+        )
+    try:
+        limit = query.limit_arg()
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = bd.get_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    try:
+        with bd.transaction(conn) as cursor:
+            # Vale só para esta transação.
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                (str(SIMILARIDADE_MINIMA),),
+            )
+            cursor.execute(SQL_BUSCA, parametros_busca(termo, limit))
+            alunos = cursor.fetchall()
+        return jsonify(
+            [
+                query.to_dict(
+                    aluno,
+                    COLUNAS_BUSCA,
+                    {"data_nascimento": query.isoformat, "relevancia": float},
+                )
+                for aluno in alunos
+            ]
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @alunos_bp.route("/alunos/<int:id_aluno>", methods=["GET"])
+@etag.conditional("Alunos")
 def buscar_aluno(id_aluno):
     """
     Busca um aluno pelo ID.
@@ -91,6 +412,11 @@ def buscar_aluno(id_aluno):
         required: true
         type: integer
         description: ID do aluno a ser buscado.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Aluno encontrado com sucesso.
@@ -119,35 +445,21 @@ def buscar_aluno(id_aluno):
       500:
         description: Erro de conexão com o banco de dados.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Alunos WHERE id_aluno = %s", (id_aluno,))
-        aluno = cursor.fetchone()
-        if aluno is None:
-            return jsonify({"error": "Aluno não encontrado"}), 404
-        return (
-            jsonify(
-                {
-                    "id_aluno": aluno[0],
-                    "nome_completo": aluno[1],
-                    "data_nascimento": aluno[2],
-                    "id_turma": aluno[3],
-                    "nome_responsavel": aluno[4],
-                    "telefone_responsavel": aluno[5],
-                    "email_responsavel": aluno[6],
-                    "informacoes_adicionais": aluno[7],
-                }
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            colunas = query.field_args(COLUNAS, "id_aluno")
+            aluno = query.fetch_by_key(cursor, "Alunos", "id_aluno", id_aluno, colunas)
+            if aluno is None:
+                return jsonify({"error": "Aluno não encontrado"}), 404
+            return (
+                jsonify(serializar_aluno(aluno, colunas)),
+                200,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @alunos_bp.route("/alunos", methods=["POST"])
@@ -186,34 +498,29 @@ def cadastrar_aluno():
         description: Erro ao criar aluno.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Alunos (nome_completo, data_nascimento, id_turma, nome_responsavel, telefone_responsavel, email_responsavel, informacoes_adicionais)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["nome_completo"],
-                data["data_nascimento"],
-                data.get("id_turma"),
-                data["nome_responsavel"],
-                data["telefone_responsavel"],
-                data["email_responsavel"],
-                data.get("informacoes_adicionais"),
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Alunos (nome_completo, data_nascimento, id_turma, nome_responsavel, telefone_responsavel, email_responsavel, informacoes_adicionais)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["nome_completo"],
+                    data["data_nascimento"],
+                    data.get("id_turma"),
+                    data["nome_responsavel"],
+                    data["telefone_responsavel"],
+                    data["email_responsavel"],
+                    data.get("informacoes_adicionais"),
+                ),
+            )
         return jsonify({"message": "Aluno cadastrado com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @alunos_bp.route("/alunos/<int:id_aluno>", methods=["PUT"])
@@ -257,36 +564,31 @@ def alterar_aluno(id_aluno):
         description: Erro ao atualizar os dados do aluno.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Alunos
-            SET nome_completo = %s, data_nascimento = %s, id_turma = %s, nome_responsavel = %s, telefone_responsavel = %s, email_responsavel = %s, informacoes_adicionais = %s
-            WHERE id_aluno = %s
-            """,
-            (
-                data["nome_completo"],
-                data["data_nascimento"],
-                data.get("id_turma"),
-                data["nome_responsavel"],
-                data["telefone_responsavel"],
-                data["email_responsavel"],
-                data.get("informacoes_adicionais"),
-                id_aluno,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Alunos
+                SET nome_completo = %s, data_nascimento = %s, id_turma = %s, nome_responsavel = %s, telefone_responsavel = %s, email_responsavel = %s, informacoes_adicionais = %s
+                WHERE id_aluno = %s
+                """,
+                (
+                    data["nome_completo"],
+                    data["data_nascimento"],
+                    data.get("id_turma"),
+                    data["nome_responsavel"],
+                    data["telefone_responsavel"],
+                    data["email_responsavel"],
+                    data.get("informacoes_adicionais"),
+                    id_aluno,
+                ),
+            )
         return jsonify({"message": "Dados do aluno atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @alunos_bp.route("/alunos/<int:id_aluno>", methods=["DELETE"])
@@ -325,17 +627,112 @@ def excluir_aluno(id_aluno):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Alunos WHERE id_aluno = %s", (id_aluno,))
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute("DELETE FROM Alunos WHERE id_aluno = %s", (id_aluno,))
         return jsonify({"message": "Aluno excluído com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@alunos_bp.route("/alunos/<int:id_aluno>/timeline", methods=["GET"])
+@etag.conditional("Alunos", "Notas", "Frequencias", "Presencas", "Pagamentos")
+def timeline_aluno(id_aluno):
+    """
+    Linha do tempo do aluno: notas, frequências, presenças e pagamentos em ordem cronológica, do mais recente para o mais antigo.
+    ---
+    tags:
+      - Alunos
+    parameters:
+      - name: id_aluno
+        in: path
+        required: true
+        type: integer
+        description: ID do aluno.
+      - name: before
+        in: query
+        type: string
+        required: false
+        description: Data (AAAA-MM-DD) para listar os eventos anteriores a ela, ou o cursor retornado em X-Next-Cursor.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de eventos por página (padrão 100, máximo 1000).
+    responses:
+      200:
+        description: Página da linha do tempo.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'before' para obter a próxima página (ausente na última página).
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              tipo:
+                type: string
+                enum: [frequencia, nota, pagamento, presenca]
+              id:
+                type: integer
+                description: ID do registro na tabela do tipo.
+              data:
+                type: string
+                format: date
+              detalhes:
+                type: object
+                description: "frequencia: id_disciplina, presente; nota: id_disciplina, valor_nota; pagamento: valor_pago, status, referencia; presenca: presente."
+      404:
+        description: Aluno não encontrado.
+      400:
+        description: Parâmetros inválidos.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      500:
+        description: Erro de conexão com o banco de dados.
+    """
+    if "after" in request.args:
+        return (
+            jsonify({"error": "Parâmetro 'after' não é aceito aqui; use 'before'"}),
+            400,
+        )
+    try:
+        limit = query.limit_arg()
+        antes = cursor_timeline()
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = bd.get_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    try:
+        with bd.transaction(conn) as cursor:
+            cursor.execute(*sql_timeline(id_aluno, antes, limit))
+            eventos = cursor.fetchall()
+            # Página vazia: distingue o aluno sem eventos do aluno inexistente.
+            if not eventos:
+                cursor.execute("SELECT 1 FROM Alunos WHERE id_aluno = %s", (id_aluno,))
+                if cursor.fetchone() is None:
+                    return jsonify({"error": "Aluno não encontrado"}), 404
+        next_before = None
+        if len(eventos) > limit:
+            eventos = eventos[:limit]
+            tipo, id_evento, data, _ = eventos[-1]
+            next_before = (data.isoformat(), tipo, id_evento)
+        return query.page_response(
+            [
+                query.to_dict(evento, COLUNAS_TIMELINE, {"data": query.isoformat})
+                for evento in eventos
+            ],
+            next_before,
+            limit,
+            cursor_param="before",
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
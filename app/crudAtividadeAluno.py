@@ -1,19 +1,50 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, etag, query
 
 atividade_aluno_bp = Blueprint("atividade_aluno", __name__)
 
 
+COLUNAS = (
+    "id_atividade",
+    "id_aluno",
+)
+
+
+def serializar_atividade_aluno(item, colunas=COLUNAS):
+    return query.to_dict(item, colunas)
+
+
 @atividade_aluno_bp.route("/atividade_aluno", methods=["GET"])
+@etag.conditional("Atividades_Alunos")
 def listar_atividade_aluno():
     """
     Lista todas as associações entre atividades e alunos.
     ---
     tags:
       - Atividade_Aluno
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Cursor retornado em X-Next-Cursor, no formato 'id_atividade,id_aluno'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de associações retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -31,33 +62,32 @@ def listar_atividade_aluno():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Atividades_Alunos")
-        atividade_aluno = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_atividade": item[0],
-                        "id_aluno": item[1],
-                    }
-                    for item in atividade_aluno
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args(2)
+            colunas = query.field_args(COLUNAS, ("id_atividade", "id_aluno"))
+            atividade_aluno, next_after = query.keyset_page(
+                cursor,
+                "Atividades_Alunos",
+                ("id_atividade", "id_aluno"),
+                limit,
+                after,
+                columns=colunas,
+            )
+            return query.page_response(
+                [serializar_atividade_aluno(item, colunas) for item in atividade_aluno],
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividade_aluno_bp.route("/atividade_aluno/alunos/<int:id_aluno>", methods=["GET"])
+@etag.conditional("Atividades_Alunos")
 def listar_atividades_por_aluno(id_aluno):
     """
     Lista todas as atividades de um aluno específico.
@@ -70,9 +100,23 @@ def listar_atividades_por_aluno(id_aluno):
         required: true
         type: integer
         description: ID do aluno
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_atividade maior que este valor.
     responses:
       200:
         description: Lista de atividades retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -83,30 +127,35 @@ def listar_atividades_por_aluno(id_aluno):
       400:
         description: Erro ao buscar as atividades.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Erro de conexão com o banco de dados"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "SELECT id_atividade FROM Atividades_Alunos WHERE id_aluno = %s",
-            (id_aluno,),
-        )
-        atividades = cursor.fetchall()
-        return (
-            jsonify([{"id_atividade": atividade[0]} for atividade in atividades]),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            atividades, next_after = query.keyset_page(
+                cursor,
+                "Atividades_Alunos",
+                "id_atividade",
+                limit,
+                after,
+                where=["id_aluno = %s"],
+                params=[id_aluno],
+                columns=["id_atividade"],
+            )
+            return query.page_response(
+                [{"id_atividade": atividade[0]} for atividade in atividades],
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividade_aluno_bp.route(
     "/atividade_aluno/atividade/<int:id_atividade>", methods=["GET"]
 )
+@etag.conditional("Atividades_Alunos")
 def listar_alunos_por_atividade(id_atividade):
     """
     Lista todos os alunos de uma atividade específica.
@@ -119,9 +168,23 @@ def listar_alunos_por_atividade(id_atividade):
         required: true
         type: integer
         description: ID da atividade
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_aluno maior que este valor.
     responses:
       200:
         description: Lista de alunos retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -132,22 +195,27 @@ def listar_alunos_por_atividade(id_atividade):
       400:
         description: Erro ao buscar os alunos.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Erro de conexão com o banco de dados"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "SELECT id_aluno FROM Atividades_Alunos WHERE id_atividade = %s",
-            (id_atividade,),
-        )
-        alunos = cursor.fetchall()
-        return jsonify([{"id_aluno": aluno[0]} for aluno in alunos]), 200
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            alunos, next_after = query.keyset_page(
+                cursor,
+                "Atividades_Alunos",
+                "id_aluno",
+                limit,
+                after,
+                where=["id_atividade = %s"],
+                params=[id_atividade],
+                columns=["id_aluno"],
+            )
+            return query.page_response(
+                [{"id_aluno": aluno[0]} for aluno in alunos], next_after, limit
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividade_aluno_bp.route("/atividade_aluno", methods=["POST"])
@@ -185,29 +253,24 @@ def cadastrar_atividade_aluno():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Atividades_Alunos (id_atividade, id_aluno)
-            VALUES (%s, %s)
-            """,
-            (
-                data["id_atividade"],
-                data["id_aluno"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Atividades_Alunos (id_atividade, id_aluno)
+                VALUES (%s, %s)
+                """,
+                (
+                    data["id_atividade"],
+                    data["id_aluno"],
+                ),
+            )
         return jsonify({"message": "Atividade associada ao aluno com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividade_aluno_bp.route(
@@ -259,25 +322,24 @@ def atualizar_atividade_aluno(id_atividade, id_aluno):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Atividades_Alunos
-            SET id_atividade = %s, id_aluno = %s
-            WHERE id_atividade = %s AND id_aluno = %s
-            """,
-            (
-                data["novo_id_atividade"],
-                data["novo_id_aluno"],
-                id_atividade,
-                id_aluno,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Atividades_Alunos
+                SET id_atividade = %s, id_aluno = %s
+                WHERE id_atividade = %s AND id_aluno = %s
+                """,
+                (
+                    data["novo_id_atividade"],
+                    data["novo_id_aluno"],
+                    id_atividade,
+                    id_aluno,
+                ),
+            )
         return (
             jsonify(
                 {"message": "Associação entre atividade e aluno atualizada com sucesso"}
@@ -285,11 +347,7 @@ def atualizar_atividade_aluno(id_atividade, id_aluno):
             200,
         )
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividade_aluno_bp.route(
@@ -328,16 +386,15 @@ def excluir_atividade_aluno(id_atividade, id_aluno):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Atividades_Alunos WHERE id_atividade = %s AND id_aluno = %s",
-            (id_atividade, id_aluno),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Atividades_Alunos WHERE id_atividade = %s AND id_aluno = %s",
+                (id_atividade, id_aluno),
+            )
         return (
             jsonify(
                 {"message": "Associação entre atividade e aluno excluída com sucesso"}
@@ -345,8 +402,4 @@ def excluir_atividade_aluno(id_atividade, id_aluno):
             200,
         )
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
@@ -1,19 +1,60 @@
 from flask import request, jsonify, Blueprint
-from Util import bd
+from Util import bd, cache, etag, query
 
 atividades_bp = Blueprint("atividades", __name__)
 
 
+COLUNAS = (
+    "id_atividade",
+    "descricao",
+    "data_realizacao",
+)
+CACHE = cache.get_cache("Atividades")
+
+
+def serializar_atividade(atividade, colunas=COLUNAS):
+    return query.to_dict(atividade, colunas)
+
+
 @atividades_bp.route("/atividades", methods=["GET"])
+@etag.conditional("Atividades")
 def listar_atividades():
     """
     Lista todas as atividades cadastradas.
     ---
     tags:
       - Atividades
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_atividade maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de atividades retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -41,31 +82,25 @@ def listar_atividades():
             error:
               type: string
     """
-    conn = bd.create_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Atividades")
-        atividades = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_atividade": atividade[0],
-                        "descricao": atividade[1],
-                        "data_realizacao": atividade[2],
-                    }
-                    for atividade in atividades
-                ]
-            ),
-            200,
+        limit, after = query.page_args()
+        colunas = query.field_args(COLUNAS, "id_atividade")
+        ids = query.ids_args()
+        pagina = cache.cached_page(
+            "Atividades",
+            "id_atividade",
+            serializar_atividade,
+            limit,
+            after,
+            colunas,
+            ids,
         )
+        if pagina is None:
+            return jsonify({"error": "Failed to connect to the database"}), 500
+        itens, next_after, faltando = pagina
+        return query.page_response(itens, next_after, limit, faltando)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividades_bp.route("/atividades", methods=["POST"])
@@ -111,29 +146,25 @@ def cadastrar_atividade():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Atividades (descricao, data_realizacao)
-            VALUES (%s, %s)
-            """,
-            (
-                data["descricao"],
-                data["data_realizacao"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Atividades (descricao, data_realizacao)
+                VALUES (%s, %s)
+                """,
+                (
+                    data["descricao"],
+                    data["data_realizacao"],
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Atividade cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividades_bp.route("/atividades/<int:id_atividade>", methods=["PUT"])
@@ -184,31 +215,27 @@ def alterar_atividade(id_atividade):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Atividades
-            SET descricao = %s, data_realizacao = %s
-            WHERE id_atividade = %s
-            """,
-            (
-                data["descricao"],
-                data["data_realizacao"],
-                id_atividade,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Atividades
+                SET descricao = %s, data_realizacao = %s
+                WHERE id_atividade = %s
+                """,
+                (
+                    data["descricao"],
+                    data["data_realizacao"],
+                    id_atividade,
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Dados da atividade atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @atividades_bp.route("/atividades/<int:id_atividade>", methods=["DELETE"])
@@ -247,19 +274,15 @@ def excluir_atividade(id_atividade):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Atividades WHERE id_atividade = %s", (id_atividade,)
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Atividades WHERE id_atividade = %s", (id_atividade,)
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Atividade excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
@@ -1,19 +1,66 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, cache, etag, include, query
 
 disciplinas_bp = Blueprint("disciplinas", __name__)
 
 
+COLUNAS = (
+    "id_disciplina",
+    "nome_disciplina",
+    "id_professor",
+)
+RELACOES = {"professor": ("id_professor", "Professores")}
+CACHE = cache.get_cache("Disciplinas")
+
+
+def serializar_disciplina(d, colunas=COLUNAS):
+    return query.to_dict(d, colunas)
+
+
 @disciplinas_bp.route("/disciplinas", methods=["GET"])
+@etag.conditional("Disciplinas", "Professores")
 def listar_disciplinas():
     """
     Lista todas as disciplinas cadastradas.
     ---
     tags:
       - Disciplinas
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_disciplina maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: "Relações a embutir em cada registro, separadas por vírgula (professor). Cada relação é carregada com uma única consulta por página."
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de disciplinas retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -33,34 +80,39 @@ def listar_disciplinas():
             error:
               type: string
     """
-    conn = bd.create_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Disciplinas")
-        disciplinas = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_disciplina": d[0],
-                        "nome_disciplina": d[1],
-                        "id_professor": d[2],
-                    }
-                    for d in disciplinas
-                ]
-            ),
-            200,
+        limit, after = query.page_args()
+        incluir = include.include_args(RELACOES)
+        colunas = include.with_foreign_keys(
+            query.field_args(COLUNAS, "id_disciplina"), RELACOES, incluir
+        )
+        ids = query.ids_args()
+        pagina = cache.cached_page(
+            "Disciplinas",
+            "id_disciplina",
+            serializar_disciplina,
+            limit,
+            after,
+            colunas,
+            ids,
         )
+        if pagina is None:
+            return jsonify({"error": "Failed to connect to the database"}), 500
+        itens, next_after, faltando = pagina
+        if incluir:
+            # Os professores não ficam no cache da página: vêm sempre do banco.
+            conn = bd.get_connection()
+            if conn is None:
+                return jsonify({"error": "Failed to connect to the database"}), 500
+            with bd.transaction(conn) as cursor:
+                itens = include.embed(cursor, itens, RELACOES, incluir)
+        return query.page_response(itens, next_after, limit, faltando)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @disciplinas_bp.route("/disciplinas/<int:id_disciplina>", methods=["GET"])
+@etag.conditional("Disciplinas")
 def buscar_disciplina(id_disciplina):
     """
     Busca uma disciplina pelo ID.
@@ -73,6 +125,11 @@ def buscar_disciplina(id_disciplina):
         required: true
         type: integer
         description: ID da disciplina a ser buscada.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Disciplina encontrada com sucesso.
@@ -90,28 +147,23 @@ def buscar_disciplina(id_disciplina):
       500:
         description: Erro de conexão com o banco de dados.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "SELECT * FROM Disciplinas WHERE id_disciplina = %s", (id_disciplina,)
-        )
-        d = cursor.fetchone()
-        if d is None:
-            return jsonify({"error": "Disciplina não encontrada"}), 404
-        return (
-            jsonify(
-                {"id_disciplina": d[0], "nome_disciplina": d[1], "id_professor": d[2]}
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            colunas = query.field_args(COLUNAS, "id_disciplina")
+            d = query.fetch_by_key(
+                cursor, "Disciplinas", "id_disciplina", id_disciplina, colunas
+            )
+            if d is None:
+                return jsonify({"error": "Disciplina não encontrada"}), 404
+            return (
+                jsonify(serializar_disciplina(d, colunas)),
+                200,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @disciplinas_bp.route("/disciplinas", methods=["POST"])
@@ -139,23 +191,19 @@ def cadastrar_disciplina():
         description: Erro ao criar disciplina.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO Disciplinas (nome_disciplina, id_professor) VALUES (%s, %s)",
-            (data["nome_disciplina"], data.get("id_professor")),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "INSERT INTO Disciplinas (nome_disciplina, id_professor) VALUES (%s, %s)",
+                (data["nome_disciplina"], data.get("id_professor")),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Disciplina cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @disciplinas_bp.route("/disciplinas/<int:id_disciplina>", methods=["PUT"])
@@ -188,23 +236,19 @@ def alterar_disciplina(id_disciplina):
         description: Erro ao atualizar os dados da disciplina.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE Disciplinas SET nome_disciplina = %s, id_professor = %s WHERE id_disciplina = %s",
-            (data["nome_disciplina"], data.get("id_professor"), id_disciplina),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "UPDATE Disciplinas SET nome_disciplina = %s, id_professor = %s WHERE id_disciplina = %s",
+                (data["nome_disciplina"], data.get("id_professor"), id_disciplina),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Dados da disciplina atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @disciplinas_bp.route("/disciplinas/<int:id_disciplina>", methods=["DELETE"])
@@ -243,19 +287,15 @@ def excluir_disciplina(id_disciplina):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Disciplinas WHERE id_disciplina = %s", (id_disciplina,)
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Disciplinas WHERE id_disciplina = %s", (id_disciplina,)
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Disciplina excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
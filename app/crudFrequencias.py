@@ -1,19 +1,141 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, etag, export, include, query, streaming
 
 frequencias_bp = Blueprint("frequencias", __name__)
 
 
+COLUNAS = (
+    "id_frequencia",
+    "id_aluno",
+    "id_disciplina",
+    "data_aula",
+    "presente",
+)
+RELACOES = {
+    "aluno": ("id_aluno", "Alunos"),
+    "disciplina": ("id_disciplina", "Disciplinas"),
+}
+CONVERSORES = {"data_aula": query.isoformat}
+TIPOS_EXPORTACAO = {
+    "id_frequencia": "int32",
+    "id_aluno": "int32",
+    "id_disciplina": "int32",
+    "data_aula": "date",
+    "presente": "bool",
+}
+# Reenvios da mesma chamada (mesmo aluno, disciplina e dia) atualizam o registro
+# existente; se nada mudou, o WHERE evita até a reescrita da linha.
+UPSERT_FREQUENCIA = """
+ON CONFLICT (id_aluno, id_disciplina, data_aula) DO UPDATE
+SET presente = EXCLUDED.presente
+WHERE Frequencias.presente IS DISTINCT FROM EXCLUDED.presente
+"""
+# Chamada em lote (/frequencias/lote): uma turma inteira por requisição.
+MAX_REGISTROS_LOTE = 500
+
+# Relatório de percentual de presença, lido de Resumo_Frequencias (mantida pelo
+# trigger da migração 0007): o custo depende do número de linhas devolvidas, não
+# do tamanho de Frequencias.
+COLUNAS_RELATORIO = ("id_aluno", "id_disciplina", "mes", "presencas", "total")
+CHAVE_RELATORIO = ("id_aluno", "id_disciplina", "mes")
+FILTROS_RELATORIO = {
+    "id_aluno": ("id_aluno = %s", int),
+    "id_disciplina": ("id_disciplina = %s", int),
+    "id_turma": (
+        "id_aluno IN (SELECT id_aluno FROM Alunos WHERE id_turma = %s)",
+        int,
+    ),
+    "mes_de": ("mes >= %s", query.parse_month),
+    "mes_ate": ("mes <= %s", query.parse_month),
+}
+
+
+def serializar_frequencia(f, colunas=COLUNAS):
+    return query.to_dict(f, colunas, CONVERSORES)
+
+
+def cursor_relatorio():
+    """
+    Lê ?after= do relatório: o cursor id_aluno,id_disciplina,AAAA-MM devolvido
+    em X-Next-Cursor.
+    :return: (id_aluno, id_disciplina, mês) ou None
+    """
+    raw = request.args.get("after")
+    if not raw:
+        return None
+    partes = raw.split(",")
+    if len(partes) != 3:
+        raise query.QueryError("Parâmetro 'after' inválido")
+    try:
+        ids = (int(partes[0]), int(partes[1]))
+    except ValueError:
+        raise query.QueryError("Parâmetro 'after' inválido")
+    return ids + (query.parse_month(partes[2]),)
+
+
+def serializar_linha_relatorio(linha):
+    item = query.to_dict(linha, COLUNAS_RELATORIO)
+    item["mes"] = item["mes"].strftime("%Y-%m")
+    item["percentual"] = round(100 * item["presencas"] / item["total"], 1)
+    return item
+
+
 @frequencias_bp.route("/frequencias", methods=["GET"])
+@etag.conditional("Frequencias", "Alunos", "Disciplinas")
 def listar_frequencias():
     """
     Lista todas as frequências cadastradas.
     ---
     tags:
       - Frequencias
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_frequencia maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: "Relações a embutir em cada registro, separadas por vírgula (aluno, disciplina). Cada relação é carregada com uma única consulta por página."
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Exporta a tabela inteira em streaming (array JSON ou NDJSON), ignorando 'limit'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
+      - name: format
+        in: query
+        type: string
+        enum: [json, columnar]
+        required: false
+        description: "'columnar' retorna {columns, rows}: os nomes dos campos uma única vez e cada registro como array (equivale a Accept: application/vnd.escola.columns+json)."
     responses:
       200:
         description: Lista de frequências retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -38,36 +160,67 @@ def listar_frequencias():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    stream = streaming.maybe_stream(
+        "Frequencias", "id_frequencia", COLUNAS, serializar_frequencia
+    )
+    if stream is not None:
+        return stream
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Frequencias")
-        frequencias = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_frequencia": f[0],
-                        "id_aluno": f[1],
-                        "id_disciplina": f[2],
-                        "data_aula": f[3].isoformat() if f[3] else None,
-                        "presente": f[4],
-                    }
-                    for f in frequencias
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunar = query.columnar_requested()
+            incluir = include.include_args(RELACOES)
+            if colunar and incluir:
+                raise query.QueryError(
+                    "Parâmetro 'include' não é suportado no formato colunar"
+                )
+            colunas = include.with_foreign_keys(
+                query.field_args(COLUNAS, "id_frequencia"), RELACOES, incluir
+            )
+            ids = query.ids_args()
+            if ids is not None:
+                frequencias, faltando = query.fetch_by_keys(
+                    cursor, "Frequencias", "id_frequencia", ids, colunas
+                )
+                if colunar:
+                    return query.columnar_response(
+                        colunas, frequencias, None, limit, faltando
+                    )
+                return query.page_response(
+                    include.embed(
+                        cursor,
+                        [serializar_frequencia(f, colunas) for f in frequencias],
+                        RELACOES,
+                        incluir,
+                    ),
+                    None,
+                    limit,
+                    faltando,
+                )
+            frequencias, next_after = query.keyset_page(
+                cursor, "Frequencias", "id_frequencia", limit, after, columns=colunas
+            )
+            if colunar:
+                return query.columnar_response(colunas, frequencias, next_after, limit)
+            return query.page_response(
+                include.embed(
+                    cursor,
+                    [serializar_frequencia(f, colunas) for f in frequencias],
+                    RELACOES,
+                    incluir,
+                ),
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @frequencias_bp.route("/frequencias/aluno/<int:id_aluno>", methods=["GET"])
+@etag.conditional("Frequencias")
 def buscar_frequencias_por_aluno(id_aluno):
     """
     Busca todas as frequências de um aluno pelo ID do aluno.
@@ -80,9 +233,28 @@ def buscar_frequencias_por_aluno(id_aluno):
         required: true
         type: integer
         description: ID do aluno a ser buscado.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_frequencia maior que este valor.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de frequências do aluno retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -109,41 +281,192 @@ def buscar_frequencias_por_aluno(id_aluno):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Frequencias WHERE id_aluno = %s", (id_aluno,))
-        frequencias = cursor.fetchall()
-        if not frequencias:
-            return (
-                jsonify({"error": "Nenhuma frequência encontrada para este aluno"}),
-                404,
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunas = query.field_args(COLUNAS, "id_frequencia")
+            frequencias, next_after = query.keyset_page(
+                cursor,
+                "Frequencias",
+                "id_frequencia",
+                limit,
+                after,
+                where=["id_aluno = %s"],
+                params=[id_aluno],
+                columns=colunas,
+            )
+            if not frequencias and after is None:
+                return (
+                    jsonify({"error": "Nenhuma frequência encontrada para este aluno"}),
+                    404,
+                )
+            return query.page_response(
+                [serializar_frequencia(f, colunas) for f in frequencias],
+                next_after,
+                limit,
             )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@frequencias_bp.route("/frequencias/export", methods=["GET"])
+@etag.conditional("Frequencias")
+def exportar_frequencias():
+    """
+    Exporta todas as frequências de uma vez, para análise de dados.
+    O formato é escolhido pelo cabeçalho Accept (ou pelo parâmetro 'format'): CSV gerado pelo próprio PostgreSQL (COPY), MessagePack (lista de colunas seguida de um array por registro) ou Arrow IPC (stream de record batches). O conteúdo é enviado em lotes, com uso de memória constante.
+    ---
+    tags:
+      - Frequencias
+    produces:
+      - text/csv
+      - application/vnd.msgpack
+      - application/vnd.apache.arrow.stream
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [csv, msgpack, arrow]
+        required: false
+        description: Força o formato, ignorando o cabeçalho Accept.
+    responses:
+      200:
+        description: Exportação enviada em streaming.
+      400:
+        description: Formato inválido.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      406:
+        description: Nenhum dos formatos aceitos pelo cliente está disponível.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+    """
+    return export.export_table(
+        "Frequencias", "id_frequencia", COLUNAS, TIPOS_EXPORTACAO
+    )
+
+
+@frequencias_bp.route("/frequencias/relatorio", methods=["GET"])
+@etag.conditional("Frequencias", "Alunos")
+def relatorio_frequencias():
+    """
+    Percentual de presença por aluno, disciplina e mês.
+    Lido dos totais mensais mantidos a cada registro de frequência, sem percorrer as frequências. É obrigatório filtrar por aluno, disciplina ou turma.
+    ---
+    tags:
+      - Frequencias
+    parameters:
+      - name: id_aluno
+        in: query
+        type: integer
+        required: false
+      - name: id_disciplina
+        in: query
+        type: integer
+        required: false
+      - name: id_turma
+        in: query
+        type: integer
+        required: false
+        description: Todos os alunos da turma.
+      - name: mes_de
+        in: query
+        type: string
+        required: false
+        description: Primeiro mês do relatório (AAAA-MM).
+      - name: mes_ate
+        in: query
+        type: string
+        required: false
+        description: Último mês do relatório (AAAA-MM).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de linhas por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Cursor retornado em X-Next-Cursor (id_aluno,id_disciplina,AAAA-MM); lista as linhas depois dele.
+    responses:
+      200:
+        description: Uma linha por aluno, disciplina e mês com aulas registradas, em ordem de aluno, disciplina e mês.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id_aluno:
+                type: integer
+              id_disciplina:
+                type: integer
+              mes:
+                type: string
+                example: "2024-06"
+              presencas:
+                type: integer
+              total:
+                type: integer
+              percentual:
+                type: number
+                format: float
+      400:
+        description: Filtros inválidos ou ausentes.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+    """
+    try:
+        where, params = query.filter_args(FILTROS_RELATORIO)
+        limit = query.limit_arg()
+        after = cursor_relatorio()
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    if not any(
+        request.args.get(nome) for nome in ("id_aluno", "id_disciplina", "id_turma")
+    ):
         return (
-            jsonify(
-                [
-                    {
-                        "id_frequencia": f[0],
-                        "id_aluno": f[1],
-                        "id_disciplina": f[2],
-                        "data_aula": f[3].isoformat() if f[3] else None,
-                        "presente": f[4],
-                    }
-                    for f in frequencias
-                ]
-            ),
-            200,
+            jsonify({"error": "Informe id_aluno, id_disciplina ou id_turma"}),
+            400,
+        )
+    conn = bd.get_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    try:
+        with bd.transaction(conn) as cursor:
+            linhas, next_after = query.keyset_page(
+                cursor,
+                "Resumo_Frequencias",
+                CHAVE_RELATORIO,
+                limit,
+                after,
+                where=where,
+                params=params,
+                columns=COLUNAS_RELATORIO,
+            )
+        if next_after is not None:
+            next_after = next_after[:2] + (next_after[2].strftime("%Y-%m"),)
+        return query.page_response(
+            [serializar_linha_relatorio(linha) for linha in linhas], next_after, limit
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @frequencias_bp.route("/frequencias/<int:id_frequencia>", methods=["GET"])
+@etag.conditional("Frequencias")
 def buscar_frequencia(id_frequencia):
     """
     Busca uma frequência pelo ID.
@@ -156,6 +479,11 @@ def buscar_frequencia(id_frequencia):
         required: true
         type: integer
         description: ID da frequência a ser buscada.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Frequência encontrada com sucesso.
@@ -183,40 +511,29 @@ def buscar_frequencia(id_frequencia):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "SELECT * FROM Frequencias WHERE id_frequencia = %s", (id_frequencia,)
-        )
-        f = cursor.fetchone()
-        if f is None:
-            return jsonify({"error": "Frequência não encontrada"}), 404
-        return (
-            jsonify(
-                {
-                    "id_frequencia": f[0],
-                    "id_aluno": f[1],
-                    "id_disciplina": f[2],
-                    "data_aula": f[3].isoformat() if f[3] else None,
-                    "presente": f[4],
-                }
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            colunas = query.field_args(COLUNAS, "id_frequencia")
+            f = query.fetch_by_key(
+                cursor, "Frequencias", "id_frequencia", id_frequencia, colunas
+            )
+            if f is None:
+                return jsonify({"error": "Frequência não encontrada"}), 404
+            return (
+                jsonify(serializar_frequencia(f, colunas)),
+                200,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @frequencias_bp.route("/frequencias", methods=["POST"])
 def cadastrar_frequencia():
     """
-    Cadastra uma nova frequência.
+    Cadastra uma nova frequência. Se já existir frequência do aluno na mesma disciplina e data, ela é atualizada.
     ---
     tags:
       - Frequencias
@@ -253,28 +570,188 @@ def cadastrar_frequencia():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO Frequencias (id_aluno, id_disciplina, data_aula, presente) VALUES (%s, %s, %s, %s)",
-            (
-                data["id_aluno"],
-                data["id_disciplina"],
-                data["data_aula"],
-                data["presente"],
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "INSERT INTO Frequencias (id_aluno, id_disciplina, data_aula, presente) VALUES (%s, %s, %s, %s) "
+                + UPSERT_FREQUENCIA,
+                (
+                    data["id_aluno"],
+                    data["id_disciplina"],
+                    data["data_aula"],
+                    data["presente"],
+                ),
+            )
+        return jsonify({"message": "Frequência cadastrada com sucesso"}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@frequencias_bp.route("/frequencias/lote", methods=["POST"])
+def cadastrar_frequencias_lote():
+    """
+    Registra a chamada de uma turma inteira (uma aula de uma disciplina) em uma única requisição.
+    Reenviar o mesmo lote atualiza os registros existentes em vez de duplicá-los.
+    ---
+    tags:
+      - Frequencias
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            id_disciplina:
+              type: integer
+            data_aula:
+              type: string
+              format: date
+            registros:
+              type: array
+              items:
+                type: object
+                properties:
+                  id_aluno:
+                    type: integer
+                  presente:
+                    type: boolean
+    responses:
+      201:
+        description: Frequências cadastradas. Registros inválidos são listados em 'falhas' e não impedem os demais.
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            inseridos:
+              type: integer
+              description: Registros novos.
+            atualizados:
+              type: integer
+              description: Registros existentes cujo 'presente' mudou.
+            inalterados:
+              type: integer
+              description: Registros reenviados sem mudança.
+            falhas:
+              type: array
+              items:
+                type: object
+                properties:
+                  indice:
+                    type: integer
+                  id_aluno:
+                    type: integer
+                  error:
+                    type: string
+      400:
+        description: Requisição inválida ou nenhum registro válido.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+            falhas:
+              type: array
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "O corpo deve ser um objeto JSON"}), 400
+    registros = data.get("registros")
+    if not isinstance(registros, list) or not registros:
+        return jsonify({"error": "Informe a lista 'registros'"}), 400
+    if len(registros) > MAX_REGISTROS_LOTE:
+        return (
+            jsonify(
+                {"error": f"Máximo de {MAX_REGISTROS_LOTE} registros por requisição"}
             ),
+            400,
+        )
+    try:
+        id_disciplina = int(data["id_disciplina"])
+        data_aula = query.parse_date(str(data["data_aula"]))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"id_disciplina ou data_aula inválidos: {e}"}), 400
+
+    falhas = []
+    validos = {}
+    for indice, registro in enumerate(registros):
+        id_aluno = registro.get("id_aluno") if isinstance(registro, dict) else None
+        presente = registro.get("presente") if isinstance(registro, dict) else None
+        if not isinstance(id_aluno, int) or isinstance(id_aluno, bool):
+            erro = "id_aluno ausente ou inválido"
+        elif not isinstance(presente, bool):
+            erro = "presente deve ser true ou false"
+        elif id_aluno in validos:
+            erro = "Aluno repetido no lote"
+        else:
+            validos[id_aluno] = (indice, presente)
+            continue
+        falhas.append({"indice": indice, "id_aluno": id_aluno, "error": erro})
+
+    conn = bd.get_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    try:
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "SELECT 1 FROM Disciplinas WHERE id_disciplina = %s", (id_disciplina,)
+            )
+            if cursor.fetchone() is None:
+                return jsonify({"error": "Disciplina não encontrada"}), 400
+            if validos:
+                cursor.execute(
+                    "SELECT id_aluno FROM Alunos WHERE id_aluno = ANY(%s)",
+                    (list(validos),),
+                )
+                existentes = {row[0] for row in cursor.fetchall()}
+                for id_aluno in [a for a in validos if a not in existentes]:
+                    indice, _ = validos.pop(id_aluno)
+                    falhas.append(
+                        {
+                            "indice": indice,
+                            "id_aluno": id_aluno,
+                            "error": "Aluno não encontrado",
+                        }
+                    )
+            falhas.sort(key=lambda falha: falha["indice"])
+            if not validos:
+                return (
+                    jsonify({"error": "Nenhum registro válido", "falhas": falhas}),
+                    400,
+                )
+            valores = []
+            for id_aluno, (_, presente) in validos.items():
+                valores.extend((id_aluno, id_disciplina, data_aula, presente))
+            cursor.execute(
+                "INSERT INTO Frequencias (id_aluno, id_disciplina, data_aula, presente) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(validos))
+                + " "
+                + UPSERT_FREQUENCIA
+                # xmax = 0 só na versão criada por INSERT; o UPDATE do ON
+                # CONFLICT a preenche. Linhas que o WHERE pulou não voltam.
+                + " RETURNING (xmax = 0)",
+                valores,
+            )
+            gravados = [row[0] for row in cursor.fetchall()]
+        inseridos = sum(1 for novo in gravados if novo)
+        return (
+            jsonify(
+                {
+                    "message": "Frequências cadastradas com sucesso",
+                    "inseridos": inseridos,
+                    "atualizados": len(gravados) - inseridos,
+                    "inalterados": len(validos) - len(gravados),
+                    "falhas": falhas,
+                }
+            ),
+            201,
         )
-        conn.commit()
-        return jsonify({"message": "Frequência cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @frequencias_bp.route("/frequencias/<int:id_frequencia>", methods=["PUT"])
@@ -322,29 +799,24 @@ def alterar_frequencia(id_frequencia):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE Frequencias SET id_aluno = %s, id_disciplina = %s, data_aula = %s, presente = %s WHERE id_frequencia = %s",
-            (
-                data["id_aluno"],
-                data["id_disciplina"],
-                data["data_aula"],
-                data["presente"],
-                id_frequencia,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "UPDATE Frequencias SET id_aluno = %s, id_disciplina = %s, data_aula = %s, presente = %s WHERE id_frequencia = %s",
+                (
+                    data["id_aluno"],
+                    data["id_disciplina"],
+                    data["data_aula"],
+                    data["presente"],
+                    id_frequencia,
+                ),
+            )
         return jsonify({"message": "Dados da frequência atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @frequencias_bp.route("/frequencias/<int:id_frequencia>", methods=["DELETE"])
@@ -376,19 +848,14 @@ def excluir_frequencia(id_frequencia):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Frequencias WHERE id_frequencia = %s", (id_frequencia,)
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Frequencias WHERE id_frequencia = %s", (id_frequencia,)
+            )
         return jsonify({"message": "Frequência excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
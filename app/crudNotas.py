@@ -1,19 +1,152 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, cache, etag, export, include, notifications, query, streaming
 
 notas_bp = Blueprint("notas", __name__)
 
 
+COLUNAS = (
+    "id_nota",
+    "id_aluno",
+    "id_disciplina",
+    "valor_nota",
+    "data_avaliacao",
+)
+RELACOES = {
+    "aluno": ("id_aluno", "Alunos"),
+    "disciplina": ("id_disciplina", "Disciplinas"),
+}
+CONVERSORES = {"valor_nota": float, "data_avaliacao": query.isoformat}
+TIPOS_EXPORTACAO = {
+    "id_nota": "int32",
+    "id_aluno": "int32",
+    "id_disciplina": "int32",
+    "valor_nota": "float64",
+    "data_avaliacao": "date",
+}
+
+# Boletins por id_aluno; cada um é descartado quando as notas do aluno mudam.
+BOLETINS = cache.get_cache("Boletins")
+
+# Uma linha por disciplina em que o aluno tem notas. O LEFT JOIN a partir de
+# Alunos devolve uma linha sem notas (COUNT = 0) para o aluno que ainda não
+# foi avaliado e nenhuma linha para o aluno inexistente. Notas sem disciplina
+# (id_disciplina é opcional) ficam fora do boletim; o filtro está no JOIN para
+# que o aluno que só tem essas notas continue recebendo um boletim vazio.
+SQL_BOLETIM = """
+    SELECT d.id_disciplina, d.nome_disciplina, COUNT(n.id_nota),
+           ROUND(AVG(n.valor_nota), 2), MIN(n.valor_nota), MAX(n.valor_nota),
+           (ARRAY_AGG(n.valor_nota ORDER BY n.data_avaliacao DESC, n.id_nota DESC))[1],
+           MAX(n.data_avaliacao)
+    FROM Alunos a
+    LEFT JOIN Notas n ON n.id_aluno = a.id_aluno AND n.id_disciplina IS NOT NULL
+    LEFT JOIN Disciplinas d ON d.id_disciplina = n.id_disciplina
+    WHERE a.id_aluno = %s
+    GROUP BY d.id_disciplina, d.nome_disciplina
+    ORDER BY d.nome_disciplina, d.id_disciplina
+"""
+COLUNAS_BOLETIM = (
+    "id_disciplina",
+    "nome_disciplina",
+    "quantidade_notas",
+    "media",
+    "nota_minima",
+    "nota_maxima",
+    "ultima_nota",
+    "data_ultima_avaliacao",
+)
+CONVERSORES_BOLETIM = {
+    "media": float,
+    "nota_minima": float,
+    "nota_maxima": float,
+    "ultima_nota": float,
+    "data_ultima_avaliacao": query.isoformat,
+}
+
+
+def serializar_nota(n, colunas=COLUNAS):
+    return query.to_dict(n, colunas, CONVERSORES)
+
+
+def serializar_boletim(id_aluno, linhas):
+    return {
+        "id_aluno": id_aluno,
+        "disciplinas": [
+            query.to_dict(linha, COLUNAS_BOLETIM, CONVERSORES_BOLETIM)
+            for linha in linhas
+            if linha[2] > 0
+        ],
+    }
+
+
+def descartar_boletins(tabela):
+    """
+    Descarta os boletins afetados por um aviso de alteração (Util.notifications).
+    """
+    if tabela in ("alunos", "disciplinas", "notas:*"):
+        BOLETINS.invalidate()
+    elif tabela is not None and tabela.startswith("notas:"):
+        BOLETINS.discard(int(tabela.split(":", 1)[1]))
+
+
+notifications.subscribe(descartar_boletins)
+
+
 @notas_bp.route("/notas", methods=["GET"])
+@etag.conditional("Notas", "Alunos", "Disciplinas")
 def listar_notas():
     """
     Lista todas as notas cadastradas.
     ---
     tags:
       - Notas
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_nota maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: "Relações a embutir em cada registro, separadas por vírgula (aluno, disciplina). Cada relação é carregada com uma única consulta por página."
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Exporta a tabela inteira em streaming (array JSON ou NDJSON), ignorando 'limit'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
+      - name: format
+        in: query
+        type: string
+        enum: [json, columnar]
+        required: false
+        description: "'columnar' retorna {columns, rows}: os nomes dos campos uma única vez e cada registro como array (equivale a Accept: application/vnd.escola.columns+json)."
     responses:
       200:
         description: Lista de notas retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -39,36 +172,106 @@ def listar_notas():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    stream = streaming.maybe_stream("Notas", "id_nota", COLUNAS, serializar_nota)
+    if stream is not None:
+        return stream
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Notas")
-        notas = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_nota": n[0],
-                        "id_aluno": n[1],
-                        "id_disciplina": n[2],
-                        "valor_nota": float(n[3]),
-                        "data_avaliacao": n[4].isoformat() if n[4] else None,
-                    }
-                    for n in notas
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunar = query.columnar_requested()
+            incluir = include.include_args(RELACOES)
+            if colunar and incluir:
+                raise query.QueryError(
+                    "Parâmetro 'include' não é suportado no formato colunar"
+                )
+            colunas = include.with_foreign_keys(
+                query.field_args(COLUNAS, "id_nota"), RELACOES, incluir
+            )
+            ids = query.ids_args()
+            if ids is not None:
+                notas, faltando = query.fetch_by_keys(
+                    cursor, "Notas", "id_nota", ids, colunas
+                )
+                if colunar:
+                    return query.columnar_response(
+                        colunas, notas, None, limit, faltando
+                    )
+                return query.page_response(
+                    include.embed(
+                        cursor,
+                        [serializar_nota(n, colunas) for n in notas],
+                        RELACOES,
+                        incluir,
+                    ),
+                    None,
+                    limit,
+                    faltando,
+                )
+            notas, next_after = query.keyset_page(
+                cursor, "Notas", "id_nota", limit, after, columns=colunas
+            )
+            if colunar:
+                return query.columnar_response(colunas, notas, next_after, limit)
+            return query.page_response(
+                include.embed(
+                    cursor,
+                    [serializar_nota(n, colunas) for n in notas],
+                    RELACOES,
+                    incluir,
+                ),
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@notas_bp.route("/notas/export", methods=["GET"])
+@etag.conditional("Notas")
+def exportar_notas():
+    """
+    Exporta todas as notas de uma vez, para análise de dados.
+    O formato é escolhido pelo cabeçalho Accept (ou pelo parâmetro 'format'): CSV gerado pelo próprio PostgreSQL (COPY), MessagePack (lista de colunas seguida de um array por registro) ou Arrow IPC (stream de record batches). O conteúdo é enviado em lotes, com uso de memória constante.
+    ---
+    tags:
+      - Notas
+    produces:
+      - text/csv
+      - application/vnd.msgpack
+      - application/vnd.apache.arrow.stream
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [csv, msgpack, arrow]
+        required: false
+        description: Força o formato, ignorando o cabeçalho Accept.
+    responses:
+      200:
+        description: Exportação enviada em streaming.
+      400:
+        description: Formato inválido.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      406:
+        description: Nenhum dos formatos aceitos pelo cliente está disponível.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+    """
+    return export.export_table("Notas", "id_nota", COLUNAS, TIPOS_EXPORTACAO)
 
 
 @notas_bp.route("/notas/<int:id_nota>", methods=["GET"])
+@etag.conditional("Notas")
 def buscar_nota(id_nota):
     """
     Busca uma nota pelo ID.
@@ -81,6 +284,11 @@ def buscar_nota(id_nota):
         required: true
         type: integer
         description: ID da nota a ser buscada.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Nota encontrada com sucesso.
@@ -104,32 +312,21 @@ def buscar_nota(id_nota):
       500:
         description: Erro de conexão com o banco de dados.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Notas WHERE id_nota = %s", (id_nota,))
-        n = cursor.fetchone()
-        if n is None:
-            return jsonify({"error": "Nota não encontrada"}), 404
-        return (
-            jsonify(
-                {
-                    "id_nota": n[0],
-                    "id_aluno": n[1],
-                    "id_disciplina": n[2],
-                    "valor_nota": float(n[3]),
-                    "data_avaliacao": n[4].isoformat() if n[4] else None,
-                }
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            colunas = query.field_args(COLUNAS, "id_nota")
+            n = query.fetch_by_key(cursor, "Notas", "id_nota", id_nota, colunas)
+            if n is None:
+                return jsonify({"error": "Nota não encontrada"}), 404
+            return (
+                jsonify(serializar_nota(n, colunas)),
+                200,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @notas_bp.route("/notas", methods=["POST"])
@@ -163,28 +360,24 @@ def cadastrar_nota():
         description: Erro ao criar nota.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO Notas (id_aluno, id_disciplina, valor_nota, data_avaliacao) VALUES (%s, %s, %s, %s)",
-            (
-                data["id_aluno"],
-                data["id_disciplina"],
-                data["valor_nota"],
-                data["data_avaliacao"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "INSERT INTO Notas (id_aluno, id_disciplina, valor_nota, data_avaliacao) VALUES (%s, %s, %s, %s)",
+                (
+                    data["id_aluno"],
+                    data["id_disciplina"],
+                    data["valor_nota"],
+                    data["data_avaliacao"],
+                ),
+            )
+        BOLETINS.discard(data["id_aluno"])
         return jsonify({"message": "Nota cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @notas_bp.route("/notas/<int:id_nota>", methods=["PUT"])
@@ -223,29 +416,30 @@ def alterar_nota(id_nota):
         description: Erro ao atualizar os dados da nota.
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE Notas SET id_aluno = %s, id_disciplina = %s, valor_nota = %s, data_avaliacao = %s WHERE id_nota = %s",
-            (
-                data["id_aluno"],
-                data["id_disciplina"],
-                data["valor_nota"],
-                data["data_avaliacao"],
-                id_nota,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                # A auto-junção devolve o aluno anterior, cujo boletim também muda.
+                "UPDATE Notas SET id_aluno = %s, id_disciplina = %s, valor_nota = %s, data_avaliacao = %s "
+                "FROM Notas anterior WHERE Notas.id_nota = %s AND anterior.id_nota = Notas.id_nota "
+                "RETURNING anterior.id_aluno",
+                (
+                    data["id_aluno"],
+                    data["id_disciplina"],
+                    data["valor_nota"],
+                    data["data_avaliacao"],
+                    id_nota,
+                ),
+            )
+            alunos = [row[0] for row in cursor.fetchall()]
+        for id_aluno in alunos + [data["id_aluno"]]:
+            BOLETINS.discard(id_aluno)
         return jsonify({"message": "Dados da nota atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @notas_bp.route("/notas/<int:id_nota>", methods=["DELETE"])
@@ -284,23 +478,24 @@ def excluir_nota(id_nota):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Notas WHERE id_nota = %s", (id_nota,))
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Notas WHERE id_nota = %s RETURNING id_aluno", (id_nota,)
+            )
+            alunos = [row[0] for row in cursor.fetchall()]
+        for id_aluno in alunos:
+            BOLETINS.discard(id_aluno)
         return jsonify({"message": "Nota excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @notas_bp.route("/notas/aluno/<int:id_aluno>", methods=["GET"])
+@etag.conditional("Notas")
 def buscar_notas_por_aluno(id_aluno):
     """
     Busca todas as notas de um aluno pelo ID do aluno.
@@ -313,9 +508,28 @@ def buscar_notas_por_aluno(id_aluno):
         required: true
         type: integer
         description: ID do aluno a ser buscado.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_nota maior que este valor.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de notas do aluno retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
         schema:
           type: array
           items:
@@ -338,32 +552,107 @@ def buscar_notas_por_aluno(id_aluno):
       500:
         description: Erro de conexão com o banco de dados.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Notas WHERE id_aluno = %s", (id_aluno,))
-        notas = cursor.fetchall()
-        if not notas:
-            return jsonify({"error": "Nenhuma nota encontrada para este aluno"}), 404
-        return (
-            jsonify(
-                [
-                    {
-                        "id_nota": n[0],
-                        "id_aluno": n[1],
-                        "id_disciplina": n[2],
-                        "valor_nota": float(n[3]),
-                        "data_avaliacao": n[4].isoformat() if n[4] else None,
-                    }
-                    for n in notas
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunas = query.field_args(COLUNAS, "id_nota")
+            notas, next_after = query.keyset_page(
+                cursor,
+                "Notas",
+                "id_nota",
+                limit,
+                after,
+                where=["id_aluno = %s"],
+                params=[id_aluno],
+                columns=colunas,
+            )
+            if not notas and after is None:
+                return (
+                    jsonify({"error": "Nenhuma nota encontrada para este aluno"}),
+                    404,
+                )
+            return query.page_response(
+                [serializar_nota(n, colunas) for n in notas],
+                next_after,
+                limit,
+            )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@notas_bp.route("/alunos/<int:id_aluno>/boletim", methods=["GET"])
+@etag.conditional("Notas", "Disciplinas", "Alunos")
+def buscar_boletim(id_aluno):
+    """
+    Boletim do aluno: média, menor e maior nota, quantidade de notas e última avaliação por disciplina.
+    Calculado em uma única consulta e mantido em cache até que uma nota do aluno seja alterada.
+    ---
+    tags:
+      - Notas
+    parameters:
+      - name: id_aluno
+        in: path
+        required: true
+        type: integer
+        description: ID do aluno.
+    responses:
+      200:
+        description: Boletim do aluno (lista vazia de disciplinas se ainda não houver notas).
+        schema:
+          type: object
+          properties:
+            id_aluno:
+              type: integer
+            disciplinas:
+              type: array
+              items:
+                type: object
+                properties:
+                  id_disciplina:
+                    type: integer
+                  nome_disciplina:
+                    type: string
+                  quantidade_notas:
+                    type: integer
+                  media:
+                    type: number
+                    format: float
+                  nota_minima:
+                    type: number
+                    format: float
+                  nota_maxima:
+                    type: number
+                    format: float
+                  ultima_nota:
+                    type: number
+                    format: float
+                  data_ultima_avaliacao:
+                    type: string
+                    format: date
+      404:
+        description: Aluno não encontrado.
+      400:
+        description: Erro ao buscar o boletim.
+      500:
+        description: Erro de conexão com o banco de dados.
+    """
+    try:
+        boletim = BOLETINS.get(id_aluno)
+        if boletim is None:
+            geracao = BOLETINS.generation
+            conn = bd.get_connection()
+            if conn is None:
+                return jsonify({"error": "Failed to connect to the database"}), 500
+            with bd.transaction(conn) as cursor:
+                cursor.execute(SQL_BOLETIM, (id_aluno,))
+                linhas = cursor.fetchall()
+            if not linhas:
+                return jsonify({"error": "Aluno não encontrado"}), 404
+            boletim = serializar_boletim(id_aluno, linhas)
+            BOLETINS.set(id_aluno, boletim, geracao)
+        return jsonify(boletim)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
@@ -1,21 +1,106 @@
 from flask import request, jsonify, Blueprint
-from Util import bd
+from Util import bd, etag, query, streaming
 import logging
 
 logger = logging.getLogger(__name__)
 pagamentos_bp = Blueprint("pagamentos", __name__)
 
 
+COLUNAS = (
+    "id_pagamento",
+    "id_aluno",
+    "data_pagamento",
+    "valor_pago",
+    "forma_pagamento",
+    "referencia",
+    "status",
+)
+CONVERSORES = {"valor_pago": float}
+FILTROS = {
+    "status": ("status = %s", str),
+    "referencia": ("referencia = %s", str),
+    "id_aluno": ("id_aluno = %s", int),
+    "data_de": ("data_pagamento >= %s", query.parse_date),
+    "data_ate": ("data_pagamento <= %s", query.parse_date),
+}
+
+
+def serializar_pagamento(pagamento, colunas=COLUNAS):
+    return query.to_dict(pagamento, colunas, CONVERSORES)
+
+
 @pagamentos_bp.route("/pagamentos", methods=["GET"])
+@etag.conditional("Pagamentos")
 def listar_pagamentos():
     """
-    Lista todos os pagamentos cadastrados.
+    Lista os pagamentos cadastrados, com filtros opcionais.
     ---
     tags:
       - Pagamentos
+    parameters:
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Filtra pelo status do pagamento (ex. pago, pendente).
+      - name: referencia
+        in: query
+        type: string
+        required: false
+        description: Filtra pela referência do pagamento (ex. julho/2024).
+      - name: id_aluno
+        in: query
+        type: integer
+        required: false
+        description: Filtra pelos pagamentos de um aluno.
+      - name: data_de
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Data de pagamento inicial (inclusive), no formato AAAA-MM-DD.
+      - name: data_ate
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Data de pagamento final (inclusive), no formato AAAA-MM-DD.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_pagamento maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Exporta a tabela inteira em streaming (array JSON ou NDJSON), ignorando 'limit'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de pagamentos retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -52,35 +137,56 @@ def listar_pagamentos():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    stream = streaming.maybe_stream(
+        "Pagamentos", "id_pagamento", COLUNAS, serializar_pagamento, filters=FILTROS
+    )
+    if stream is not None:
+        return stream
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Pagamentos")
-        pagamentos = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_pagamento": pagamento[0],
-                        "id_aluno": pagamento[1],
-                        "data_pagamento": pagamento[2],
-                        "valor_pago": float(pagamento[3]),
-                        "forma_pagamento": pagamento[4],
-                        "referencia": pagamento[5],
-                        "status": pagamento[6],
-                    }
-                    for pagamento in pagamentos
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunas = query.field_args(COLUNAS, "id_pagamento")
+            where, params = query.filter_args(FILTROS)
+            ids = query.ids_args()
+            if ids is not None:
+                pagamentos, faltando = query.fetch_by_keys(
+                    cursor,
+                    "Pagamentos",
+                    "id_pagamento",
+                    ids,
+                    colunas,
+                    where=where,
+                    params=params,
+                )
+                return query.page_response(
+                    [
+                        serializar_pagamento(pagamento, colunas)
+                        for pagamento in pagamentos
+                    ],
+                    None,
+                    limit,
+                    faltando,
+                )
+            pagamentos, next_after = query.keyset_page(
+                cursor,
+                "Pagamentos",
+                "id_pagamento",
+                limit,
+                after,
+                where=where,
+                params=params,
+                columns=colunas,
+            )
+            return query.page_response(
+                [serializar_pagamento(pagamento, colunas) for pagamento in pagamentos],
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @pagamentos_bp.route("/pagamentos", methods=["POST"])
@@ -135,33 +241,28 @@ def cadastrar_pagamento():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Pagamentos (id_aluno, data_pagamento, valor_pago, forma_pagamento, referencia, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["id_aluno"],
-                data["data_pagamento"],
-                data["valor_pago"],
-                data["forma_pagamento"],
-                data["referencia"],
-                data["status"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Pagamentos (id_aluno, data_pagamento, valor_pago, forma_pagamento, referencia, status)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["id_aluno"],
+                    data["data_pagamento"],
+                    data["valor_pago"],
+                    data["forma_pagamento"],
+                    data["referencia"],
+                    data["status"],
+                ),
+            )
         return jsonify({"message": "Pagamento cadastrado com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @pagamentos_bp.route("/pagamentos/<int:id_pagamento>", methods=["PUT"])
@@ -221,35 +322,30 @@ def alterar_pagamento(id_pagamento):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Pagamentos
-            SET id_aluno = %s, data_pagamento = %s, valor_pago = %s, forma_pagamento = %s, referencia = %s, status = %s
-            WHERE id_pagamento = %s
-            """,
-            (
-                data["id_aluno"],
-                data["data_pagamento"],
-                data["valor_pago"],
-                data["forma_pagamento"],
-                data["referencia"],
-                data["status"],
-                id_pagamento,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Pagamentos
+                SET id_aluno = %s, data_pagamento = %s, valor_pago = %s, forma_pagamento = %s, referencia = %s, status = %s
+                WHERE id_pagamento = %s
+                """,
+                (
+                    data["id_aluno"],
+                    data["data_pagamento"],
+                    data["valor_pago"],
+                    data["forma_pagamento"],
+                    data["referencia"],
+                    data["status"],
+                    id_pagamento,
+                ),
+            )
         return jsonify({"message": "Dados do pagamento atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @pagamentos_bp.route("/pagamentos/<int:id_pagamento>", methods=["DELETE"])
@@ -288,19 +384,14 @@ def excluir_pagamento(id_pagamento):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Pagamentos WHERE id_pagamento = %s", (id_pagamento,)
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Pagamentos WHERE id_pagamento = %s", (id_pagamento,)
+            )
         return jsonify({"message": "Pagamento excluído com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
@@ -1,19 +1,73 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, etag, query, streaming
 
 presencas_bp = Blueprint("presencas", __name__)
 
 
+COLUNAS = (
+    "id_presenca",
+    "id_aluno",
+    "data_presenca",
+    "presente",
+)
+CONVERSORES = {"presente": bool}
+
+
+def serializar_presenca(presenca, colunas=COLUNAS):
+    return query.to_dict(presenca, colunas, CONVERSORES)
+
+
 @presencas_bp.route("/presencas", methods=["GET"])
+@etag.conditional("Presencas")
 def listar_presencas():
     """
     Lista todas as presenças cadastradas.
     ---
     tags:
       - Presencas
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_presenca maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Exporta a tabela inteira em streaming (array JSON ou NDJSON), ignorando 'limit'.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
+      - name: format
+        in: query
+        type: string
+        enum: [json, columnar]
+        required: false
+        description: "'columnar' retorna {columns, rows}: os nomes dos campos uma única vez e cada registro como array (equivale a Accept: application/vnd.escola.columns+json)."
     responses:
       200:
         description: Lista de presenças retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -43,38 +97,52 @@ def listar_presencas():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    stream = streaming.maybe_stream(
+        "Presencas", "id_presenca", COLUNAS, serializar_presenca
+    )
+    if stream is not None:
+        return stream
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Presencas")
-        presencas = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_presenca": presenca[0],
-                        "id_aluno": presenca[1],
-                        "data_presenca": presenca[2],
-                        "presente": bool(presenca[3]),
-                    }
-                    for presenca in presencas
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunar = query.columnar_requested()
+            colunas = query.field_args(COLUNAS, "id_presenca")
+            ids = query.ids_args()
+            if ids is not None:
+                presencas, faltando = query.fetch_by_keys(
+                    cursor, "Presencas", "id_presenca", ids, colunas
+                )
+                if colunar:
+                    return query.columnar_response(
+                        colunas, presencas, None, limit, faltando
+                    )
+                return query.page_response(
+                    [serializar_presenca(presenca, colunas) for presenca in presencas],
+                    None,
+                    limit,
+                    faltando,
+                )
+            presencas, next_after = query.keyset_page(
+                cursor, "Presencas", "id_presenca", limit, after, columns=colunas
+            )
+            if colunar:
+                return query.columnar_response(colunas, presencas, next_after, limit)
+            return query.page_response(
+                [serializar_presenca(presenca, colunas) for presenca in presencas],
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @presencas_bp.route("/presencas", methods=["POST"])
 def cadastrar_presenca():
     """
-    Cadastra uma nova presença.
+    Cadastra uma nova presença. Se o aluno já tiver presença registrada na mesma data, ela é atualizada.
     ---
     tags:
       - Presencas
@@ -116,30 +184,28 @@ def cadastrar_presenca():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Presencas (id_aluno, data_presenca, presente)
-            VALUES (%s, %s, %s)
-            """,
-            (
-                data["id_aluno"],
-                data["data_presenca"],
-                data["presente"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Presencas (id_aluno, data_presenca, presente)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (id_aluno, data_presenca) DO UPDATE
+                SET presente = EXCLUDED.presente
+                WHERE Presencas.presente IS DISTINCT FROM EXCLUDED.presente
+                """,
+                (
+                    data["id_aluno"],
+                    data["data_presenca"],
+                    data["presente"],
+                ),
+            )
         return jsonify({"message": "Presença cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @presencas_bp.route("/presencas/<int:id_presenca>", methods=["PUT"])
@@ -192,32 +258,27 @@ def alterar_presenca(id_presenca):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Presencas
-            SET id_aluno = %s, data_presenca = %s, presente = %s
-            WHERE id_presenca = %s
-            """,
-            (
-                data["id_aluno"],
-                data["data_presenca"],
-                data["presente"],
-                id_presenca,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Presencas
+                SET id_aluno = %s, data_presenca = %s, presente = %s
+                WHERE id_presenca = %s
+                """,
+                (
+                    data["id_aluno"],
+                    data["data_presenca"],
+                    data["presente"],
+                    id_presenca,
+                ),
+            )
         return jsonify({"message": "Dados da presença atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @presencas_bp.route("/presencas/<int:id_presenca>", methods=["DELETE"])
@@ -256,17 +317,14 @@ def excluir_presenca(id_presenca):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Presencas WHERE id_presenca = %s", (id_presenca,))
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Presencas WHERE id_presenca = %s", (id_presenca,)
+            )
         return jsonify({"message": "Presença excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
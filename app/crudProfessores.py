@@ -1,22 +1,63 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, cache, etag, query
 import logging
 
-
 logger = logging.getLogger(__name__)
 professores_bp = Blueprint("professores", __name__)
 
 
+COLUNAS = (
+    "id_professor",
+    "nome_completo",
+    "email",
+    "telefone",
+)
+CACHE = cache.get_cache("Professores")
+
+
+def serializar_professor(professor, colunas=COLUNAS):
+    return query.to_dict(professor, colunas)
+
+
 @professores_bp.route("/professores", methods=["GET"])
+@etag.conditional("Professores")
 def listar_professores():
     """
     Lista todos os professores cadastrados.
     ---
     tags:
       - Professores
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_professor maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de professores retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -38,32 +79,25 @@ def listar_professores():
             error:
               type: string
     """
-    conn = bd.create_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Professores")
-        professores = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_professor": professor[0],
-                        "nome_completo": professor[1],
-                        "email": professor[2],
-                        "telefone": professor[3],
-                    }
-                    for professor in professores
-                ]
-            ),
-            200,
+        limit, after = query.page_args()
+        colunas = query.field_args(COLUNAS, "id_professor")
+        ids = query.ids_args()
+        pagina = cache.cached_page(
+            "Professores",
+            "id_professor",
+            serializar_professor,
+            limit,
+            after,
+            colunas,
+            ids,
         )
+        if pagina is None:
+            return jsonify({"error": "Failed to connect to the database"}), 500
+        itens, next_after, faltando = pagina
+        return query.page_response(itens, next_after, limit, faltando)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @professores_bp.route("/professores", methods=["POST"])
@@ -103,30 +137,26 @@ def cadastrar_professor():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Professores (nome_completo, email, telefone)
-            VALUES (%s, %s, %s)
-            """,
-            (
-                data["nome_completo"],
-                data["email"],
-                data["telefone"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Professores (nome_completo, email, telefone)
+                VALUES (%s, %s, %s)
+                """,
+                (
+                    data["nome_completo"],
+                    data["email"],
+                    data["telefone"],
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Professor cadastrado com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @professores_bp.route("/professores/<int:id_professor>", methods=["PUT"])
@@ -171,32 +201,28 @@ def alterar_professor(id_professor):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Professores
-            SET nome_completo = %s, email = %s, telefone = %s
-            WHERE id_professor = %s
-            """,
-            (
-                data["nome_completo"],
-                data["email"],
-                data["telefone"],
-                id_professor,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Professores
+                SET nome_completo = %s, email = %s, telefone = %s
+                WHERE id_professor = %s
+                """,
+                (
+                    data["nome_completo"],
+                    data["email"],
+                    data["telefone"],
+                    id_professor,
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Dados do professor atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @professores_bp.route("/professores/<int:id_professor>", methods=["DELETE"])
@@ -228,19 +254,15 @@ def excluir_professor(id_professor):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "DELETE FROM Professores WHERE id_professor = %s", (id_professor,)
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM Professores WHERE id_professor = %s", (id_professor,)
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Professor excluído com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
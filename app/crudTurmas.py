@@ -1,19 +1,117 @@
 from flask import request, jsonify, Blueprint
-from Util import bd
+from Util import bd, cache, etag, include, query
+import datetime
 
 turmas_bp = Blueprint("turmas", __name__)
 
 
+COLUNAS = (
+    "id_turma",
+    "nome_turma",
+    "id_professor",
+    "horario",
+)
+RELACOES = {"professor": ("id_professor", "Professores")}
+CACHE = cache.get_cache("Turmas")
+
+# Painel da turma: duas consultas fixas, qualquer que seja o número de alunos.
+# A turma vem com o professor (chaves primárias); os alunos vêm do índice
+# idx_alunos_turma, cada um com a presença do dia pela chave única
+# (id_aluno, data_presenca) de Presencas.
+SQL_PAINEL_TURMA = """
+    SELECT t.id_turma, t.nome_turma, t.horario,
+           p.id_professor, p.nome_completo, p.email, p.telefone
+    FROM Turmas t
+    LEFT JOIN Professores p ON p.id_professor = t.id_professor
+    WHERE t.id_turma = %s
+"""
+SQL_PAINEL_ALUNOS = """
+    SELECT a.id_aluno, a.nome_completo, a.data_nascimento, pr.presente
+    FROM Alunos a
+    LEFT JOIN Presencas pr
+           ON pr.id_aluno = a.id_aluno AND pr.data_presenca = %s
+    WHERE a.id_turma = %s
+    ORDER BY a.nome_completo, a.id_aluno
+"""
+COLUNAS_PAINEL_TURMA = ("id_turma", "nome_turma", "horario")
+COLUNAS_PAINEL_PROFESSOR = ("id_professor", "nome_completo", "email", "telefone")
+COLUNAS_PAINEL_ALUNO = ("id_aluno", "nome_completo", "data_nascimento", "presente")
+CONVERSORES_PAINEL_ALUNO = {"data_nascimento": query.isoformat}
+
+
+def serializar_turma(turma, colunas=COLUNAS):
+    return query.to_dict(turma, colunas)
+
+
+def data_painel():
+    """
+    Dia do painel: ?data=AAAA-MM-DD ou hoje.
+    """
+    data = request.args.get("data")
+    return query.parse_date(data) if data else datetime.date.today()
+
+
+def serializar_painel(turma, alunos, data):
+    professor = turma[len(COLUNAS_PAINEL_TURMA) :]
+    return {
+        "turma": query.to_dict(turma, COLUNAS_PAINEL_TURMA),
+        "professor": (
+            None
+            if professor[0] is None
+            else query.to_dict(professor, COLUNAS_PAINEL_PROFESSOR)
+        ),
+        "data": data.isoformat(),
+        "alunos": [
+            query.to_dict(aluno, COLUNAS_PAINEL_ALUNO, CONVERSORES_PAINEL_ALUNO)
+            for aluno in alunos
+        ],
+    }
+
+
 @turmas_bp.route("/turmas", methods=["GET"])
+@etag.conditional("Turmas", "Professores")
 def listar_turmas():
     """
     Lista todas as turmas cadastradas.
     ---
     tags:
       - Turmas
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_turma maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: "Relações a embutir em cada registro, separadas por vírgula (professor). Cada relação é carregada com uma única consulta por página."
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de turmas retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -42,32 +140,29 @@ def listar_turmas():
             error:
               type: string
     """
-    conn = bd.create_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Turmas")
-        turmas = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_turma": turma[0],
-                        "nome_turma": turma[1],
-                        "id_professor": turma[2],
-                        "horario": turma[3],
-                    }
-                    for turma in turmas
-                ]
-            ),
-            200,
+        limit, after = query.page_args()
+        incluir = include.include_args(RELACOES)
+        colunas = include.with_foreign_keys(
+            query.field_args(COLUNAS, "id_turma"), RELACOES, incluir
+        )
+        ids = query.ids_args()
+        pagina = cache.cached_page(
+            "Turmas", "id_turma", serializar_turma, limit, after, colunas, ids
         )
+        if pagina is None:
+            return jsonify({"error": "Failed to connect to the database"}), 500
+        itens, next_after, faltando = pagina
+        if incluir:
+            # Os professores não ficam no cache da página: vêm sempre do banco.
+            conn = bd.get_connection()
+            if conn is None:
+                return jsonify({"error": "Failed to connect to the database"}), 500
+            with bd.transaction(conn) as cursor:
+                itens = include.embed(cursor, itens, RELACOES, incluir)
+        return query.page_response(itens, next_after, limit, faltando)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @turmas_bp.route("/turmas", methods=["POST"])
@@ -114,30 +209,26 @@ def cadastrar_turma():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Turmas (nome_turma, id_professor, horario)
-            VALUES (%s, %s, %s)
-            """,
-            (
-                data["nome_turma"],
-                data.get("id_professor"),
-                data["horario"],
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Turmas (nome_turma, id_professor, horario)
+                VALUES (%s, %s, %s)
+                """,
+                (
+                    data["nome_turma"],
+                    data.get("id_professor"),
+                    data["horario"],
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Turma cadastrada com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @turmas_bp.route("/turmas/<int:id_turma>", methods=["PUT"])
@@ -189,32 +280,28 @@ def alterar_turma(id_turma):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Turmas
-            SET nome_turma = %s, id_professor = %s, horario = %s
-            WHERE id_turma = %s
-            """,
-            (
-                data["nome_turma"],
-                data.get("id_professor"),
-                data["horario"],
-                id_turma,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Turmas
+                SET nome_turma = %s, id_professor = %s, horario = %s
+                WHERE id_turma = %s
+                """,
+                (
+                    data["nome_turma"],
+                    data.get("id_professor"),
+                    data["horario"],
+                    id_turma,
+                ),
+            )
+        CACHE.invalidate()
         return jsonify({"message": "Dados da turma atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @turmas_bp.route("/turmas/<int:id_turma>", methods=["DELETE"])
@@ -253,17 +340,115 @@ def excluir_turma(id_turma):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Turmas WHERE id_turma = %s", (id_turma,))
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute("DELETE FROM Turmas WHERE id_turma = %s", (id_turma,))
+        CACHE.invalidate()
         return jsonify({"message": "Turma excluída com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
+
+
+@turmas_bp.route("/turmas/<int:id_turma>/painel", methods=["GET"])
+@etag.conditional(
+    "Turmas",
+    "Professores",
+    "Alunos",
+    "Presencas",
+    key=lambda: datetime.date.today().isoformat(),
+)
+def painel_turma(id_turma):
+    """
+    Painel da turma: dados da turma, professor, alunos matriculados e a presença de cada aluno no dia.
+    Montado com duas consultas em uma única conexão, qualquer que seja o tamanho da turma.
+    ---
+    tags:
+      - Turmas
+    parameters:
+      - name: id_turma
+        in: path
+        required: true
+        type: integer
+        description: ID da turma.
+      - name: data
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Dia das presenças (AAAA-MM-DD); padrão é hoje.
+    responses:
+      200:
+        description: Painel da turma. 'presente' é null para alunos sem presença registrada no dia.
+        schema:
+          type: object
+          properties:
+            turma:
+              type: object
+              properties:
+                id_turma:
+                  type: integer
+                nome_turma:
+                  type: string
+                horario:
+                  type: string
+            professor:
+              type: object
+              properties:
+                id_professor:
+                  type: integer
+                nome_completo:
+                  type: string
+                email:
+                  type: string
+                telefone:
+                  type: string
+            data:
+              type: string
+              format: date
+            alunos:
+              type: array
+              items:
+                type: object
+                properties:
+                  id_aluno:
+                    type: integer
+                  nome_completo:
+                    type: string
+                  data_nascimento:
+                    type: string
+                    format: date
+                  presente:
+                    type: boolean
+      404:
+        description: Turma não encontrada.
+      400:
+        description: Erro ao montar o painel.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      500:
+        description: Erro de conexão com o banco de dados.
+    """
+    try:
+        data = data_painel()
+    except query.QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = bd.get_connection()
+    if conn is None:
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    try:
+        with bd.transaction(conn) as cursor:
+            cursor.execute(SQL_PAINEL_TURMA, (id_turma,))
+            turma = cursor.fetchone()
+            if turma is None:
+                return jsonify({"error": "Turma não encontrada"}), 404
+            cursor.execute(SQL_PAINEL_ALUNOS, (data, id_turma))
+            alunos = cursor.fetchall()
+        return jsonify(serializar_painel(turma, alunos, data))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
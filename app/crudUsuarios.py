@@ -1,19 +1,61 @@
 from flask import Blueprint, request, jsonify
-from Util import bd
+from Util import bd, etag, query
 
 usuarios_bp = Blueprint("usuarios", __name__)
 
 
+COLUNAS = (
+    "id_usuario",
+    "login",
+    "senha",
+    "nivel_acesso",
+    "id_professor",
+)
+
+
+def serializar_usuario(usuario, colunas=COLUNAS):
+    return query.to_dict(usuario, colunas)
+
+
 @usuarios_bp.route("/usuarios", methods=["GET"])
+@etag.conditional("Usuarios")
 def listar_usuarios():
     """
     Lista todos os usuários cadastrados.
     ---
     tags:
       - Usuarios
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade máxima de registros por página (padrão 100, máximo 1000).
+      - name: after
+        in: query
+        type: integer
+        required: false
+        description: Cursor retornado em X-Next-Cursor; lista os registros com id_usuario maior que este valor.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: IDs separados por vírgula (máximo 1000). Retorna esses registros na ordem pedida, com uma única consulta, ignorando 'limit' e 'after'; os IDs não encontrados vêm no cabeçalho X-Missing-Ids.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Lista de usuários retornada com sucesso.
+        headers:
+          X-Next-Cursor:
+            type: string
+            description: Valor a enviar em 'after' para obter a próxima página (ausente na última página).
+          X-Missing-Ids:
+            type: string
+            description: IDs pedidos em 'ids' que não foram encontrados, separados por vírgula.
         schema:
           type: array
           items:
@@ -44,36 +86,38 @@ def listar_usuarios():
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Usuarios")
-        usuarios = cursor.fetchall()
-        return (
-            jsonify(
-                [
-                    {
-                        "id_usuario": usuario[0],
-                        "login": usuario[1],
-                        "senha": usuario[2],
-                        "nivel_acesso": usuario[3],
-                        "id_professor": usuario[4],
-                    }
-                    for usuario in usuarios
-                ]
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            limit, after = query.page_args()
+            colunas = query.field_args(COLUNAS, "id_usuario")
+            ids = query.ids_args()
+            if ids is not None:
+                usuarios, faltando = query.fetch_by_keys(
+                    cursor, "Usuarios", "id_usuario", ids, colunas
+                )
+                return query.page_response(
+                    [serializar_usuario(usuario, colunas) for usuario in usuarios],
+                    None,
+                    limit,
+                    faltando,
+                )
+            usuarios, next_after = query.keyset_page(
+                cursor, "Usuarios", "id_usuario", limit, after, columns=colunas
+            )
+            return query.page_response(
+                [serializar_usuario(usuario, colunas) for usuario in usuarios],
+                next_after,
+                limit,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @usuarios_bp.route("/usuarios/<int:id_usuario>", methods=["GET"])
+@etag.conditional("Usuarios")
 def buscar_usuario(id_usuario):
     """
     Busca um usuário pelo ID.
@@ -86,6 +130,11 @@ def buscar_usuario(id_usuario):
         required: true
         type: integer
         description: ID do usuário a ser buscado.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Lista de campos separados por vírgula a retornar (o ID é sempre incluído).
     responses:
       200:
         description: Usuário encontrado com sucesso.
@@ -107,32 +156,23 @@ def buscar_usuario(id_usuario):
       500:
         description: Erro de conexão com o banco de dados.
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM Usuarios WHERE id_usuario = %s", (id_usuario,))
-        usuario = cursor.fetchone()
-        if usuario is None:
-            return jsonify({"error": "Usuário não encontrado"}), 404
-        return (
-            jsonify(
-                {
-                    "id_usuario": usuario[0],
-                    "login": usuario[1],
-                    "senha": usuario[2],
-                    "nivel_acesso": usuario[3],
-                    "id_professor": usuario[4],
-                }
-            ),
-            200,
-        )
+        with bd.transaction(conn) as cursor:
+            colunas = query.field_args(COLUNAS, "id_usuario")
+            usuario = query.fetch_by_key(
+                cursor, "Usuarios", "id_usuario", id_usuario, colunas
+            )
+            if usuario is None:
+                return jsonify({"error": "Usuário não encontrado"}), 404
+            return (
+                jsonify(serializar_usuario(usuario, colunas)),
+                200,
+            )
     except Exception as e:
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @usuarios_bp.route("/usuarios", methods=["POST"])
@@ -181,31 +221,26 @@ def cadastrar_usuario():
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            INSERT INTO Usuarios (login, senha, nivel_acesso, id_professor)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (
-                data["login"],
-                data["senha"],
-                data["nivel_acesso"],
-                data.get("id_professor"),
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO Usuarios (login, senha, nivel_acesso, id_professor)
+                VALUES (%s, %s, %s, %s)
+                """,
+                (
+                    data["login"],
+                    data["senha"],
+                    data["nivel_acesso"],
+                    data.get("id_professor"),
+                ),
+            )
         return jsonify({"message": "Usuário cadastrado com sucesso"}), 201
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @usuarios_bp.route("/usuarios/<int:id_usuario>", methods=["PUT"])
@@ -259,33 +294,28 @@ def alterar_usuario(id_usuario):
               type: string
     """
     data = request.get_json()
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            """
-            UPDATE Usuarios
-            SET login = %s, senha = %s, nivel_acesso = %s, id_professor = %s
-            WHERE id_usuario = %s
-            """,
-            (
-                data["login"],
-                data["senha"],
-                data["nivel_acesso"],
-                data.get("id_professor"),
-                id_usuario,
-            ),
-        )
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute(
+                """
+                UPDATE Usuarios
+                SET login = %s, senha = %s, nivel_acesso = %s, id_professor = %s
+                WHERE id_usuario = %s
+                """,
+                (
+                    data["login"],
+                    data["senha"],
+                    data["nivel_acesso"],
+                    data.get("id_professor"),
+                    id_usuario,
+                ),
+            )
         return jsonify({"message": "Dados do usuário atualizados com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @usuarios_bp.route("/usuarios/<int:id_usuario>", methods=["DELETE"])
@@ -324,17 +354,12 @@ def excluir_usuario(id_usuario):
             error:
               type: string
     """
-    conn = bd.create_connection()
+    conn = bd.get_connection()
     if conn is None:
         return jsonify({"error": "Failed to connect to the database"}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Usuarios WHERE id_usuario = %s", (id_usuario,))
-        conn.commit()
+        with bd.transaction(conn) as cursor:
+            cursor.execute("DELETE FROM Usuarios WHERE id_usuario = %s", (id_usuario,))
         return jsonify({"message": "Usuário excluído com sucesso"}), 200
     except Exception as e:
-        conn.rollback()
         return jsonify({"error": str(e)}), 400
-    finally:
-        cursor.close()
-        conn.close()
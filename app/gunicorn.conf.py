@@ -0,0 +1,73 @@
+"""
+Gunicorn settings for the escola API (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Every setting can be overridden through the environment variable named next
+to it. Each worker process owns its connection pool, so the database sees up
+to workers x pool_max_size connections (app/Util/paramsBD.yml).
+
+Graceful reload: `kill -HUP <master>` replaces the workers one by one after
+they finish their in-flight requests. With preload_app the code is loaded once
+in the master, so a HUP does not pick up code changes; deploy new code with
+`kill -USR2 <master>` (new master) followed by `kill -TERM <old master>`.
+"""
+
+import multiprocessing
+import os
+import shutil
+
+# Must be set before prometheus_client is imported by the app. This file is
+# evaluated again on every HUP, when the variable is already set, so the
+# samples of a previous run are only cleared when the master starts.
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join("/tmp", "escola_metrics")
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# The views block on PostgreSQL; threads let a worker serve other requests
+# meanwhile without the monkey-patching gevent would need for psycopg2.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycle workers periodically to bound memory growth; the jitter keeps them
+# from restarting all at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def pre_fork(server, worker):
+    # Connections opened in the master would be shared by every child.
+    from Util import bd
+
+    bd.close_pool()
+
+
+def post_fork(server, worker):
+    from Util import bd
+
+    bd.after_fork()
+
+
+def post_worker_init(worker):
+    from Util import bd, notifications
+
+    try:
+        bd.get_pool()
+    except Exception as e:
+        # The pool is created lazily on the first request as a fallback.
+        worker.log.warning(f"Could not open the connection pool: {e}")
+    # Threads do not survive fork, so every worker runs its own listener.
+    notifications.start()
+
+
+def child_exit(server, worker):
+    from Util import metrics
+
+    metrics.mark_process_dead(worker.pid)
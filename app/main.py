@@ -11,8 +11,10 @@ from crudUsuarios import usuarios_bp
 from crudDisciplinas import disciplinas_bp
 from crudNotas import notas_bp
 from crudFrequencias import frequencias_bp
+from Util import bd, compression, etag, json_provider, metrics, notifications
 
 import logging
+import os
 
 logging.basicConfig(
     filename="escola_infantil.log",
@@ -20,20 +22,45 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s",
 )
 
-app = Flask(__name__)
-swagger = Swagger(app)
+BLUEPRINTS = (
+    professores_bp,
+    atividades_bp,
+    turmas_bp,
+    alunos_bp,
+    pagamentos_bp,
+    presencas_bp,
+    atividade_aluno_bp,
+    usuarios_bp,
+    disciplinas_bp,
+    notas_bp,
+    frequencias_bp,
+)
+
+
+def create_app(config=None):
+    """
+    Build the Flask application.
+    :param config: Optional mapping merged into app.config
+    :return: Flask app
+    """
+    app = Flask(__name__)
+    if config:
+        app.config.update(config)
+    json_provider.init_app(app)
+    Swagger(app)
+    bd.init_app(app)
+    metrics.init_app(app)
+    # After metrics, so its after_request hook runs first and is timed.
+    compression.init_app(app)
+    etag.init_app(app)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint, url_prefix="/api")
+    return app
 
-app.register_blueprint(professores_bp, url_prefix="/api")
-app.register_blueprint(atividades_bp, url_prefix="/api")
-app.register_blueprint(turmas_bp, url_prefix="/api")
-app.register_blueprint(alunos_bp, url_prefix="/api")
-app.register_blueprint(pagamentos_bp, url_prefix="/api")
-app.register_blueprint(presencas_bp, url_prefix="/api")
-app.register_blueprint(atividade_aluno_bp, url_prefix="/api")
-app.register_blueprint(usuarios_bp, url_prefix="/api")
-app.register_blueprint(disciplinas_bp, url_prefix="/api")
-app.register_blueprint(notas_bp, url_prefix="/api")
-app.register_blueprint(frequencias_bp, url_prefix="/api")
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server only; production runs gunicorn (see gunicorn.conf.py).
+    notifications.start()
+    create_app().run(
+        host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_DEBUG") == "1"
+    )
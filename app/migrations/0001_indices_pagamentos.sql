@@ -0,0 +1,7 @@
+-- migracao: sem-transacao
+-- Índices dos filtros de /api/pagamentos (status, referencia, data).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_pendentes ON Pagamentos (id_pagamento) WHERE status = 'pendente';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_status ON Pagamentos (status, id_pagamento);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_referencia ON Pagamentos (referencia, id_pagamento);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_data ON Pagamentos (data_pagamento);
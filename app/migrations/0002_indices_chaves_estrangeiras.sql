@@ -0,0 +1,15 @@
+-- migracao: sem-transacao
+-- Índices das chaves estrangeiras. Nas tabelas listadas por aluno a chave
+-- primária completa o índice, atendendo também à paginação por ID.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_turma ON Alunos (id_turma);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_turmas_professor ON Turmas (id_professor);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_disciplinas_professor ON Disciplinas (id_professor);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuarios_professor ON Usuarios (id_professor);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notas_aluno ON Notas (id_aluno, id_nota);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notas_disciplina ON Notas (id_disciplina);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_frequencias_aluno ON Frequencias (id_aluno, id_frequencia);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_frequencias_disciplina ON Frequencias (id_disciplina);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_aluno ON Pagamentos (id_aluno, id_pagamento);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_presencas_aluno ON Presencas (id_aluno, id_presenca);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_atividades_alunos_aluno ON Atividades_Alunos (id_aluno, id_atividade);
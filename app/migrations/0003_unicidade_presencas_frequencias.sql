@@ -0,0 +1,49 @@
+-- migracao: sem-transacao
+-- Uma frequência por aluno, disciplina e dia de aula, e uma presença por aluno
+-- e dia, para que os cadastros possam usar INSERT ... ON CONFLICT DO UPDATE.
+-- Duplicatas já existentes são removidas mantendo o registro mais recente.
+--
+-- Os índices são criados sem bloquear escritas, então uma duplicata gravada
+-- entre o DELETE e o fim do CREATE UNIQUE INDEX CONCURRENTLY faz a criação
+-- falhar e deixa o índice INVALID. A migração para com erro e não é
+-- registrada; basta executar as migrações de novo: o índice inválido é
+-- removido e a limpeza e a criação são repetidas.
+
+DELETE FROM Frequencias f
+USING Frequencias g
+WHERE f.id_aluno = g.id_aluno
+  AND f.id_disciplina = g.id_disciplina
+  AND f.data_aula = g.data_aula
+  AND f.id_frequencia < g.id_frequencia;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_frequencias_aluno_disciplina_data
+ON Frequencias (id_aluno, id_disciplina, data_aula);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_frequencias_aluno_disciplina_data') THEN
+        ALTER TABLE Frequencias
+        ADD CONSTRAINT uq_frequencias_aluno_disciplina_data
+        UNIQUE USING INDEX uq_frequencias_aluno_disciplina_data;
+    END IF;
+END
+$$;
+
+DELETE FROM Presencas p
+USING Presencas q
+WHERE p.id_aluno = q.id_aluno
+  AND p.data_presenca = q.data_presenca
+  AND p.id_presenca < q.id_presenca;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_presencas_aluno_data
+ON Presencas (id_aluno, data_presenca);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_presencas_aluno_data') THEN
+        ALTER TABLE Presencas
+        ADD CONSTRAINT uq_presencas_aluno_data
+        UNIQUE USING INDEX uq_presencas_aluno_data;
+    END IF;
+END
+$$;
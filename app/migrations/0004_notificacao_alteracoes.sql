@@ -0,0 +1,31 @@
+-- Avisa os workers da aplicação (LISTEN escola_alteracoes) sempre que uma
+-- tabela é alterada, para que descartem o que tiverem em cache dela. O aviso é
+-- por comando e só é entregue no COMMIT; avisos repetidos na mesma transação
+-- são agrupados pelo PostgreSQL.
+
+CREATE OR REPLACE FUNCTION notificar_alteracao() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('escola_alteracoes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabela TEXT;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY[
+        'professores', 'atividades', 'turmas', 'alunos', 'pagamentos',
+        'presencas', 'atividades_alunos', 'usuarios', 'disciplinas', 'notas',
+        'frequencias'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_alteracao ON %I', tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notificar_alteracao '
+            'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_alteracao()',
+            tabela
+        );
+    END LOOP;
+END
+$$;
@@ -0,0 +1,36 @@
+-- Contador de versão por tabela, usado pela aplicação para gerar ETags e
+-- responder 304 a GETs condicionais. O trigger de alteração da migração 0004
+-- incrementa o contador na própria transação da escrita, então a versão nova
+-- só fica visível para as outras sessões no COMMIT, junto com as linhas que
+-- mudaram, e um ROLLBACK a desfaz.
+--
+-- Cada tabela tem 16 fatias e a versão é a soma delas. Cada sessão incrementa
+-- a fatia de pg_backend_pid() % 16, de modo que escritas concorrentes na mesma
+-- tabela só esperam umas pelas outras (o lock da linha vai até o COMMIT) quando
+-- caem na mesma fatia.
+
+CREATE TABLE IF NOT EXISTS Versoes_Tabelas (
+    tabela VARCHAR(63) NOT NULL,
+    fatia SMALLINT NOT NULL,
+    versao BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tabela, fatia)
+);
+
+INSERT INTO Versoes_Tabelas (tabela, fatia)
+SELECT tabela, fatia
+FROM unnest(ARRAY[
+    'professores', 'atividades', 'turmas', 'alunos', 'pagamentos',
+    'presencas', 'atividades_alunos', 'usuarios', 'disciplinas', 'notas',
+    'frequencias'
+]) AS tabela
+CROSS JOIN generate_series(0, 15) AS fatia
+ON CONFLICT (tabela, fatia) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION notificar_alteracao() RETURNS trigger AS $$
+BEGIN
+    UPDATE Versoes_Tabelas SET versao = versao + 1
+    WHERE tabela = TG_TABLE_NAME AND fatia = pg_backend_pid() % 16;
+    PERFORM pg_notify('escola_alteracoes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,30 @@
+-- Avisa também qual aluno teve notas alteradas ('notas:<id_aluno>'), para que
+-- a aplicação descarte só o boletim desse aluno. O aviso é por linha, mas
+-- avisos iguais na mesma transação são agrupados pelo PostgreSQL, então um
+-- lançamento em lote gera um aviso por aluno. TRUNCATE avisa 'notas:*'.
+
+CREATE OR REPLACE FUNCTION notificar_notas_aluno() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:*');
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.id_aluno IS NOT NULL THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:' || OLD.id_aluno);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.id_aluno IS NOT NULL THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:' || NEW.id_aluno);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notificar_notas_aluno ON Notas;
+CREATE TRIGGER trg_notificar_notas_aluno
+AFTER INSERT OR UPDATE OR DELETE ON Notas
+FOR EACH ROW EXECUTE FUNCTION notificar_notas_aluno();
+
+DROP TRIGGER IF EXISTS trg_notificar_notas_truncate ON Notas;
+CREATE TRIGGER trg_notificar_notas_truncate
+AFTER TRUNCATE ON Notas
+FOR EACH STATEMENT EXECUTE FUNCTION notificar_notas_aluno();
@@ -0,0 +1,66 @@
+-- Totais de frequência por aluno, disciplina e mês, mantidos pelo trigger de
+-- Frequencias na mesma transação de cada escrita, para que os relatórios de
+-- percentual de presença não precisem varrer a tabela de frequências.
+-- O trigger é criado antes da carga inicial: o lock que ele toma em
+-- Frequencias segura as escritas até o COMMIT, então nenhuma fica de fora.
+
+CREATE TABLE IF NOT EXISTS Resumo_Frequencias (
+    id_aluno INT NOT NULL,
+    id_disciplina INT NOT NULL,
+    mes DATE NOT NULL,
+    presencas INT NOT NULL DEFAULT 0,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_aluno, id_disciplina, mes)
+);
+
+CREATE INDEX IF NOT EXISTS idx_resumo_frequencias_disciplina
+ON Resumo_Frequencias (id_disciplina, mes);
+
+CREATE OR REPLACE FUNCTION atualizar_resumo_frequencias() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE Resumo_Frequencias;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE')
+       AND OLD.id_aluno IS NOT NULL AND OLD.id_disciplina IS NOT NULL THEN
+        UPDATE Resumo_Frequencias
+        SET presencas = presencas - OLD.presente::int, total = total - 1
+        WHERE id_aluno = OLD.id_aluno
+          AND id_disciplina = OLD.id_disciplina
+          AND mes = date_trunc('month', OLD.data_aula)::date;
+        DELETE FROM Resumo_Frequencias
+        WHERE id_aluno = OLD.id_aluno
+          AND id_disciplina = OLD.id_disciplina
+          AND mes = date_trunc('month', OLD.data_aula)::date
+          AND total <= 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND NEW.id_aluno IS NOT NULL AND NEW.id_disciplina IS NOT NULL THEN
+        INSERT INTO Resumo_Frequencias AS r (id_aluno, id_disciplina, mes, presencas, total)
+        VALUES (NEW.id_aluno, NEW.id_disciplina, date_trunc('month', NEW.data_aula)::date,
+                NEW.presente::int, 1)
+        ON CONFLICT (id_aluno, id_disciplina, mes) DO UPDATE
+        SET presencas = r.presencas + EXCLUDED.presencas, total = r.total + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumo_frequencias ON Frequencias;
+CREATE TRIGGER trg_resumo_frequencias
+AFTER INSERT OR UPDATE OR DELETE ON Frequencias
+FOR EACH ROW EXECUTE FUNCTION atualizar_resumo_frequencias();
+
+DROP TRIGGER IF EXISTS trg_resumo_frequencias_truncate ON Frequencias;
+CREATE TRIGGER trg_resumo_frequencias_truncate
+AFTER TRUNCATE ON Frequencias
+FOR EACH STATEMENT EXECUTE FUNCTION atualizar_resumo_frequencias();
+
+TRUNCATE Resumo_Frequencias;
+INSERT INTO Resumo_Frequencias (id_aluno, id_disciplina, mes, presencas, total)
+SELECT id_aluno, id_disciplina, date_trunc('month', data_aula)::date,
+       COUNT(*) FILTER (WHERE presente), COUNT(*)
+FROM Frequencias
+WHERE id_aluno IS NOT NULL AND id_disciplina IS NOT NULL
+GROUP BY 1, 2, 3;
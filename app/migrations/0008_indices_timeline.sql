@@ -0,0 +1,9 @@
+-- migracao: sem-transacao
+-- Linha do tempo do aluno (/api/alunos/<id>/timeline): cada fonte é lida por
+-- um índice (id_aluno, data, chave primária), já na ordem da página, com o
+-- cursor resolvido no próprio índice. Presencas já tem o índice único
+-- (id_aluno, data_presenca), com no máximo um registro por dia.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notas_aluno_data ON Notas (id_aluno, data_avaliacao, id_nota);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_frequencias_aluno_data ON Frequencias (id_aluno, data_aula, id_frequencia);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamentos_aluno_data ON Pagamentos (id_aluno, data_pagamento, id_pagamento);
@@ -0,0 +1,29 @@
+-- migracao: sem-transacao
+-- Busca de alunos (/api/alunos/busca): por trigramas (pg_trgm), que tolera
+-- erros de digitação e trechos de nome, ranqueada também pelo texto completo
+-- em português. O texto pesquisado junta nome do aluno, nome do responsável e
+-- a parte do e-mail antes do '@', sem acentos e em minúsculas. O domínio fica
+-- de fora: repetido em quase todas as linhas (gmail.com...), ele faria
+-- qualquer busca com '@' casar a tabela inteira. unaccent() não é IMMUTABLE e
+-- não pode entrar em índice; normalizar_busca() fixa o dicionário e pode. As
+-- chamadas dentro das funções levam o schema porque, desde o PostgreSQL 17,
+-- índices são construídos com search_path restrito a pg_catalog.
+--
+-- O índice é GiST e não GIN porque só o GiST entrega as linhas em ordem de
+-- semelhança (ORDER BY ... <<-> ... LIMIT): a busca ranqueia apenas os
+-- alunos mais parecidos, sem ler todos os que casam com um trecho comum.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION normalizar_busca(texto TEXT) RETURNS TEXT AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, coalesce(texto, '')))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION texto_busca_aluno(nome TEXT, responsavel TEXT, email TEXT)
+RETURNS TEXT AS $$
+    SELECT public.normalizar_busca(concat_ws(' ', nome, responsavel, split_part(email, '@', 1)))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_busca_trgm ON Alunos
+USING gist (texto_busca_aluno(nome_completo, nome_responsavel, email_responsavel) gist_trgm_ops);
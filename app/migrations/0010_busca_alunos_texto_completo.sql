@@ -0,0 +1,7 @@
+-- migracao: sem-transacao
+-- Candidatos da busca de alunos por texto completo em português: acha as
+-- palavras pelo radical ("alunas" acha "aluno") mesmo quando não são próximas
+-- por trigramas do termo pesquisado. Usa o mesmo texto da migração 0009.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_busca_fts ON Alunos
+USING gin (to_tsvector('portuguese', texto_busca_aluno(nome_completo, nome_responsavel, email_responsavel)));
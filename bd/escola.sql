@@ -1,5 +1,8 @@
 -- DROPs --
 
+DROP TABLE IF EXISTS Migracoes;
+DROP TABLE IF EXISTS Versoes_Tabelas;
+DROP TABLE IF EXISTS Resumo_Frequencias;
 DROP TABLE IF EXISTS Frequencias;
 DROP TABLE IF EXISTS Notas;
 DROP TABLE IF EXISTS Disciplinas;
@@ -60,7 +63,8 @@ CREATE TABLE Presencas (
     id_presenca SERIAL PRIMARY KEY,
     id_aluno INT REFERENCES Alunos(id_aluno),
     data_presenca DATE NOT NULL,
-    presente BOOLEAN NOT NULL
+    presente BOOLEAN NOT NULL,
+    CONSTRAINT uq_presencas_aluno_data UNIQUE (id_aluno, data_presenca)
 );
 
 CREATE TABLE Atividades_Alunos (
@@ -96,9 +100,219 @@ CREATE TABLE Frequencias (
     id_aluno INT REFERENCES Alunos(id_aluno),
     id_disciplina INT REFERENCES Disciplinas(id_disciplina),
     data_aula DATE NOT NULL,
-    presente BOOLEAN NOT NULL
+    presente BOOLEAN NOT NULL,
+    CONSTRAINT uq_frequencias_aluno_disciplina_data UNIQUE (id_aluno, id_disciplina, data_aula)
 );
 
+-- Totais por aluno, disciplina e mês, mantidos pelo trigger de Frequencias.
+CREATE TABLE Resumo_Frequencias (
+    id_aluno INT NOT NULL,
+    id_disciplina INT NOT NULL,
+    mes DATE NOT NULL,
+    presencas INT NOT NULL DEFAULT 0,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_aluno, id_disciplina, mes)
+);
+
+-- Versão de cada tabela, usada nas ETags: a soma das fatias da tabela. O
+-- trigger de alteração incrementa a fatia da sessão na própria transação da
+-- escrita, então a versão nova só aparece no COMMIT (ver
+-- app/migrations/0005_versoes_tabelas.sql).
+CREATE TABLE Versoes_Tabelas (
+    tabela VARCHAR(63) NOT NULL,
+    fatia SMALLINT NOT NULL,
+    versao BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tabela, fatia)
+);
+
+INSERT INTO Versoes_Tabelas (tabela, fatia)
+SELECT tabela, fatia
+FROM unnest(ARRAY[
+    'professores', 'atividades', 'turmas', 'alunos', 'pagamentos',
+    'presencas', 'atividades_alunos', 'usuarios', 'disciplinas', 'notas',
+    'frequencias'
+]) AS tabela
+CROSS JOIN generate_series(0, 15) AS fatia;
+
+CREATE TABLE Migracoes (
+    versao VARCHAR(4) PRIMARY KEY,
+    nome VARCHAR(255) NOT NULL,
+    aplicada_em TIMESTAMP NOT NULL DEFAULT now()
+);
+
+
+-- BUSCA --
+
+-- Busca de alunos por trigramas e texto completo, sem acentos (ver
+-- app/migrations/0009_busca_alunos.sql e 0010_busca_alunos_texto_completo.sql).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION normalizar_busca(texto TEXT) RETURNS TEXT AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, coalesce(texto, '')))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION texto_busca_aluno(nome TEXT, responsavel TEXT, email TEXT)
+RETURNS TEXT AS $$
+    SELECT public.normalizar_busca(concat_ws(' ', nome, responsavel, split_part(email, '@', 1)))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+
+-- INDEXES --
+
+-- Filtros de /api/pagamentos: a chave primária fecha cada índice para que a
+-- paginação por id_pagamento seja atendida pelo próprio índice.
+CREATE INDEX idx_pagamentos_pendentes ON Pagamentos (id_pagamento) WHERE status = 'pendente';
+CREATE INDEX idx_pagamentos_status ON Pagamentos (status, id_pagamento);
+CREATE INDEX idx_pagamentos_referencia ON Pagamentos (referencia, id_pagamento);
+CREATE INDEX idx_pagamentos_data ON Pagamentos (data_pagamento);
+
+-- Chaves estrangeiras (nas tabelas listadas por aluno, a chave primária
+-- completa o índice para atender também à paginação por ID).
+CREATE INDEX idx_alunos_turma ON Alunos (id_turma);
+CREATE INDEX idx_turmas_professor ON Turmas (id_professor);
+CREATE INDEX idx_disciplinas_professor ON Disciplinas (id_professor);
+CREATE INDEX idx_usuarios_professor ON Usuarios (id_professor);
+CREATE INDEX idx_notas_aluno ON Notas (id_aluno, id_nota);
+CREATE INDEX idx_notas_disciplina ON Notas (id_disciplina);
+CREATE INDEX idx_frequencias_aluno ON Frequencias (id_aluno, id_frequencia);
+CREATE INDEX idx_frequencias_disciplina ON Frequencias (id_disciplina);
+CREATE INDEX idx_resumo_frequencias_disciplina ON Resumo_Frequencias (id_disciplina, mes);
+CREATE INDEX idx_pagamentos_aluno ON Pagamentos (id_aluno, id_pagamento);
+CREATE INDEX idx_presencas_aluno ON Presencas (id_aluno, id_presenca);
+CREATE INDEX idx_atividades_alunos_aluno ON Atividades_Alunos (id_aluno, id_atividade);
+
+-- Linha do tempo do aluno: (id_aluno, data, chave primária) em cada fonte;
+-- em Presencas serve o índice único (id_aluno, data_presenca).
+CREATE INDEX idx_notas_aluno_data ON Notas (id_aluno, data_avaliacao, id_nota);
+CREATE INDEX idx_frequencias_aluno_data ON Frequencias (id_aluno, data_aula, id_frequencia);
+CREATE INDEX idx_pagamentos_aluno_data ON Pagamentos (id_aluno, data_pagamento, id_pagamento);
+
+-- Busca de alunos (/api/alunos/busca): em ordem de semelhança por trigramas
+-- e por texto completo em português.
+CREATE INDEX idx_alunos_busca_trgm ON Alunos
+USING gist (texto_busca_aluno(nome_completo, nome_responsavel, email_responsavel) gist_trgm_ops);
+CREATE INDEX idx_alunos_busca_fts ON Alunos
+USING gin (to_tsvector('portuguese', texto_busca_aluno(nome_completo, nome_responsavel, email_responsavel)));
+
+
+-- NOTIFICACOES --
+
+-- Avança a versão da tabela usada nas ETags, na própria transação da escrita
+-- (visível só no COMMIT), e avisa os workers da aplicação (LISTEN
+-- escola_alteracoes) para que descartem o que tiverem em cache dela.
+CREATE OR REPLACE FUNCTION notificar_alteracao() RETURNS trigger AS $$
+BEGIN
+    UPDATE Versoes_Tabelas SET versao = versao + 1
+    WHERE tabela = TG_TABLE_NAME AND fatia = pg_backend_pid() % 16;
+    PERFORM pg_notify('escola_alteracoes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabela TEXT;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY[
+        'professores', 'atividades', 'turmas', 'alunos', 'pagamentos',
+        'presencas', 'atividades_alunos', 'usuarios', 'disciplinas', 'notas',
+        'frequencias'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_alteracao ON %I', tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notificar_alteracao '
+            'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_alteracao()',
+            tabela
+        );
+    END LOOP;
+END
+$$;
+
+
+-- Boletins: avisa qual aluno teve notas alteradas ('notas:<id_aluno>').
+CREATE OR REPLACE FUNCTION notificar_notas_aluno() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:*');
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.id_aluno IS NOT NULL THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:' || OLD.id_aluno);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.id_aluno IS NOT NULL THEN
+        PERFORM pg_notify('escola_alteracoes', 'notas:' || NEW.id_aluno);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_notificar_notas_aluno
+AFTER INSERT OR UPDATE OR DELETE ON Notas
+FOR EACH ROW EXECUTE FUNCTION notificar_notas_aluno();
+
+CREATE TRIGGER trg_notificar_notas_truncate
+AFTER TRUNCATE ON Notas
+FOR EACH STATEMENT EXECUTE FUNCTION notificar_notas_aluno();
+
+-- Relatórios de frequência: mantém Resumo_Frequencias a cada escrita.
+CREATE OR REPLACE FUNCTION atualizar_resumo_frequencias() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE Resumo_Frequencias;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE')
+       AND OLD.id_aluno IS NOT NULL AND OLD.id_disciplina IS NOT NULL THEN
+        UPDATE Resumo_Frequencias
+        SET presencas = presencas - OLD.presente::int, total = total - 1
+        WHERE id_aluno = OLD.id_aluno
+          AND id_disciplina = OLD.id_disciplina
+          AND mes = date_trunc('month', OLD.data_aula)::date;
+        DELETE FROM Resumo_Frequencias
+        WHERE id_aluno = OLD.id_aluno
+          AND id_disciplina = OLD.id_disciplina
+          AND mes = date_trunc('month', OLD.data_aula)::date
+          AND total <= 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND NEW.id_aluno IS NOT NULL AND NEW.id_disciplina IS NOT NULL THEN
+        INSERT INTO Resumo_Frequencias AS r (id_aluno, id_disciplina, mes, presencas, total)
+        VALUES (NEW.id_aluno, NEW.id_disciplina, date_trunc('month', NEW.data_aula)::date,
+                NEW.presente::int, 1)
+        ON CONFLICT (id_aluno, id_disciplina, mes) DO UPDATE
+        SET presencas = r.presencas + EXCLUDED.presencas, total = r.total + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_resumo_frequencias
+AFTER INSERT OR UPDATE OR DELETE ON Frequencias
+FOR EACH ROW EXECUTE FUNCTION atualizar_resumo_frequencias();
+
+CREATE TRIGGER trg_resumo_frequencias_truncate
+AFTER TRUNCATE ON Frequencias
+FOR EACH STATEMENT EXECUTE FUNCTION atualizar_resumo_frequencias();
+
+
+-- MIGRACOES --
+
+-- Este script já contém o esquema de todas as migrações de app/migrations;
+-- registrá-las evita que sejam reaplicadas em um banco novo.
+INSERT INTO Migracoes (versao, nome) VALUES
+('0001', 'indices_pagamentos'),
+('0002', 'indices_chaves_estrangeiras'),
+('0003', 'unicidade_presencas_frequencias'),
+('0004', 'notificacao_alteracoes'),
+('0005', 'versoes_tabelas'),
+('0006', 'notificacao_notas_por_aluno'),
+('0007', 'resumo_frequencias'),
+('0008', 'indices_timeline'),
+('0009', 'busca_alunos'),
+('0010', 'busca_alunos_texto_completo');
+
 
 -- INSERTS --
 
@@ -0,0 +1,92 @@
+"""
+Latency of GET /api/alunos/busca on a large Alunos table.
+
+Inserts N synthetic alunos (accented names, mixed case) into the configured
+database inside a transaction, runs the search query of crudAlunos for a few
+typical terms (typos, missing accents, partial names, e-mails) and rolls
+everything back, so the database is left as it was. One extra aluno, inserted
+after all the others, is the only close match for NEEDLE_TERM: it shows up as
+the top result only if candidates are taken in order of similarity, and the
+script exits with status 1 otherwise. The migrations up to 0010 must have
+been applied.
+
+Usage (from the repository root): PYTHONPATH=app python benchmarks/bench_busca.py [N]
+"""
+
+from Util import bd
+import crudAlunos
+import sys
+import time
+
+TERMS = (
+    "joao araujo",
+    "Conceição",
+    "fernadna",
+    "silva sant",
+    "maria@email",
+    "conceicao goncalves rafaela",
+)
+NEEDLE_TERM = "conceicao goncalves rafaela"
+NEEDLE_NAME = "Conceição Gonçalves Raphaela"
+REPEAT = 20
+
+SQL_POPULATE = """
+    INSERT INTO Alunos (nome_completo, data_nascimento, nome_responsavel,
+                        telefone_responsavel, email_responsavel)
+    SELECT (ARRAY['João', 'Fernanda', 'Maria', 'José', 'Letícia', 'Conceição',
+                  'Ângela', 'Raphael'])[1 + i %% 8]
+           || ' ' || (ARRAY['Araújo', 'Silva', 'Santos', 'Gonçalves', 'Lessi',
+                            'Simões'])[1 + i / 8 %% 6]
+           || ' ' || i,
+           DATE '2012-01-01' + i %% 2000,
+           (ARRAY['Maria', 'Antônio', 'Fátima', 'Sérgio'])[1 + i %% 4] || ' ' || i,
+           '11999999999',
+           'resp' || i || '@email.com'
+    FROM generate_series(1, %s) AS i
+"""
+SQL_NEEDLE = """
+    INSERT INTO Alunos (nome_completo, data_nascimento, nome_responsavel,
+                        telefone_responsavel, email_responsavel)
+    VALUES ('Conceição Gonçalves Raphaela', DATE '2015-03-01', 'Sérgio Moura',
+            '11999999999', 'sergio.moura@email.com')
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    conn = bd._connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_POPULATE, (n,))
+        cursor.execute(SQL_NEEDLE)
+        cursor.execute("ANALYZE Alunos")
+        cursor.execute(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+            (str(crudAlunos.SIMILARIDADE_MINIMA),),
+        )
+        needle_found = False
+        print(f"{n} alunos")
+        print(f"{'q':<30}{'results':>8}{'ms/query':>10}  top result")
+        for term in TERMS:
+            params = crudAlunos.parametros_busca(term, 20)
+            cursor.execute(crudAlunos.SQL_BUSCA, params)
+            rows = cursor.fetchall()
+            top = rows[0][1] if rows else "-"
+            if term == NEEDLE_TERM:
+                needle_found = top == NEEDLE_NAME
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                cursor.execute(crudAlunos.SQL_BUSCA, params)
+                cursor.fetchall()
+            seconds = (time.perf_counter() - start) / REPEAT
+            print(f"{term:<30}{len(rows):>8}{seconds * 1000:>10.2f}  {top}")
+    finally:
+        conn.rollback()
+        conn.close()
+    if not needle_found:
+        print(f"{NEEDLE_NAME} is not the top result for {NEEDLE_TERM!r}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Encode time of the JSON providers on list-endpoint-shaped payloads.
+
+Compares Flask's default provider, the fallback EscolaJSONProvider and the
+orjson-backed OrjsonProvider building a full response (app.json.response, as
+jsonify does) for pages of Frequencias, Alunos and Pagamentos rows.
+
+Usage (from the repository root): PYTHONPATH=app python benchmarks/bench_json.py
+"""
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from Util import json_provider
+import datetime
+import decimal
+import timeit
+
+SIZES = (100, 1000, 10000)
+
+
+def frequencias(n):
+    return [
+        {
+            "id_frequencia": i,
+            "id_aluno": i % 500,
+            "id_disciplina": i % 12,
+            "data_aula": datetime.date(2024, 3, 1) + datetime.timedelta(days=i % 180),
+            "presente": i % 7 != 0,
+        }
+        for i in range(n)
+    ]
+
+
+def alunos(n):
+    return [
+        {
+            "id_aluno": i,
+            "nome_completo": f"Aluno Número {i} da Conceição",
+            "data_nascimento": datetime.date(2012, 1, 1)
+            + datetime.timedelta(days=i % 2000),
+            "id_turma": i % 20,
+            "nome_responsavel": f"Responsável {i}",
+            "telefone_responsavel": "11999999999",
+            "email_responsavel": f"responsavel{i}@email.com",
+            "informacoes_adicionais": "Nenhuma",
+        }
+        for i in range(n)
+    ]
+
+
+def pagamentos(n):
+    return [
+        {
+            "id_pagamento": i,
+            "id_aluno": i % 500,
+            "data_pagamento": datetime.date(2024, 1, 5)
+            + datetime.timedelta(days=i % 365),
+            "valor_pago": decimal.Decimal("450.00") + i % 10,
+            "forma_pagamento": "boleto",
+            "referencia": "2024-01",
+            "status": "pago",
+        }
+        for i in range(n)
+    ]
+
+
+PROVIDERS = (
+    ("flask default", DefaultJSONProvider),
+    ("EscolaJSONProvider", json_provider.EscolaJSONProvider),
+    ("OrjsonProvider", json_provider.OrjsonProvider),
+)
+
+
+def bench(provider_class, payload):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+
+    def encode():
+        return app.json.response(payload).get_data()
+
+    with app.app_context():
+        number = max(1, 20000 // len(payload))
+        best = min(timeit.repeat(encode, number=number, repeat=5))
+    return best / number
+
+
+def main():
+    print(f"{'payload':<22}{'provider':<22}{'ms/response':>12}{'speedup':>10}")
+    for name, build in (
+        ("frequencias", frequencias),
+        ("alunos", alunos),
+        ("pagamentos", pagamentos),
+    ):
+        for size in SIZES:
+            payload = build(size)
+            baseline = None
+            for label, provider_class in PROVIDERS:
+                seconds = bench(provider_class, payload)
+                baseline = baseline or seconds
+                print(
+                    f"{name + ' x' + str(size):<22}{label:<22}"
+                    f"{seconds * 1000:>12.3f}{baseline / seconds:>9.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.Util import bd
+import psycopg2
+from flask import Flask
+
+
+def make_raw_connection():
+    raw = MagicMock()
+    raw.closed = 0
+    raw.get_transaction_status.return_value = (
+        psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    )
+    return raw
+
+
+def test_pool_reuses_released_connection():
+    connect = MagicMock(side_effect=make_raw_connection)
+    pool = bd.ConnectionPool(connect, min_size=0, max_size=2)
+
+    first = pool.getconn()
+    pool.putconn(first)
+    second = pool.getconn()
+
+    assert first is second
+    assert connect.call_count == 1
+
+
+def test_pool_opens_min_size_eagerly():
+    connect = MagicMock(side_effect=make_raw_connection)
+    pool = bd.ConnectionPool(connect, min_size=2, max_size=4)
+
+    assert connect.call_count == 2
+    assert pool.stats() == {"open": 2, "idle": 2, "in_use": 0, "max_size": 4}
+
+
+def test_pool_timeout_when_exhausted():
+    pool = bd.ConnectionPool(make_raw_connection, min_size=0, max_size=1, timeout=0.05)
+    pool.getconn()
+
+    with pytest.raises(bd.PoolTimeout):
+        pool.getconn()
+
+
+def test_pool_waits_for_release():
+    pool = bd.ConnectionPool(make_raw_connection, min_size=0, max_size=1, timeout=2)
+    raw = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(raw,)).start()
+
+    assert pool.getconn() is raw
+
+
+def test_pool_recycles_after_max_uses():
+    connect = MagicMock(side_effect=make_raw_connection)
+    pool = bd.ConnectionPool(connect, min_size=0, max_size=1, max_uses=2)
+
+    raw = pool.getconn()
+    pool.putconn(raw)
+    assert pool.getconn() is raw
+    pool.putconn(raw)
+
+    assert pool.getconn() is not raw
+    raw.close.assert_called_once()
+
+
+def test_pool_recycles_after_max_lifetime():
+    pool = bd.ConnectionPool(
+        make_raw_connection, min_size=0, max_size=1, max_lifetime=10
+    )
+    raw = pool.getconn()
+    pool.putconn(raw)
+
+    with patch("app.Util.bd.time.monotonic", return_value=bd.time.monotonic() + 11):
+        assert pool.getconn() is not raw
+
+
+def test_pool_discards_connection_failing_validation():
+    pool = bd.ConnectionPool(
+        make_raw_connection, min_size=0, max_size=1, validate_after=0
+    )
+    raw = pool.getconn()
+    pool.putconn(raw)
+    raw.cursor.return_value.execute.side_effect = psycopg2.OperationalError()
+
+    assert pool.getconn() is not raw
+
+
+def test_pool_rolls_back_open_transaction_on_release():
+    pool = bd.ConnectionPool(make_raw_connection, min_size=0, max_size=1)
+    raw = pool.getconn()
+    raw.get_transaction_status.return_value = (
+        psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    )
+
+    pool.putconn(raw)
+
+    raw.rollback.assert_called_once()
+
+
+def test_pool_validates_without_holding_the_lock():
+    pool = bd.ConnectionPool(
+        make_raw_connection, min_size=0, max_size=2, validate_after=0
+    )
+    stale, other = pool.getconn(), pool.getconn()
+    pool.putconn(stale)
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_select(sql):
+        started.set()
+        release.wait(2)
+        done.set()
+
+    stale.cursor.return_value.execute.side_effect = slow_select
+    checkout = threading.Thread(target=pool.getconn)
+    checkout.start()
+    started.wait(1)
+
+    pool.putconn(other)
+
+    assert not done.is_set()
+    release.set()
+    checkout.join(1)
+    assert pool.stats()["in_use"] == 1
+
+
+def test_pool_rolls_back_without_holding_the_lock():
+    pool = bd.ConnectionPool(make_raw_connection, min_size=0, max_size=1)
+    raw = pool.getconn()
+    raw.get_transaction_status.return_value = (
+        psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    )
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_rollback():
+        started.set()
+        release.wait(2)
+        done.set()
+
+    raw.rollback.side_effect = slow_rollback
+    checkin = threading.Thread(target=pool.putconn, args=(raw,))
+    checkin.start()
+    started.wait(1)
+
+    pool.stats()
+
+    assert not done.is_set()
+    release.set()
+    checkin.join(1)
+    assert pool.stats()["idle"] == 1
+
+
+def test_pool_failed_connect_wakes_waiter():
+    started, fail = threading.Event(), threading.Event()
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            fail.wait(2)
+            raise psycopg2.OperationalError()
+        return make_raw_connection()
+
+    pool = bd.ConnectionPool(connect, min_size=0, max_size=1, timeout=5)
+    results, errors = [], []
+
+    def failing_checkout():
+        try:
+            pool.getconn()
+        except psycopg2.OperationalError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=failing_checkout)
+    second = threading.Thread(target=lambda: results.append(pool.getconn()))
+    first.start()
+    started.wait(1)
+    second.start()
+    second.join(0.05)
+    fail.set()
+
+    second.join(1)
+    first.join(1)
+    assert results and errors
+
+
+def test_pooled_connection_close_returns_to_pool():
+    pool = bd.ConnectionPool(make_raw_connection, min_size=0, max_size=1)
+    conn = bd.PooledConnection(pool, pool.getconn())
+
+    conn.close()
+    conn.close()
+
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+@patch("app.Util.bd.get_pool")
+def test_create_connection_failure_returns_none(mock_get_pool):
+    mock_get_pool.side_effect = psycopg2.OperationalError("down")
+
+    assert bd.create_connection() is None
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    bd.init_app(app)
+    return app
+
+
+@patch("app.Util.bd.create_connection")
+def test_get_connection_is_request_scoped(mock_create_connection, app):
+    mock_conn = MagicMock()
+    mock_create_connection.return_value = mock_conn
+
+    with app.test_request_context():
+        assert bd.get_connection() is bd.get_connection()
+        mock_conn.close.assert_not_called()
+
+    assert mock_create_connection.call_count == 1
+    mock_conn.close.assert_called_once()
+
+
+@patch("app.Util.bd.create_connection")
+def test_transaction_commits_on_success(mock_create_connection, app):
+    mock_conn = MagicMock()
+    mock_create_connection.return_value = mock_conn
+
+    with app.test_request_context():
+        with bd.transaction() as cursor:
+            cursor.execute("SELECT 1")
+
+    mock_conn.commit.assert_called_once()
+    mock_conn.rollback.assert_not_called()
+
+
+@patch("app.Util.bd.create_connection")
+def test_transaction_rolls_back_on_error(mock_create_connection, app):
+    mock_conn = MagicMock()
+    mock_create_connection.return_value = mock_conn
+
+    with app.test_request_context():
+        with pytest.raises(ValueError):
+            with bd.transaction():
+                raise ValueError("boom")
+
+    mock_conn.rollback.assert_called_once()
+    mock_conn.commit.assert_not_called()
+
+
+@patch("app.Util.bd.create_connection")
+def test_nested_transaction_joins_outer(mock_create_connection, app):
+    mock_conn = MagicMock()
+    mock_create_connection.return_value = mock_conn
+
+    with app.test_request_context():
+        with bd.transaction():
+            with bd.transaction():
+                pass
+            mock_conn.commit.assert_not_called()
+
+    mock_conn.commit.assert_called_once()
+    assert mock_create_connection.call_count == 1
+
+
+def test_after_fork_drops_inherited_pool_without_closing_it():
+    raw = make_raw_connection()
+    pool = bd.ConnectionPool(lambda: raw, min_size=1, max_size=1)
+    with patch("app.Util.bd._pool", pool):
+        bd.after_fork()
+        assert bd._pool is None
+
+    raw.close.assert_not_called()
+    assert pool in bd._inherited_pools
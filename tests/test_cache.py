@@ -0,0 +1,121 @@
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.Util import cache
+
+
+def test_cache_counts_hits_and_misses():
+    ttl_cache = cache.TTLCache("teste", ttl=60)
+
+    assert ttl_cache.get("a") is None
+    ttl_cache.set("a", [1])
+
+    assert ttl_cache.get("a") == [1]
+    assert ttl_cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_cache_entry_expires_after_ttl():
+    ttl_cache = cache.TTLCache("teste", ttl=10)
+    ttl_cache.set("a", [1])
+
+    with patch(
+        "app.Util.cache.time.monotonic", return_value=cache.time.monotonic() + 11
+    ):
+        assert ttl_cache.get("a") is None
+
+    assert ttl_cache.stats()["entries"] == 0
+
+
+def test_cache_discards_value_loaded_before_invalidation():
+    ttl_cache = cache.TTLCache("teste", ttl=60)
+    generation = ttl_cache.generation
+
+    ttl_cache.invalidate()
+    ttl_cache.set("a", ["antigo"], generation)
+
+    assert ttl_cache.get("a") is None
+
+
+def test_cache_discard_drops_only_that_key():
+    ttl_cache = cache.TTLCache("teste", ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    generation = ttl_cache.generation
+
+    ttl_cache.discard("a")
+    ttl_cache.set("c", 3, generation)
+
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+    assert ttl_cache.get("c") is None
+
+
+def test_cache_evicts_least_recently_used():
+    ttl_cache = cache.TTLCache("teste", ttl=60, max_entries=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+
+
+def test_invalidate_by_table_name():
+    tabela = cache.get_cache("TabelaTeste")
+    tabela.set("a", 1)
+
+    cache.invalidate("TabelaTeste")
+
+    assert tabela.get("a") is None
+    assert cache.get_cache("TabelaTeste") is tabela
+
+
+@patch("app.Util.cache.bd.get_connection")
+def test_cached_page_le_do_banco_uma_vez(mock_get_connection):
+    cache.invalidate("PaginaTeste")
+    cursor = mock_get_connection.return_value.cursor.return_value
+    cursor.fetchall.return_value = [(1, "a"), (2, "b")]
+
+    def serializar(linha, colunas):
+        return dict(zip(colunas, linha))
+
+    primeira = cache.cached_page(
+        "PaginaTeste", "id", serializar, 10, None, ("id", "nome")
+    )
+    segunda = cache.cached_page(
+        "PaginaTeste", "id", serializar, 10, None, ("id", "nome")
+    )
+
+    assert primeira == ([{"id": 1, "nome": "a"}, {"id": 2, "nome": "b"}], None, ())
+    assert segunda == primeira
+    assert cursor.execute.call_count == 1
+
+
+@patch("app.Util.cache.bd.get_connection")
+def test_cached_page_nao_guarda_leitura_invalidada(mock_get_connection):
+    cache.invalidate("PaginaTeste")
+    cursor = mock_get_connection.return_value.cursor.return_value
+    cursor.fetchall.return_value = [(1,)]
+    # Uma escrita confirmada durante a leitura invalida o cache da tabela.
+    cursor.execute.side_effect = lambda *args: cache.invalidate("PaginaTeste")
+
+    def serializar(linha, colunas):
+        return linha[0]
+
+    pagina = cache.cached_page("PaginaTeste", "id", serializar, 10, None, ("id",))
+
+    assert pagina == ([1], None, ())
+    assert cache.get_cache("PaginaTeste").get((10, None, ("id",), None)) is None
+
+
+@patch("app.Util.cache.bd.get_connection", return_value=None)
+def test_cached_page_sem_conexao(mock_get_connection):
+    cache.invalidate("PaginaTeste")
+
+    pagina = cache.cached_page("PaginaTeste", "id", MagicMock(), 10, None, ("id",))
+
+    assert pagina is None
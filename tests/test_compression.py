@@ -0,0 +1,171 @@
+import pytest
+from flask import Flask, Response, jsonify
+from unittest.mock import patch, MagicMock
+import gzip
+import zlib
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app import crudAlunos
+from app.Util import compression
+
+etag = crudAlunos.etag
+
+ALUNOS = [{"id_aluno": i, "nome_completo": f"Aluno {i}"} for i in range(100)]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    compression.init_app(app)
+    etag.init_app(app)
+    app.testing = True
+    etag.VERSIONS.invalidate()
+
+    @app.route("/alunos")
+    @etag.conditional("Alunos")
+    def listar():
+        return jsonify(ALUNOS)
+
+    @app.route("/pequeno")
+    def pequeno():
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        return Response((f"{i},linha\n" for i in range(1000)), mimetype="text/csv")
+
+    @app.route("/imagem")
+    def imagem():
+        return Response(b"\x89PNG" * 500, mimetype="image/png")
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def mock_versions(mock_create_connection):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [("alunos", 1)]
+    return mock_cursor
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_gzip_acima_do_limite(mock_create_connection, client):
+    mock_versions(mock_create_connection)
+
+    response = client.get("/alunos", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data) == client.get("/alunos").data
+
+
+def test_abaixo_do_limite_nao_comprime(client):
+    response = client.get("/pequeno", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json == {"ok": True}
+
+
+def test_tipo_nao_compressivel_nao_comprime(client):
+    response = client.get("/imagem", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_sem_accept_encoding_responde_identidade(mock_create_connection, client):
+    mock_versions(mock_create_connection)
+
+    response = client.get("/alunos", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json == ALUNOS
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_brotli_preferido_quando_aceito(mock_create_connection, client):
+    brotli = pytest.importorskip("brotli")
+    mock_versions(mock_create_connection)
+
+    response = client.get("/alunos", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == client.get("/alunos").data
+
+
+def test_stream_comprimido_por_partes(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    expected = "".join(f"{i},linha\n" for i in range(1000)).encode()
+    assert zlib.decompress(response.data, 31) == expected
+
+
+def test_compress_stream_descarrega_cada_parte():
+    config = dict(compression.DEFAULTS)
+    decompressor = zlib.decompressobj(31)
+
+    chunks = compression.compress_stream(iter([b"a" * 100, b"b" * 100]), "gzip", config)
+
+    # Each chunk is fully decodable as soon as it is yielded.
+    assert decompressor.decompress(next(chunks)) == b"a" * 100
+    assert decompressor.decompress(next(chunks)) == b"b" * 100
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_bytes_comprimidos_reaproveitados_pelo_etag(
+    mock_create_connection, app, client
+):
+    mock_versions(mock_create_connection)
+    cache = app.extensions[compression.EXTENSION]["cache"]
+
+    first = client.get("/alunos", headers={"Accept-Encoding": "gzip"})
+    with patch.object(compression, "compress", wraps=compression.compress) as spy:
+        second = client.get("/alunos", headers={"Accept-Encoding": "gzip"})
+
+    assert spy.call_count == 0
+    assert second.data == first.data
+    assert cache.stats()["hits"] == 1
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_etag_fraco_continua_respondendo_304(mock_create_connection, client):
+    mock_versions(mock_create_connection)
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/alunos", headers=headers)
+    second = client.get(
+        "/alunos", headers={**headers, "If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.headers["ETag"].startswith("W/")
+    assert second.status_code == 304
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_swagger_ui_comprimido():
+    from flasgger import Swagger
+
+    app = Flask(__name__)
+    Swagger(app)
+    compression.init_app(app)
+    client = app.test_client()
+
+    response = client.get(
+        "/flasgger_static/swagger-ui-bundle.js", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).startswith(b"!function")
@@ -4,9 +4,10 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 import json
+import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from app.crudAlunos import alunos_bp
+from app.crudAlunos import alunos_bp, parametros_busca, sql_timeline
 
 
 @pytest.fixture
@@ -163,3 +164,292 @@ def test_excluir_aluno_db_failure(mock_create_connection, client):
 
     assert response.status_code == 500
     assert b"Failed to connect to the database" in response.data
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_paginacao(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (i, f"Aluno {i}", "2010-05-10", 1, "Resp", "11", "r@email.com", None)
+        for i in (11, 12, 13)
+    ]
+
+    response = client.get("/alunos?limit=2&after=10")
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [a["id_aluno"] for a in data] == [11, 12]
+    assert response.headers["X-Next-Cursor"] == "12"
+    assert "after=12" in response.headers["Link"]
+    sql, params = mock_cursor.execute.call_args[0]
+    assert "id_aluno) > (%s)" in sql and "ORDER BY id_aluno LIMIT %s" in sql
+    assert params == [10, 3]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_limite_maximo(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/alunos?limit=1000000")
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert mock_cursor.execute.call_args[0][1] == [1001]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_limite_invalido(mock_create_connection, client):
+    mock_create_connection.return_value = MagicMock()
+
+    response = client.get("/alunos?limit=abc")
+
+    assert response.status_code == 400
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_fields(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, "Aluno Teste")]
+
+    response = client.get("/alunos?fields=nome_completo")
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == [
+        {"id_aluno": 1, "nome_completo": "Aluno Teste"}
+    ]
+    sql = mock_cursor.execute.call_args[0][0]
+    assert sql.startswith("SELECT id_aluno, nome_completo FROM Alunos")
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_fields_invalido(mock_create_connection, client):
+    mock_create_connection.return_value = MagicMock()
+
+    response = client.get("/alunos?fields=nome_completo,senha")
+
+    assert response.status_code == 400
+    assert b"senha" in response.data
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_buscar_aluno_fields(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (1, "Aluno Teste", 2)
+
+    response = client.get("/alunos/1?fields=id_turma,nome_completo")
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == {
+        "id_aluno": 1,
+        "nome_completo": "Aluno Teste",
+        "id_turma": 2,
+    }
+    sql, params = mock_cursor.execute.call_args[0]
+    assert (
+        sql
+        == "SELECT id_aluno, nome_completo, id_turma FROM Alunos WHERE id_aluno = %s"
+    )
+    assert params == (1,)
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_por_ids_preserva_ordem(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, "Aluno Um"), (3, "Aluno Três")]
+
+    response = client.get("/alunos?ids=3,7,1,3&fields=nome_completo")
+
+    assert response.status_code == 200
+    assert [aluno["id_aluno"] for aluno in response.json] == [3, 1]
+    assert response.headers["X-Missing-Ids"] == "7"
+    assert "X-Next-Cursor" not in response.headers
+    assert mock_cursor.execute.call_count == 1
+    sql, params = mock_cursor.execute.call_args.args
+    assert "id_aluno = ANY(%s)" in sql
+    assert params == [[3, 7, 1]]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_listar_alunos_ids_invalidos(mock_create_connection, client):
+    mock_create_connection.return_value = MagicMock()
+
+    response = client.get("/alunos?ids=1,dois")
+
+    assert response.status_code == 400
+    assert "ids" in response.json["error"]
+
+
+def evento(tipo, id_evento, dia):
+    return (tipo, id_evento, datetime.date(2024, 6, dia), {"presente": True})
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_timeline_aluno_primeira_pagina(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        evento("presenca", 9, 21),
+        evento("nota", 15, 20),
+        evento("frequencia", 40, 20),
+    ]
+
+    response = client.get("/alunos/1/timeline?limit=2")
+
+    assert response.status_code == 200
+    assert response.json[0] == {
+        "tipo": "presenca",
+        "id": 9,
+        "data": "2024-06-21",
+        "detalhes": {"presente": True},
+    }
+    assert len(response.json) == 2
+    assert response.headers["X-Next-Cursor"] == "2024-06-20,nota,15"
+    assert "before=2024-06-20%2Cnota%2C15" in response.headers["Link"]
+    assert mock_cursor.execute.call_count == 1
+    sql, params = mock_cursor.execute.call_args.args
+    assert sql.count("UNION ALL") == 3
+    assert sql.endswith("ORDER BY data DESC, tipo DESC, id DESC LIMIT %s")
+    assert params == [1, 3, 1, 3, 1, 3, 1, 3, 3]
+
+
+def test_sql_timeline_cursor_resolvido_por_fonte():
+    sql, params = sql_timeline(1, (datetime.date(2024, 6, 20), "nota", 15), 10)
+
+    assert "data_aula <= %s" in sql
+    assert "(data_avaliacao, id_nota) < (%s, %s)" in sql
+    assert "data_pagamento < %s" in sql
+    assert "data_presenca < %s" in sql
+    assert params[:3] == [1, datetime.date(2024, 6, 20), 11]
+    assert params[3:7] == [1, datetime.date(2024, 6, 20), 15, 11]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_timeline_aluno_before_data(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/alunos/1/timeline?before=2024-06-01")
+
+    assert response.status_code == 200
+    assert response.json == []
+    sql, params = mock_cursor.execute.call_args_list[0].args
+    assert "<=" not in sql
+    assert params.count(datetime.date(2024, 6, 1)) == 4
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_timeline_aluno_sem_eventos(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+    mock_cursor.fetchone.return_value = (1,)
+
+    response = client.get("/alunos/1/timeline")
+
+    assert response.status_code == 200
+    assert response.json == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_timeline_aluno_inexistente(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+    mock_cursor.fetchone.return_value = None
+
+    response = client.get("/alunos/99/timeline")
+
+    assert response.status_code == 404
+    assert mock_cursor.execute.call_args.args == (
+        "SELECT 1 FROM Alunos WHERE id_aluno = %s",
+        (99,),
+    )
+
+
+def test_timeline_aluno_rejeita_after(client):
+    response = client.get("/alunos/1/timeline?after=10")
+
+    assert response.status_code == 400
+    assert "before" in response.json["error"]
+
+
+def test_timeline_aluno_before_invalido(client):
+    response = client.get("/alunos/1/timeline?before=2024-06-20,aula,1")
+
+    assert response.status_code == 400
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_busca_alunos_ordenada_por_relevancia(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (2, "João Araújo", datetime.date(2015, 3, 1), 1, "Maria", "m@x.com", 1.5),
+        (1, "Joana Silva", datetime.date(2014, 5, 2), 1, "José", "j@x.com", 0.6),
+    ]
+
+    response = client.get("/alunos/busca?q= joao araujo &limit=10")
+
+    assert response.status_code == 200
+    assert [aluno["id_aluno"] for aluno in response.json] == [2, 1]
+    assert response.json[0]["data_nascimento"] == "2015-03-01"
+    assert response.json[0]["relevancia"] == 1.5
+    limiar, busca = mock_cursor.execute.call_args_list
+    assert "pg_trgm.word_similarity_threshold" in limiar.args[0]
+    sql, params = busca.args
+    assert "<%" in sql
+    assert "plainto_tsquery('portuguese'" in sql
+    candidatos = sql[: sql.index("SELECT id_aluno, nome_completo")]
+    assert "ORDER BY normalizar_busca(%(q)s) <<->" in candidatos
+    assert "@@ plainto_tsquery('portuguese'" in candidatos
+    assert candidatos.count("LIMIT %(candidatos)s") == 2
+    assert params == {"q": "joao araujo", "limit": 10, "candidatos": 50}
+
+
+def test_parametros_busca_candidatos_cobrem_a_pagina():
+    assert parametros_busca("silva", 20)["candidatos"] == 50
+    assert parametros_busca("silva", 500)["candidatos"] == 500
+
+
+def test_busca_alunos_termo_curto(client):
+    response = client.get("/alunos/busca?q=jo")
+
+    assert response.status_code == 400
+    assert "q" in response.json["error"]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_busca_alunos_db_failure(mock_create_connection, client):
+    mock_create_connection.return_value = None
+
+    response = client.get("/alunos/busca?q=joana")
+
+    assert response.status_code == 500
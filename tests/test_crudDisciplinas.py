@@ -6,7 +6,7 @@ import os
 import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from app.crudDisciplinas import disciplinas_bp
+from app.crudDisciplinas import disciplinas_bp, CACHE
 
 
 @pytest.fixture
@@ -17,6 +17,11 @@ def client():
     return app.test_client()
 
 
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    CACHE.invalidate()
+
+
 @patch("app.crudDisciplinas.bd.create_connection")
 def test_listar_disciplinas_success(mock_create_connection, client):
     mock_conn = MagicMock()
@@ -8,6 +8,7 @@ import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.crudFrequencias import frequencias_bp
+from app.Util import json_provider
 
 
 @pytest.fixture
@@ -18,6 +19,15 @@ def client():
     return app.test_client()
 
 
+@pytest.fixture
+def client_app():
+    app = Flask(__name__)
+    app.register_blueprint(frequencias_bp)
+    json_provider.init_app(app)
+    app.testing = True
+    return app.test_client()
+
+
 @patch("app.crudFrequencias.bd.create_connection")
 def test_listar_frequencias_success(mock_create_connection, client):
     mock_conn = MagicMock()
@@ -119,6 +129,8 @@ def test_cadastrar_frequencia_success(mock_create_connection, client):
     assert response.status_code == 201
     data = json.loads(response.data)
     assert data["message"] == "Frequência cadastrada com sucesso"
+    sql = mock_cursor.execute.call_args[0][0]
+    assert "ON CONFLICT (id_aluno, id_disciplina, data_aula) DO UPDATE" in sql
 
 
 @patch("app.crudFrequencias.bd.create_connection")
@@ -201,3 +213,354 @@ def test_excluir_frequencia_db_failure(mock_create_connection, client):
 
     assert response.status_code == 500
     assert b"Failed to connect to the database" in response.data
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_listar_frequencias_paginacao(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (i, 1, 2, datetime.date(2024, 6, 20), True) for i in range(1, 4)
+    ]
+
+    response = client.get("/frequencias?limit=2")
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data) == 2
+    assert response.headers["X-Next-Cursor"] == "2"
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_buscar_frequencias_por_aluno_pagina_vazia(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/frequencias/aluno/1?after=50")
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == []
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_listar_frequencias_stream_ndjson(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchmany.side_effect = [
+        [(1, 1, 2, datetime.date(2024, 6, 20), True)],
+        [(2, 3, 2, datetime.date(2024, 6, 20), False)],
+        [],
+    ]
+
+    response = client.get("/frequencias?stream=ndjson")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in response.data.splitlines()]
+    assert [linha["id_frequencia"] for linha in linhas] == [1, 2]
+    assert "name" in mock_conn.cursor.call_args.kwargs
+    mock_conn.close.assert_called()
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_listar_frequencias_stream_json(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchmany.side_effect = [
+        [(1, 1, 2, datetime.date(2024, 6, 20), True)],
+        [(2, 3, 2, datetime.date(2024, 6, 20), False)],
+        [],
+    ]
+
+    response = client.get("/frequencias?stream=json")
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [f["id_frequencia"] for f in data] == [1, 2]
+
+
+def test_listar_frequencias_stream_formato_invalido(client):
+    response = client.get("/frequencias?stream=xml")
+
+    assert response.status_code == 400
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_cadastrar_frequencias_lote_success(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (1,)
+    # Alunos existentes, depois o RETURNING (xmax = 0) do upsert.
+    mock_cursor.fetchall.side_effect = [[(1,), (2,)], [(True,), (True,)]]
+
+    response = client.post(
+        "/frequencias/lote",
+        json={
+            "id_disciplina": 2,
+            "data_aula": "2024-06-20",
+            "registros": [
+                {"id_aluno": 1, "presente": True},
+                {"id_aluno": 2, "presente": False},
+                {"id_aluno": 99, "presente": True},
+                {"id_aluno": 1, "presente": True},
+                {"presente": True},
+            ],
+        },
+    )
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data["inseridos"] == 2
+    assert data["atualizados"] == 0
+    assert [f["indice"] for f in data["falhas"]] == [2, 3, 4]
+    assert data["falhas"][0]["error"] == "Aluno não encontrado"
+    sql, params = mock_cursor.execute.call_args[0]
+    assert sql.count("(%s, %s, %s, %s)") == 2
+    assert "ON CONFLICT (id_aluno, id_disciplina, data_aula) DO UPDATE" in sql
+    assert params == [
+        1,
+        2,
+        datetime.date(2024, 6, 20),
+        True,
+        2,
+        2,
+        datetime.date(2024, 6, 20),
+        False,
+    ]
+    mock_conn.commit.assert_called_once()
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_cadastrar_frequencias_lote_reenvio_conta_atualizados(
+    mock_create_connection, client
+):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (1,)
+    # Aluno 1 é novo, aluno 2 mudou de presença e aluno 3 veio igual.
+    mock_cursor.fetchall.side_effect = [[(1,), (2,), (3,)], [(True,), (False,)]]
+
+    response = client.post(
+        "/frequencias/lote",
+        json={
+            "id_disciplina": 2,
+            "data_aula": "2024-06-20",
+            "registros": [
+                {"id_aluno": 1, "presente": True},
+                {"id_aluno": 2, "presente": True},
+                {"id_aluno": 3, "presente": False},
+            ],
+        },
+    )
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert (data["inseridos"], data["atualizados"], data["inalterados"]) == (1, 1, 1)
+    assert mock_cursor.execute.call_args[0][0].endswith("RETURNING (xmax = 0)")
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_cadastrar_frequencias_lote_sem_registros_validos(
+    mock_create_connection, client
+):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (1,)
+    mock_cursor.fetchall.return_value = []
+
+    response = client.post(
+        "/frequencias/lote",
+        json={
+            "id_disciplina": 2,
+            "data_aula": "2024-06-20",
+            "registros": [{"id_aluno": 99, "presente": True}],
+        },
+    )
+
+    assert response.status_code == 400
+    assert json.loads(response.data)["falhas"][0]["id_aluno"] == 99
+
+
+def test_cadastrar_frequencias_lote_payload_invalido(client):
+    response = client.post("/frequencias/lote", json={"id_disciplina": 2})
+
+    assert response.status_code == 400
+
+
+def test_cadastrar_frequencias_lote_corpo_nao_objeto(client):
+    response = client.post(
+        "/frequencias/lote", json=[{"id_aluno": 1, "presente": True}]
+    )
+
+    assert response.status_code == 400
+    assert "objeto" in response.json["error"]
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_listar_frequencias_colunar(mock_create_connection, client_app):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (1, 1, 2, datetime.date(2024, 6, 20), True),
+        (2, 3, 2, datetime.date(2024, 6, 20), False),
+    ]
+
+    response = client_app.get("/frequencias?format=columnar")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.escola.columns+json"
+    assert response.get_json() == {
+        "columns": [
+            "id_frequencia",
+            "id_aluno",
+            "id_disciplina",
+            "data_aula",
+            "presente",
+        ],
+        "rows": [[1, 1, 2, "2024-06-20", True], [2, 3, 2, "2024-06-20", False]],
+    }
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_listar_frequencias_colunar_por_accept(mock_create_connection, client_app):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (i, 1, datetime.date(2024, 6, 20)) for i in range(1, 4)
+    ]
+
+    response = client_app.get(
+        "/frequencias?fields=id_aluno,data_aula&limit=2",
+        headers={"Accept": "application/vnd.escola.columns+json"},
+    )
+
+    data = response.get_json()
+    assert data["columns"] == ["id_frequencia", "id_aluno", "data_aula"]
+    assert len(data["rows"]) == 2
+    assert response.headers["X-Next-Cursor"] == "2"
+    assert "Accept" in response.headers["Vary"]
+
+
+def test_listar_frequencias_formato_invalido(client):
+    with patch("app.crudFrequencias.bd.create_connection"):
+        response = client.get("/frequencias?format=xml")
+
+    assert response.status_code == 400
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_relatorio_frequencias_le_resumo_mensal(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (1, 2, datetime.date(2024, 5, 1), 18, 20),
+        (1, 2, datetime.date(2024, 6, 1), 2, 3),
+    ]
+
+    response = client.get("/frequencias/relatorio?id_aluno=1&mes_de=2024-05")
+
+    assert response.status_code == 200
+    assert response.json == [
+        {
+            "id_aluno": 1,
+            "id_disciplina": 2,
+            "mes": "2024-05",
+            "presencas": 18,
+            "total": 20,
+            "percentual": 90.0,
+        },
+        {
+            "id_aluno": 1,
+            "id_disciplina": 2,
+            "mes": "2024-06",
+            "presencas": 2,
+            "total": 3,
+            "percentual": 66.7,
+        },
+    ]
+    sql, params = mock_cursor.execute.call_args.args
+    assert "FROM Resumo_Frequencias" in sql
+    assert "Frequencias " not in sql.replace("Resumo_Frequencias", "")
+    assert params == [1, datetime.date(2024, 5, 1), 101]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_relatorio_frequencias_por_turma(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/frequencias/relatorio?id_turma=3")
+
+    assert response.status_code == 200
+    assert response.json == []
+    sql, params = mock_cursor.execute.call_args.args
+    assert "WHERE id_turma = %s" in sql
+    assert params == [3, 101]
+
+
+@patch("app.crudFrequencias.bd.create_connection")
+def test_relatorio_frequencias_paginado(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (1, 2, datetime.date(2024, 5, 1), 18, 20),
+        (1, 2, datetime.date(2024, 6, 1), 2, 3),
+    ]
+
+    response = client.get(
+        "/frequencias/relatorio?id_disciplina=2&limit=1&after=1,1,2024-06"
+    )
+
+    assert response.status_code == 200
+    assert [linha["mes"] for linha in response.json] == ["2024-05"]
+    assert response.headers["X-Next-Cursor"] == "1,2,2024-05"
+    sql, params = mock_cursor.execute.call_args.args
+    assert "(id_aluno, id_disciplina, mes) > (%s, %s, %s)" in sql
+    assert "LIMIT %s" in sql
+    assert params == [2, 1, 1, datetime.date(2024, 6, 1), 2]
+
+
+def test_relatorio_frequencias_after_invalido(client):
+    response = client.get("/frequencias/relatorio?id_aluno=1&after=1,2")
+
+    assert response.status_code == 400
+
+
+def test_relatorio_frequencias_exige_filtro(client):
+    response = client.get("/frequencias/relatorio?mes_de=2024-05")
+
+    assert response.status_code == 400
+
+
+def test_relatorio_frequencias_mes_invalido(client):
+    response = client.get("/frequencias/relatorio?id_aluno=1&mes_de=2024-13")
+
+    assert response.status_code == 400
+    assert "AAAA-MM" in response.json["error"]
@@ -5,10 +5,31 @@ import sys
 import os
 import json
 import datetime
+import decimal
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app import crudNotas
 from app.crudNotas import notas_bp
 
+BOLETIM = [
+    (
+        2,
+        "Matemática",
+        3,
+        decimal.Decimal("8.17"),
+        decimal.Decimal("7.00"),
+        decimal.Decimal("9.50"),
+        decimal.Decimal("8.00"),
+        datetime.date(2024, 6, 21),
+    ),
+    (3, "Português", 1, *(decimal.Decimal("6.00"),) * 4, datetime.date(2024, 6, 20)),
+]
+
+
+@pytest.fixture(autouse=True)
+def limpar_boletins():
+    crudNotas.BOLETINS.invalidate()
+
 
 @pytest.fixture
 def client():
@@ -205,3 +226,187 @@ def test_buscar_notas_por_aluno_not_found(mock_create_connection, client):
     assert response.status_code == 404
     data = json.loads(response.data)
     assert data["error"] == "Nenhuma nota encontrada para este aluno"
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_buscar_boletim_success(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = BOLETIM
+
+    response = client.get("/alunos/1/boletim")
+
+    assert response.status_code == 200
+    assert response.json["id_aluno"] == 1
+    assert response.json["disciplinas"][0] == {
+        "id_disciplina": 2,
+        "nome_disciplina": "Matemática",
+        "quantidade_notas": 3,
+        "media": 8.17,
+        "nota_minima": 7.0,
+        "nota_maxima": 9.5,
+        "ultima_nota": 8.0,
+        "data_ultima_avaliacao": "2024-06-21",
+    }
+    assert len(response.json["disciplinas"]) == 2
+    assert mock_cursor.execute.call_count == 1
+    assert "JOIN Disciplinas" in mock_cursor.execute.call_args.args[0]
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_buscar_boletim_sem_notas(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(None, None, 0, None, None, None, None, None)]
+
+    response = client.get("/alunos/1/boletim")
+
+    assert response.status_code == 200
+    assert response.json == {"id_aluno": 1, "disciplinas": []}
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_boletim_ignora_notas_sem_disciplina(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    # Aluno cujas notas não têm disciplina: o JOIN filtrado não encontra notas.
+    mock_cursor.fetchall.return_value = [(None, None, 0, None, None, None, None, None)]
+
+    response = client.get("/alunos/1/boletim")
+
+    sql = mock_cursor.execute.call_args.args[0]
+    join_notas = sql.split("LEFT JOIN Notas", 1)[1].split("LEFT JOIN", 1)[0]
+    assert "n.id_disciplina IS NOT NULL" in join_notas
+    assert response.status_code == 200
+    assert response.json == {"id_aluno": 1, "disciplinas": []}
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_buscar_boletim_aluno_not_found(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/alunos/99/boletim")
+
+    assert response.status_code == 404
+    assert crudNotas.BOLETINS.get(99) is None
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_boletim_em_cache_ate_nota_do_aluno_mudar(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = BOLETIM
+
+    client.get("/alunos/1/boletim")
+    client.get("/alunos/2/boletim")
+    client.get("/alunos/1/boletim")
+    assert mock_cursor.execute.call_count == 2
+
+    crudNotas.notifications.publish("notas:2")
+    client.get("/alunos/1/boletim")
+    client.get("/alunos/2/boletim")
+    assert mock_cursor.execute.call_count == 3
+
+    crudNotas.notifications.publish("disciplinas")
+    client.get("/alunos/1/boletim")
+    assert mock_cursor.execute.call_count == 4
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_alterar_nota_descarta_boletins_dos_alunos(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    crudNotas.BOLETINS.set(1, {"id_aluno": 1})
+    crudNotas.BOLETINS.set(2, {"id_aluno": 2})
+    crudNotas.BOLETINS.set(3, {"id_aluno": 3})
+    mock_cursor.fetchall.return_value = [(1,)]
+
+    client.put(
+        "/notas/5",
+        json={
+            "id_aluno": 2,
+            "id_disciplina": 2,
+            "valor_nota": 7.5,
+            "data_avaliacao": "2024-06-20",
+        },
+    )
+
+    assert crudNotas.BOLETINS.get(1) is None
+    assert crudNotas.BOLETINS.get(2) is None
+    assert crudNotas.BOLETINS.get(3) == {"id_aluno": 3}
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_listar_notas_include_carrega_relacoes_em_lote(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    notas = [
+        (i, 1 + i % 2, 2, decimal.Decimal("9.50"), datetime.date(2024, 6, 20))
+        for i in range(1, 51)
+    ]
+    mock_cursor.fetchall.side_effect = [
+        notas,
+        [(1, "Aluno Um", datetime.date(2018, 1, 1), 1), (2, "Aluno Dois", None, 1)],
+        [(2, "Matemática", 1)],
+    ]
+
+    response = client.get("/notas?include=disciplina,aluno")
+
+    assert response.status_code == 200
+    assert len(response.json) == 50
+    assert response.json[0]["aluno"]["nome_completo"] == "Aluno Dois"
+    assert response.json[1]["aluno"]["data_nascimento"] == "2018-01-01"
+    assert response.json[0]["disciplina"] == {
+        "id_disciplina": 2,
+        "nome_disciplina": "Matemática",
+        "id_professor": 1,
+    }
+    # Uma consulta para a página e uma por relação, não uma por nota.
+    assert mock_cursor.execute.call_count == 3
+    aluno_sql, aluno_params = mock_cursor.execute.call_args_list[1].args
+    assert "FROM Alunos WHERE id_aluno = ANY(%s)" in aluno_sql
+    assert aluno_params == [[2, 1]]
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_listar_notas_include_com_fields_le_chave_estrangeira(
+    mock_create_connection, client
+):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [[(1, 9.5, 2)], [(2, "Matemática", 1)]]
+
+    response = client.get("/notas?fields=valor_nota&include=disciplina")
+
+    assert response.json[0]["disciplina"]["nome_disciplina"] == "Matemática"
+    assert "id_disciplina" in mock_cursor.execute.call_args_list[0].args[0]
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_listar_notas_include_invalido(mock_create_connection, client):
+    mock_create_connection.return_value = MagicMock()
+
+    response = client.get("/notas?include=professor")
+    colunar = client.get("/notas?include=aluno&format=columnar")
+
+    assert response.status_code == 400
+    assert "professor" in response.json["error"]
+    assert colunar.status_code == 400
@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 import json
+import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.crudPagamentos import pagamentos_bp
@@ -159,3 +160,60 @@ def test_excluir_pagamento_db_failure(mock_create_connection, client):
 
     assert response.status_code == 500
     assert b"Failed to connect to the database" in response.data
+
+
+@patch("app.crudPagamentos.bd.create_connection")
+def test_listar_pagamentos_filtros(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (3, 3, "2024-07-03", 500.0, "dinheiro", "julho/2024", "pendente")
+    ]
+
+    response = client.get(
+        "/pagamentos?status=pendente&id_aluno=3&data_de=2024-07-01&data_ate=2024-07-31"
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.data)[0]["status"] == "pendente"
+    sql, params = mock_cursor.execute.call_args[0]
+    assert "status = %s AND id_aluno = %s" in sql
+    assert "data_pagamento >= %s AND data_pagamento <= %s" in sql
+    assert params == [
+        "pendente",
+        3,
+        datetime.date(2024, 7, 1),
+        datetime.date(2024, 7, 31),
+        101,
+    ]
+
+
+@patch("app.crudPagamentos.bd.create_connection")
+def test_listar_pagamentos_por_ids_com_filtro(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (3, 3, "2024-07-03", 500.0, "dinheiro", "julho/2024", "pendente")
+    ]
+
+    response = client.get("/pagamentos?ids=4,3&status=pendente")
+
+    assert [p["id_pagamento"] for p in json.loads(response.data)] == [3]
+    assert response.headers["X-Missing-Ids"] == "4"
+    sql, params = mock_cursor.execute.call_args[0]
+    assert "status = %s AND id_pagamento = ANY(%s)" in sql
+    assert params == ["pendente", [4, 3]]
+
+
+@patch("app.crudPagamentos.bd.create_connection")
+def test_listar_pagamentos_filtro_data_invalida(mock_create_connection, client):
+    mock_create_connection.return_value = MagicMock()
+
+    response = client.get("/pagamentos?data_de=31/07/2024")
+
+    assert response.status_code == 400
+    assert "Data inválida" in json.loads(response.data)["error"]
@@ -54,6 +54,8 @@ def test_cadastrar_presenca_success(mock_create_connection, client):
     assert response.status_code == 201
     data = json.loads(response.data)
     assert data["message"] == "Presença cadastrada com sucesso"
+    sql = mock_cursor.execute.call_args[0][0]
+    assert "ON CONFLICT (id_aluno, data_presenca) DO UPDATE" in sql
 
 
 @patch("app.crudPresencas.bd.create_connection")
@@ -6,7 +6,7 @@ import os
 import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from app.crudProfessores import professores_bp
+from app.crudProfessores import professores_bp, CACHE
 
 
 @pytest.fixture
@@ -17,6 +17,11 @@ def client():
     return app.test_client()
 
 
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    CACHE.invalidate()
+
+
 @patch("app.crudProfessores.bd.create_connection")
 def test_listar_professores_success(mock_create_connection, client):
     mock_conn = MagicMock()
@@ -137,3 +142,22 @@ def test_excluir_professor_db_failure(mock_create_connection, client):
 
     assert response.status_code == 500
     assert b"Failed to connect to the database" in response.data
+
+
+@patch("app.crudProfessores.bd.create_connection")
+def test_listar_professores_por_ids_em_cache(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        (2, "Professor Dois", "dois@email.com", "11999999992")
+    ]
+
+    first = client.get("/professores?ids=2,5")
+    second = client.get("/professores?ids=2,5")
+
+    assert [p["id_professor"] for p in second.json] == [2]
+    assert second.headers["X-Missing-Ids"] == "5"
+    assert first.json == second.json
+    assert mock_cursor.execute.call_count == 1
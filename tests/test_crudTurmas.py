@@ -4,9 +4,26 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 import json
+import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from app.crudTurmas import turmas_bp
+from app.crudTurmas import turmas_bp, CACHE, COLUNAS
+
+TURMA = (1, "Turma A", "08:00-12:00", 3, "Ana Paula Silva", "ana@escola.com", "119")
+ALUNOS_TURMA = [
+    (i, f"Aluno {i:02d}", datetime.date(2018, 1, 1), i % 3 != 0 if i % 5 else None)
+    for i in range(1, 41)
+]
+
+
+def mock_painel(mock_create_connection, turma=TURMA, alunos=ALUNOS_TURMA):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = turma
+    mock_cursor.fetchall.return_value = alunos
+    return mock_cursor
 
 
 @pytest.fixture
@@ -17,6 +34,11 @@ def client():
     return app.test_client()
 
 
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    CACHE.invalidate()
+
+
 @patch("app.crudTurmas.bd.create_connection")
 def test_listar_turmas_success(mock_create_connection, client):
     mock_conn = MagicMock()
@@ -129,3 +151,144 @@ def test_excluir_turma_db_failure(mock_create_connection, client):
 
     assert response.status_code == 500
     assert b"Failed to connect to the database"
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_listar_turmas_usa_cache(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, "Turma A", 1, "08:00")]
+
+    first = client.get("/turmas")
+    second = client.get("/turmas")
+
+    assert first.data == second.data
+    assert mock_create_connection.call_count == 1
+    assert mock_cursor.execute.call_count == 1
+    assert CACHE.stats()["hits"] >= 1
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_alterar_turma_invalida_cache(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, "Turma A", 1, "08:00")]
+    client.get("/turmas")
+
+    client.put(
+        "/turmas/1",
+        json={"nome_turma": "Turma B", "id_professor": 1, "horario": "09:00"},
+    )
+    mock_cursor.fetchall.return_value = [(1, "Turma B", 1, "09:00")]
+    response = client.get("/turmas")
+
+    assert b"Turma B" in response.data
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_painel_turma_success(mock_create_connection, client):
+    mock_cursor = mock_painel(mock_create_connection)
+
+    response = client.get("/turmas/1/painel?data=2024-06-20")
+
+    assert response.status_code == 200
+    assert response.json["turma"] == {
+        "id_turma": 1,
+        "nome_turma": "Turma A",
+        "horario": "08:00-12:00",
+    }
+    assert response.json["professor"]["nome_completo"] == "Ana Paula Silva"
+    assert response.json["data"] == "2024-06-20"
+    assert len(response.json["alunos"]) == 40
+    assert response.json["alunos"][0] == {
+        "id_aluno": 1,
+        "nome_completo": "Aluno 01",
+        "data_nascimento": "2018-01-01",
+        "presente": True,
+    }
+    assert response.json["alunos"][4]["presente"] is None
+    assert mock_cursor.execute.call_args.args[1] == (datetime.date(2024, 6, 20), 1)
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_painel_turma_consultas_fixas_em_uma_conexao(mock_create_connection, client):
+    mock_cursor = mock_painel(mock_create_connection)
+
+    response = client.get("/turmas/1/painel")
+
+    assert response.status_code == 200
+    assert response.json["data"] == datetime.date.today().isoformat()
+    assert mock_create_connection.call_count == 1
+    assert mock_cursor.execute.call_count == 2
+
+
+@pytest.mark.parametrize("quantidade", [40, 400])
+@patch("app.crudTurmas.bd.create_connection")
+def test_painel_turma_consultas_nao_crescem_com_alunos(
+    mock_create_connection, quantidade, client
+):
+    alunos = [
+        (i, f"Aluno {i:03d}", datetime.date(2018, 1, 1), True)
+        for i in range(1, quantidade + 1)
+    ]
+    mock_cursor = mock_painel(mock_create_connection, alunos=alunos)
+
+    response = client.get("/turmas/1/painel")
+
+    assert len(response.json["alunos"]) == quantidade
+    assert mock_cursor.execute.call_count == 2
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_painel_turma_sem_professor(mock_create_connection, client):
+    mock_painel(mock_create_connection, turma=(1, "Turma A", "08:00", *[None] * 4))
+
+    response = client.get("/turmas/1/painel")
+
+    assert response.status_code == 200
+    assert response.json["professor"] is None
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_painel_turma_not_found(mock_create_connection, client):
+    mock_cursor = mock_painel(mock_create_connection, turma=None)
+
+    response = client.get("/turmas/99/painel")
+
+    assert response.status_code == 404
+    assert mock_cursor.execute.call_count == 1
+
+
+def test_painel_turma_data_invalida(client):
+    response = client.get("/turmas/1/painel?data=20-06-2024")
+
+    assert response.status_code == 400
+
+
+@patch("app.crudTurmas.bd.create_connection")
+def test_listar_turmas_include_professor(mock_create_connection, client):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    professor = (3, "Ana Paula Silva", "ana@escola.com", "119")
+    mock_cursor.fetchall.side_effect = [
+        [(1, "Turma A", 3, "08:00"), (2, "Turma B", 3, "13:00")],
+        [professor],
+        [professor],
+    ]
+
+    first = client.get("/turmas?include=professor")
+    second = client.get("/turmas?include=professor")
+
+    assert [t["professor"]["nome_completo"] for t in first.json] == [
+        "Ana Paula Silva"
+    ] * 2
+    assert second.json == first.json
+    # A página vem do cache na segunda vez; só o professor é relido.
+    assert mock_cursor.execute.call_count == 3
+    assert "professor" not in CACHE.get((100, None, COLUNAS, None))[0][0]
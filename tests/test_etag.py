@@ -0,0 +1,197 @@
+import pytest
+from flask import Flask
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app import crudAlunos
+from app.crudAlunos import alunos_bp
+
+etag = crudAlunos.etag
+
+ALUNO = (
+    1,
+    "Aluno Teste",
+    "2010-05-10",
+    1,
+    "Responsável Teste",
+    "11999999999",
+    "responsavel@email.com",
+    "Nenhuma",
+)
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(alunos_bp)
+    etag.init_app(app)
+    app.testing = True
+    etag.VERSIONS.invalidate()
+    return app.test_client()
+
+
+def mock_database(mock_create_connection, versao=1):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = lambda: [("alunos", versao)]
+    mock_cursor.fetchone.return_value = ALUNO
+    return mock_cursor
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_get_retorna_etag_e_304_quando_nao_mudou(mock_create_connection, client):
+    mock_cursor = mock_database(mock_create_connection)
+
+    first = client.get("/alunos/1")
+    calls = mock_cursor.execute.call_count
+    second = client.get("/alunos/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert mock_cursor.execute.call_count == calls
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_nova_versao_da_tabela_muda_etag(mock_create_connection, client):
+    mock_database(mock_create_connection, versao=1)
+    first = client.get("/alunos/1")
+
+    mock_database(mock_create_connection, versao=2)
+    etag.notifications.publish("alunos")
+    second = client.get("/alunos/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_etag_depende_da_query_string(mock_create_connection, client):
+    mock_database(mock_create_connection)
+
+    first = client.get("/alunos/1")
+    second = client.get("/alunos/1?fields=nome_completo")
+
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_escrita_bem_sucedida_descarta_versoes(mock_create_connection, client):
+    mock_database(mock_create_connection)
+    client.get("/alunos/1")
+    assert etag.VERSIONS.get("versoes") is not None
+
+    client.delete("/alunos/1")
+
+    assert etag.VERSIONS.get("versoes") is None
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_sem_tabela_de_versoes_responde_sem_etag(mock_create_connection, client):
+    mock_cursor = mock_database(mock_create_connection)
+    mock_cursor.fetchall.side_effect = Exception("relation does not exist")
+
+    response = client.get("/alunos/1")
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_resposta_de_erro_nao_recebe_etag(mock_create_connection, client):
+    mock_cursor = mock_database(mock_create_connection)
+    mock_cursor.fetchone.return_value = None
+
+    response = client.get("/alunos/1")
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_chave_extra_entra_no_etag(mock_create_connection):
+    mock_database(mock_create_connection)
+    dia = ["2024-06-20"]
+    app = Flask(__name__)
+    etag.init_app(app)
+
+    @app.route("/painel")
+    @etag.conditional("Alunos", key=lambda: dia[0])
+    def painel():
+        return {"dia": dia[0]}
+
+    client = app.test_client()
+    first = client.get("/painel")
+    dia[0] = "2024-06-21"
+    second = client.get("/painel", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_put_seguido_de_get_condicional_devolve_dados_novos(
+    mock_create_connection, client
+):
+    versao = [1]
+    mock_cursor = mock_database(mock_create_connection)
+    mock_cursor.fetchall.side_effect = lambda: [("alunos", versao[0])]
+
+    def execute(sql, params=None):
+        # O trigger de Alunos incrementa a versão na própria transação do UPDATE.
+        if "UPDATE Alunos" in sql:
+            versao[0] += 1
+
+    mock_cursor.execute.side_effect = execute
+    first = client.get("/alunos/1")
+
+    put = client.put(
+        "/alunos/1",
+        json={
+            "nome_completo": "Aluno Teste",
+            "data_nascimento": "2010-05-10",
+            "id_turma": 1,
+            "nome_responsavel": "Responsável Teste",
+            "telefone_responsavel": "11999999999",
+            "email_responsavel": "responsavel@email.com",
+        },
+    )
+    second = client.get("/alunos/1", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert put.status_code == 200
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+@pytest.mark.parametrize(
+    "arquivo", ["app/migrations/0005_versoes_tabelas.sql", "bd/escola.sql"]
+)
+def test_trigger_de_alteracao_avanca_versao_da_tabela(arquivo):
+    raiz = os.path.join(os.path.dirname(__file__), "..")
+    with open(os.path.join(raiz, arquivo), encoding="utf-8") as f:
+        sql = f.read()
+
+    funcao = sql[sql.rindex("CREATE OR REPLACE FUNCTION notificar_alteracao()") :]
+    funcao = funcao[: funcao.index("$$ LANGUAGE")]
+    assert "UPDATE Versoes_Tabelas SET versao = versao + 1" in funcao
+    assert "WHERE tabela = TG_TABLE_NAME AND fatia = pg_backend_pid() % 16" in funcao
+    assert "nextval" not in funcao
+
+
+@pytest.mark.parametrize("tabela", ["alunos", "notas:3", None])
+@patch("app.crudAlunos.bd.create_connection")
+def test_notificacao_so_descarta_versoes(mock_create_connection, client, tabela):
+    mock_cursor = mock_database(mock_create_connection)
+    client.get("/alunos/1")
+    calls = mock_cursor.execute.call_count
+
+    etag.notifications.publish(tabela)
+
+    assert mock_cursor.execute.call_count == calls
+    assert etag.VERSIONS.get("versoes") is None
@@ -0,0 +1,97 @@
+import pytest
+from flask import Flask
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import datetime
+import decimal
+import io
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.crudNotas import notas_bp
+
+NOTAS = [
+    (1, 1, 2, decimal.Decimal("9.50"), datetime.date(2024, 6, 20)),
+    (2, 1, 3, decimal.Decimal("8.00"), datetime.date(2024, 6, 21)),
+]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(notas_bp)
+    app.testing = True
+    return app.test_client()
+
+
+def mock_database(mock_create_connection):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchmany.side_effect = [NOTAS, []]
+    return mock_conn, mock_cursor
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_exportar_notas_csv_por_faixas_de_chave(mock_create_connection, client):
+    mock_conn, mock_cursor = mock_database(mock_create_connection)
+    mock_cursor.fetchone.side_effect = [(2000,), None]
+    lotes = [b"id_nota,valor_nota\n1,9.50\n", b"2001,8.00\n"]
+    mock_cursor.copy_expert.side_effect = lambda sql, buffer: buffer.write(lotes.pop(0))
+
+    response = client.get("/notas/export", headers={"Accept": "text/csv"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.data == b"id_nota,valor_nota\n1,9.50\n2001,8.00\n"
+    primeiro, segundo = [c[0][0] for c in mock_cursor.copy_expert.call_args_list]
+    assert "WHERE id_nota <= 2000" in primeiro and "HEADER true" in primeiro
+    assert "WHERE id_nota > 2000" in segundo and "HEADER" not in segundo
+    executed = [c[0][0] for c in mock_cursor.execute.call_args_list]
+    assert executed[0].startswith("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    mock_conn.close.assert_called()
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_exportar_notas_msgpack(mock_create_connection, client):
+    msgpack = pytest.importorskip("msgpack")
+    mock_database(mock_create_connection)
+
+    response = client.get("/notas/export", headers={"Accept": "application/x-msgpack"})
+
+    assert response.mimetype == "application/vnd.msgpack"
+    unpacker = msgpack.Unpacker(io.BytesIO(response.data))
+    assert list(unpacker) == [
+        ["id_nota", "id_aluno", "id_disciplina", "valor_nota", "data_avaliacao"],
+        [1, 1, 2, 9.5, "2024-06-20"],
+        [2, 1, 3, 8.0, "2024-06-21"],
+    ]
+
+
+@patch("app.crudNotas.bd.create_connection")
+def test_exportar_notas_arrow(mock_create_connection, client):
+    pyarrow = pytest.importorskip("pyarrow")
+    mock_database(mock_create_connection)
+
+    response = client.get("/notas/export?format=arrow")
+
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    tabela = pyarrow.ipc.open_stream(response.data).read_all()
+    assert tabela.column("valor_nota").to_pylist() == [9.5, 8.0]
+    assert tabela.column("data_avaliacao").to_pylist() == [
+        datetime.date(2024, 6, 20),
+        datetime.date(2024, 6, 21),
+    ]
+
+
+def test_exportar_notas_formato_nao_aceito(client):
+    response = client.get("/notas/export", headers={"Accept": "application/json"})
+
+    assert response.status_code == 406
+
+
+def test_exportar_notas_formato_invalido(client):
+    response = client.get("/notas/export?format=xlsx")
+
+    assert response.status_code == 400
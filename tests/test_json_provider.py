@@ -0,0 +1,69 @@
+import pytest
+from flask import Flask, jsonify
+import datetime
+import decimal
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.Util import json_provider
+
+VALOR = {
+    "id_aluno": 1,
+    "data_nascimento": datetime.date(2010, 5, 10),
+    "criado_em": datetime.datetime(2024, 6, 20, 8, 30, 15),
+    "valor_pago": decimal.Decimal("150.50"),
+    "nome": "João",
+}
+ESPERADO = {
+    "id_aluno": 1,
+    "data_nascimento": "2010-05-10",
+    "criado_em": "2024-06-20T08:30:15",
+    "valor_pago": 150.5,
+    "nome": "João",
+}
+
+
+@pytest.fixture(params=[json_provider.OrjsonProvider, json_provider.EscolaJSONProvider])
+def app(request):
+    app = Flask(__name__)
+    app.json = request.param(app)
+    return app
+
+
+def test_init_app_prefers_orjson():
+    app = Flask(__name__)
+
+    json_provider.init_app(app)
+
+    assert isinstance(app.json, json_provider.OrjsonProvider)
+
+
+def test_jsonify_writes_iso_dates_and_numeric_decimals(app):
+    with app.app_context():
+        response = jsonify([VALOR])
+
+    assert response.mimetype == "application/json"
+    assert response.get_json() == [ESPERADO]
+
+
+def test_providers_produce_the_same_compact_output():
+    outputs = set()
+    for provider in (json_provider.OrjsonProvider, json_provider.EscolaJSONProvider):
+        app = Flask(__name__)
+        app.json = provider(app)
+        with app.app_context():
+            outputs.add(jsonify(VALOR).get_data())
+
+    assert len(outputs) == 1
+
+
+def test_dumps_and_loads_round_trip(app):
+    texto = app.json.dumps(VALOR)
+
+    assert isinstance(texto, str)
+    assert app.json.loads(texto) == ESPERADO
+
+
+def test_dumps_with_stdlib_options_is_delegated(app):
+    assert app.json.dumps({"b": 1, "a": 2}, indent=2).startswith("{\n")
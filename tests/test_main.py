@@ -0,0 +1,23 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.main import create_app
+
+
+def test_create_app_registers_blueprints_under_api():
+    app = create_app({"TESTING": True})
+
+    assert app.config["TESTING"] is True
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+    assert "/api/alunos" in rules
+    assert "/api/frequencias/lote" in rules
+    assert "/metrics" in rules
+
+
+def test_create_app_returns_independent_apps():
+    first = create_app({"TESTING": True})
+    second = create_app()
+
+    assert first is not second
+    assert second.config["TESTING"] is False
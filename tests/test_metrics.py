@@ -0,0 +1,112 @@
+import pytest
+from flask import Flask
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.crudAlunos import alunos_bp
+from app.Util import metrics
+
+ROUTE = ("GET", "alunos", "/alunos/<int:id_aluno>")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # Other tests may have registered the listener of another app instance.
+    monkeypatch.setattr(metrics.bd, "_query_listeners", [])
+    app = Flask(__name__)
+    app.register_blueprint(alunos_bp)
+    metrics.init_app(app)
+
+    @app.route("/consulta")
+    def consulta():
+        metrics.bd._notify_query(0.25, 3)
+        metrics.bd._notify_query(0.5, 7)
+        return "ok"
+
+    app.testing = True
+    return app
+
+
+def sample(name, labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+def route_labels(route=ROUTE, **extra):
+    labels = dict(zip(metrics.REQUEST_LABELS, route))
+    labels.update(extra)
+    return labels
+
+
+@patch("app.crudAlunos.bd.create_connection")
+def test_request_is_measured_per_route(mock_create_connection, app):
+    mock_conn = MagicMock()
+    mock_create_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.fetchone.return_value = None
+    before_404 = sample("escola_http_responses_total", route_labels(status="404"))
+    before_count = sample("escola_http_request_duration_seconds_count", route_labels())
+
+    response = app.test_client().get("/alunos/1")
+
+    assert response.status_code == 404
+    assert sample("escola_http_responses_total", route_labels(status="404")) == (
+        before_404 + 1
+    )
+    assert sample("escola_http_request_duration_seconds_count", route_labels()) == (
+        before_count + 1
+    )
+    assert sample("escola_http_requests_in_progress", route_labels()) == 0
+
+
+def test_db_time_and_rows_are_summed_per_request(app):
+    labels = route_labels(("GET", "", "/consulta"))
+    before_seconds = sample("escola_http_request_db_seconds_sum", labels)
+    before_rows = sample("escola_http_request_db_rows_sum", labels)
+
+    app.test_client().get("/consulta")
+
+    assert sample("escola_http_request_db_seconds_sum", labels) == pytest.approx(
+        before_seconds + 0.75
+    )
+    assert sample("escola_http_request_db_rows_sum", labels) == before_rows + 10
+
+
+def test_unmatched_route_uses_placeholder_label(app):
+    labels = route_labels(("GET", "", "<unmatched>"), status="404")
+    before = sample("escola_http_responses_total", labels)
+
+    app.test_client().get("/nao-existe")
+
+    assert sample("escola_http_responses_total", labels) == before + 1
+
+
+@patch("app.Util.metrics.bd.pool_stats")
+def test_metrics_endpoint_exposes_pool_stats(mock_pool_stats, app):
+    mock_pool_stats.return_value = {"open": 3, "idle": 1, "in_use": 2, "max_size": 20}
+
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'escola_db_pool_connections{state="in_use"} 2.0' in body
+    assert "escola_db_pool_max_size 20.0" in body
+
+
+def test_metrics_endpoint_is_not_instrumented(app):
+    labels = route_labels(("GET", "", "/metrics"), status="200")
+
+    app.test_client().get("/metrics")
+
+    assert sample("escola_http_responses_total", labels) == 0
+
+
+def test_metrics_endpoint_aggregates_worker_files(app, tmp_path, monkeypatch):
+    monkeypatch.setenv(metrics.MULTIPROC_ENV, str(tmp_path))
+
+    with patch("app.Util.metrics.multiprocess.MultiProcessCollector") as collector:
+        response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    collector.assert_called_once()
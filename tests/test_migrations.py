@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.Util import migrations
+
+
+def write_migration(directory, filename, sql):
+    with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+        f.write(sql)
+
+
+def test_split_statements_ignores_quoted_semicolons():
+    sql = """
+    -- comentário; com ponto e vírgula
+    CREATE INDEX a ON T (x) WHERE s = 'a;b';
+    CREATE FUNCTION f() RETURNS trigger AS $$
+    BEGIN
+        PERFORM 1;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+
+    statements = migrations.split_statements(sql)
+
+    assert len(statements) == 2
+    assert statements[0].endswith("WHERE s = 'a;b'")
+    assert "RETURN NEW;" in statements[1]
+
+
+def test_discover_orders_by_version(tmp_path):
+    write_migration(tmp_path, "0002_b.sql", "SELECT 2;")
+    write_migration(tmp_path, "0001_a.sql", "SELECT 1;")
+    write_migration(tmp_path, "leia-me.txt", "")
+
+    found = migrations.discover(str(tmp_path))
+
+    assert [(v, n) for v, n, _ in found] == [("0001", "a"), ("0002", "b")]
+
+
+def test_migrate_skips_applied_and_records_new(tmp_path):
+    write_migration(tmp_path, "0001_a.sql", "SELECT 1;")
+    write_migration(
+        tmp_path,
+        "0002_b.sql",
+        "-- migracao: sem-transacao\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_b ON T (x);\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_c ON T (y);\n",
+    )
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.fetchall.return_value = [("0001",)]
+    cursor.fetchone.return_value = None
+
+    applied = migrations.migrate(conn, str(tmp_path))
+
+    assert applied == ["0002"]
+    assert conn.autocommit is True
+    executed = [c.args[0] for c in cursor.execute.call_args_list]
+    assert "SELECT 1;" not in executed
+    assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_b ON T (x)" in executed
+    assert "BEGIN" not in executed
+    assert cursor.execute.call_args_list[-2].args[1] == ("0002", "b")
+    assert executed[-1] == "SELECT pg_advisory_unlock(%s)"
+
+
+def test_migrate_rolls_back_failed_transactional_migration(tmp_path):
+    write_migration(tmp_path, "0001_a.sql", "ALTER TABLE T ADD COLUMN y INT;")
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.fetchall.return_value = []
+
+    def execute(sql, *args):
+        if sql.startswith("ALTER"):
+            raise RuntimeError("falhou")
+
+    cursor.execute.side_effect = execute
+
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn, str(tmp_path))
+
+    executed = [c.args[0] for c in cursor.execute.call_args_list]
+    assert "ROLLBACK" in executed
+    assert executed[-1] == "SELECT pg_advisory_unlock(%s)"
+
+
+def test_migrate_stops_failed_migration_without_recording_it(tmp_path):
+    write_migration(
+        tmp_path,
+        "0001_a.sql",
+        "-- migracao: sem-transacao\n"
+        "DELETE FROM T;\n"
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_t ON T (x);\n",
+    )
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.fetchall.return_value = []
+    cursor.fetchone.return_value = None
+
+    def execute(sql, *args):
+        if sql.startswith("CREATE UNIQUE"):
+            raise RuntimeError("could not create unique index")
+
+    cursor.execute.side_effect = execute
+
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn, str(tmp_path))
+
+    executed = [c.args[0] for c in cursor.execute.call_args_list]
+    assert not any("INSERT INTO Migracoes" in sql for sql in executed)
+    assert executed[-1] == "SELECT pg_advisory_unlock(%s)"
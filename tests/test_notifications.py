@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.Util import cache
+
+
+def notify(payload):
+    notification = MagicMock()
+    notification.payload = payload
+    return notification
+
+
+def test_dispatch_publishes_each_table_once(monkeypatch):
+    notifications = cache.notifications
+    received = []
+    monkeypatch.setattr(notifications, "_subscribers", [received.append])
+    conn = MagicMock()
+    conn.notifies = [notify("turmas"), notify("Alunos"), notify("turmas")]
+
+    tables = notifications.dispatch(conn)
+
+    conn.poll.assert_called_once()
+    assert tables == {"turmas", "alunos"}
+    assert received == ["alunos", "turmas"]
+    assert conn.notifies == []
+
+
+def test_failing_subscriber_does_not_block_the_others(monkeypatch):
+    notifications = cache.notifications
+    received = []
+    monkeypatch.setattr(
+        notifications,
+        "_subscribers",
+        [MagicMock(side_effect=RuntimeError("boom")), received.append],
+    )
+
+    notifications.publish("turmas")
+
+    assert received == ["turmas"]
+
+
+def test_notification_evicts_cache_of_the_table():
+    turmas = cache.get_cache("Turmas")
+    disciplinas = cache.get_cache("Disciplinas")
+    turmas.set("pagina", [1])
+    disciplinas.set("pagina", [2])
+
+    cache.notifications.publish("turmas")
+
+    assert turmas.get("pagina") is None
+    assert disciplinas.get("pagina") == [2]
+
+
+def test_reconnect_notification_evicts_every_cache():
+    turmas = cache.get_cache("Turmas")
+    turmas.set("pagina", [1])
+
+    cache.notifications.publish(None)
+
+    assert turmas.get("pagina") is None
+
+
+def test_listener_listens_in_autocommit():
+    conn = MagicMock()
+    listener = cache.notifications.Listener(connect=lambda: conn)
+
+    assert listener.listen() is conn
+
+    assert conn.autocommit is True
+    conn.cursor.return_value.execute.assert_called_once_with("LISTEN escola_alteracoes")